@@ -0,0 +1,83 @@
+"""
+Микробенчмарк одного шага Move через адаптер IMovable: адаптер, разрешающий стратегии через IoC при каждом вызове,
+против скомпилированного адаптера. Также измеряется память, выделяемая за такт, в котором команды Move
+разрешаются заново для OBJECTS_NUMBER объектов, как при повторяемых каждый такт операциях.
+
+Запуск:
+    python -m benchmarks.adapters
+"""
+import tracemalloc
+from timeit import repeat
+
+import numpy as np
+
+from features.base.commands import InitCreateCommandAdapterStrategy
+from features.movement.commands import MoveCommandPluginCommand
+from game.commands import GameObject
+from iocs import IoC
+from iocs.scope_based_strategy import InitScopesCommand
+
+NUMBER = 100_000
+OBJECTS_NUMBER = 10_000
+
+
+def create_object():
+    obj = GameObject()
+    obj.set_property('position', np.array([0, 0]))
+    obj.set_property('velocity', 2)
+    obj.set_property('direction', 1)
+    obj.set_property('directions_number', 8)
+    return obj
+
+
+def setup_scope(compiled):
+    IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+    IoC.resolve('Scopes.Clear').execute()
+    IoC.resolve('Scopes.New', 'benchmark')
+    IoC.resolve('Scopes.Current.Set', 'benchmark').execute()
+
+    InitCreateCommandAdapterStrategy(compiled=compiled).execute()
+    MoveCommandPluginCommand().execute()
+    return create_object()
+
+
+def measure_tick_allocations(objects) -> tuple:
+    """Число блоков и байт памяти, оставшихся выделенными после такта разрешения команд Move"""
+    for obj in objects:
+        IoC.resolve('Commands.Move', obj)
+
+    tracemalloc.start()
+    commands = [IoC.resolve('Commands.Move', obj) for obj in objects]
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del commands
+
+    stats = snapshot.statistics('filename')
+    return sum(stat.count for stat in stats), sum(stat.size for stat in stats)
+
+
+def measure(stmt):
+    return min(repeat(stmt, number=NUMBER, repeat=5)) / NUMBER * 1e9
+
+
+def main():
+    InitScopesCommand().execute()
+
+    print(f'{"adapter":>10} {"resolve + Move, ns":>19} {"Move, ns":>10}')
+    for compiled in (False, True):
+        obj = setup_scope(compiled)
+        move = IoC.resolve('Commands.Move', obj)
+        total = measure(lambda: IoC.resolve('Commands.Move', obj).execute())
+        execute = measure(move.execute)
+        print(f'{"compiled" if compiled else "dynamic":>10} {total:>19.1f} {execute:>10.1f}')
+
+    objects = [create_object() for _ in range(OBJECTS_NUMBER)]
+    blocks, size = measure_tick_allocations(objects)
+    print(f'resolve Commands.Move for {OBJECTS_NUMBER} objects: {blocks} blocks, {size / 1024:.0f} KiB')
+
+    IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+    IoC.resolve('Scopes.Clear').execute()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Микробенчмарк разрешения зависимостей через IoC в зависимости от глубины иерархии скоупов.
+
+Запуск:
+    python -m benchmarks.ioc_resolve
+"""
+from timeit import repeat
+
+from iocs import IoC
+from iocs.scope_based_strategy import InitScopesCommand
+
+DEPTHS = (1, 3, 10)
+NUMBER = 100_000
+
+
+def walk(scope, key):
+    """Разрешение зависимости без кэша - последовательный обход родительских скоупов"""
+    while scope is not None:
+        if key in scope.dependencies:
+            return scope.dependencies[key]()
+        scope = scope.parent
+    raise KeyError(key)
+
+
+def setup_scopes(depth):
+    """Создает цепочку из depth скоупов под ROOT; зависимость регистрируется в самом верхнем из них"""
+    IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+    IoC.resolve('Scopes.Clear').execute()
+
+    parent_id = 'ROOT'
+    for level in range(depth):
+        scope_id = f'scope-{level}'
+        IoC.resolve('Scopes.New', scope_id, parent_id)
+        if level == 0:
+            IoC.resolve('Scopes.Current.Set', scope_id).execute()
+            IoC.resolve('IoC.Register', 'dependency', lambda: 1).execute()
+        parent_id = scope_id
+
+    IoC.resolve('Scopes.Current.Set', parent_id).execute()
+    return IoC.resolve('Scopes.Current')
+
+
+def measure(stmt):
+    return min(repeat(stmt, number=NUMBER, repeat=5)) / NUMBER * 1e9
+
+
+def main():
+    InitScopesCommand().execute()
+
+    print(f'{"depth":>5} {"IoC.resolve, ns":>16} {"Scope.resolve, ns":>18} {"walk, ns":>10}')
+    for depth in DEPTHS:
+        scope = setup_scopes(depth)
+        ioc = measure(lambda: IoC.resolve('dependency'))
+        cached = measure(lambda: scope.resolve('dependency'))
+        uncached = measure(lambda: walk(scope, 'dependency'))
+        print(f'{depth:>5} {ioc:>16.1f} {cached:>18.1f} {uncached:>10.1f}')
+
+    IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+    IoC.resolve('Scopes.Clear').execute()
+
+
+if __name__ == '__main__':
+    main()
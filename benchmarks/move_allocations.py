@@ -0,0 +1,89 @@
+"""
+Бенчмарк памяти и времени одного такта движения N объектов: Move против InPlaceMove.
+
+Move создает новый массив позиции при каждом движении, а старый сразу освобождается, поэтому для tracemalloc
+такие выделения незаметны. Чтобы их посчитать, объекты бенчмарка сохраняют замененные значения свойств:
+прирост памяти за такт - это память, выделенная под новые позиции.
+
+Запуск:
+    python -m benchmarks.move_allocations
+"""
+import tracemalloc
+from timeit import repeat
+
+import numpy as np
+
+from features.base.commands import InitCreateCommandAdapterStrategy
+from features.movement.commands import MoveCommandPluginCommand
+from game.commands import GameObject
+from iocs import IoC
+from iocs.scope_based_strategy import InitScopesCommand
+
+OBJECTS_NUMBER = 10_000
+
+
+class RetainingGameObject(GameObject):
+    """GameObject, сохраняющий замененные значения свойств"""
+
+    def __init__(self):
+        super().__init__()
+        self.replaced = []
+
+    def set_property(self, key: str, value: object) -> None:
+        old_value = self.storage.get(key)
+        if old_value is not None and old_value is not value:
+            self.replaced.append(old_value)
+        super().set_property(key, value)
+
+
+def create_objects(object_class):
+    objects = []
+    for i in range(OBJECTS_NUMBER):
+        obj = object_class()
+        obj.set_property('position', np.array([i, 0]))
+        obj.set_property('velocity', 3)
+        obj.set_property('direction', i % 8)
+        obj.set_property('directions_number', 8)
+        objects.append(obj)
+    return objects
+
+
+def measure_allocations(commands):
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for cmd in commands:
+        cmd.execute()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return after - before
+
+
+def measure_time(commands):
+    def tick():
+        for cmd in commands:
+            cmd.execute()
+    return min(repeat(tick, number=1, repeat=5)) / len(commands) * 1e9
+
+
+def main():
+    InitScopesCommand().execute()
+    IoC.resolve('Scopes.New', 'benchmark')
+    IoC.resolve('Scopes.Current.Set', 'benchmark').execute()
+    InitCreateCommandAdapterStrategy(compiled=True).execute()
+    MoveCommandPluginCommand().execute()
+
+    print(f'{"command":>20} {"bytes per tick":>15} {"bytes per move":>15} {"ns per move":>12}')
+    for key in ('Commands.Move', 'Commands.Move.InPlace'):
+        commands = [IoC.resolve(key, obj) for obj in create_objects(RetainingGameObject)]
+        allocated = measure_allocations(commands)
+
+        commands = [IoC.resolve(key, obj) for obj in create_objects(GameObject)]
+        elapsed = measure_time(commands)
+        print(f'{key:>20} {allocated:>15} {allocated / OBJECTS_NUMBER:>15.1f} {elapsed:>12.1f}')
+
+    IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+    IoC.resolve('Scopes.Clear').execute()
+
+
+if __name__ == '__main__':
+    main()
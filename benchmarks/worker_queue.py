@@ -0,0 +1,92 @@
+"""
+Пропускная способность потока StartThreadCommand (команд в секунду) с очередью на основе queue.Queue
+и с очередью с одним потребителем на основе deque: команды, повторно ставящие себя в очередь потока через
+Thread.Put, и команды, которые кладет в очередь другой поток.
+
+Запуск:
+    python -m benchmarks.worker_queue
+"""
+from threading import Event
+from time import perf_counter
+
+from features.base.commands import LambdaCommand
+from features.base.interfaces import ICommand
+from iocs import IoC
+from iocs.scope_based_strategy import InitScopesCommand
+from thread.commands import StartThreadCommand
+from thread.queues import LockedQueue, SingleConsumerQueue
+
+NUMBER = 200_000
+
+
+class RequeueCommand(ICommand):
+    """Команда, которая ставит себя в очередь потока, пока не выполнится number раз"""
+
+    def __init__(self, number, done: Event):
+        self.left = number
+        self.done = done
+
+    def execute(self) -> None:
+        self.left -= 1
+        if self.left:
+            IoC.resolve('Thread.Put', self).execute()
+        else:
+            self.done.set()
+
+
+def start_thread(queue_factory):
+    IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+    IoC.resolve('Scopes.Clear').execute()
+    StartThreadCommand('benchmark', queue_factory).execute()
+
+
+def stop_thread():
+    IoC.resolve('Thread.Put', IoC.resolve('Thread.HardStop')).execute()
+    IoC.resolve('Thread').join()
+
+
+def measure_requeue(queue_factory) -> float:
+    start_thread(queue_factory)
+    done = Event()
+
+    start = perf_counter()
+    IoC.resolve('Thread.Put', RequeueCommand(NUMBER, done)).execute()
+    done.wait()
+    elapsed = perf_counter() - start
+
+    stop_thread()
+    return NUMBER / elapsed
+
+
+def measure_producer(queue_factory) -> float:
+    start_thread(queue_factory)
+    done = Event()
+    put = IoC.resolve('Thread.Put', LambdaCommand(lambda: None))
+    last = IoC.resolve('Thread.Put', LambdaCommand(done.set))
+
+    start = perf_counter()
+    for _ in range(NUMBER - 1):
+        put.execute()
+    last.execute()
+    done.wait()
+    elapsed = perf_counter() - start
+
+    stop_thread()
+    return NUMBER / elapsed
+
+
+def main():
+    InitScopesCommand().execute()
+
+    print(f'{"queue":>20} {"requeue, cmd/s":>15} {"producer, cmd/s":>16}')
+    for queue_factory in (LockedQueue, SingleConsumerQueue):
+        requeue = max(measure_requeue(queue_factory) for _ in range(3))
+        producer = max(measure_producer(queue_factory) for _ in range(3))
+        print(f'{queue_factory.__name__:>20} {requeue:>15,.0f} {producer:>16,.0f}')
+
+    IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+    IoC.resolve('Scopes.Clear').execute()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,23 @@
+import logging
+from threading import Lock
+from time import monotonic
 from typing import Type
 
+from exceptions import CommandException
 from features.base.interfaces import ICommand
+from iocs import IoC
 
 
 class ExceptionHandler:
-    def __init__(self):
+    def __init__(self, unwrap_causes: bool = False):
+        """
+        :param unwrap_causes: подбирать правило по исходному исключению (__cause__) CommandException - например,
+                              по ошибке команды внутри MacroCommand, - и только затем по самому CommandException
+        """
         self.rules = {}
+        self.unwrap_causes = unwrap_causes
+        # (тип команды, тип исключения, тип исходного исключения) -> (действие, обрабатывается исходное исключение)
+        self.index = {}
 
     def setup(self, cmd: Type[ICommand], exc: Type[Exception] | None, action):
         """
@@ -16,22 +28,121 @@ class ExceptionHandler:
         :return:
         """
         self.rules[(cmd, exc)] = action
+        self.index.clear()
+
+    def find_action(self, cmd_type, exc_type, any_exception: bool = True):
+        """
+        Наиболее специфичное правило для пары типов. Команда важнее исключения: правила для класса команды
+        проверяются раньше правил для ее базовых классов, а для одного класса команды - сначала по исключению и его
+        базовым классам, затем правило для произвольного исключения.
+        :param any_exception: учитывать правила для произвольного исключения
+        """
+        for cmd_class in cmd_type.__mro__:
+            for exc_class in exc_type.__mro__:
+                action = self.rules.get((cmd_class, exc_class))
+                if action:
+                    return action
+            if any_exception:
+                action = self.rules.get((cmd_class, None))
+                if action:
+                    return action
+        return None
 
     def handle(self, cmd: ICommand, exc: Exception):
         """
         Обработать исключение для команды.
-        В случае если правило для переданной пары (команда + исключение) существует правило - вызывается действие
-         определенное для этого правила. Иначе вызывается переданное исключение.
+        Правило подбирается по классам команды и исключения с учетом наследования (см. find_action). Найденное
+        для пары типов правило запоминается, поэтому повторная обработка такой же ошибки - один поиск в словаре.
+        Если правило существует - вызывается действие определенное для этого правила. Иначе вызывается переданное
+        исключение.
         :param cmd: экземпляр команды
         :param exc: экземпляр исключения
         :return:
         """
-        action = self.rules.get((cmd.__class__, exc.__class__))
-        if not action:
-            # Пытаемся найти правило для произвольного исключения
-            action = self.rules.get((cmd.__class__, None))
+        cause = exc.__cause__ if self.unwrap_causes and isinstance(exc, CommandException) else None
+        key = (cmd.__class__, exc.__class__, cause.__class__ if cause is not None else None)
+
+        try:
+            action, handle_cause = self.index[key]
+        except KeyError:
+            action, handle_cause = None, False
+            if cause is not None:
+                action = self.find_action(cmd.__class__, cause.__class__, any_exception=False)
+                handle_cause = action is not None
+            if action is None:
+                action = self.find_action(cmd.__class__, exc.__class__)
+            self.index[key] = (action, handle_cause)
 
         if action:
-            action(cmd, exc)
+            action(cmd, cause if handle_cause else exc)
         else:
             raise exc
+
+
+logger = logging.getLogger(__name__)
+
+
+class UnhandledStats:
+    """Счетчики необработанных исключений одной пары (тип команды, тип исключения)"""
+
+    __slots__ = ('total', 'suppressed', 'next_report')
+
+    def __init__(self):
+        self.total = 0  # Всего исключений
+        self.suppressed = 0  # Исключений с последней записи в лог
+        self.next_report = 0.0  # Момент по часам time.monotonic, раньше которого запись в лог не делается
+
+
+class UnhandledExceptions:
+    """
+    Учет необработанных исключений. Исключения считаются по паре (тип команды, тип исключения): первое исключение
+    пары записывается в лог сразу, следующие - не чаще раза в report_interval секунд вместе с числом исключений,
+    не попавших в лог. Поток одинаковых ошибок не приводит к записи в лог на каждую команду.
+    """
+
+    def __init__(self, report_interval: float = 10.0):
+        self.report_interval = report_interval
+        self.stats = {}  # (тип команды, тип исключения) -> UnhandledStats
+        self.lock = Lock()
+
+    def record(self, cmd: ICommand, exc: Exception) -> None:
+        now = monotonic()
+        key = (cmd.__class__, exc.__class__)
+        with self.lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = UnhandledStats()
+            stats.total += 1
+            if now < stats.next_report:
+                stats.suppressed += 1
+                return
+            suppressed, stats.suppressed = stats.suppressed, 0
+            stats.next_report = now + self.report_interval
+            total = stats.total
+
+        logger.error(
+            'Unhandled exception %r for %s (%d more since the last report, %d in total)',
+            exc, cmd.__class__.__name__, suppressed, total,
+            exc_info=exc
+        )
+
+    def get_counts(self) -> dict:
+        """Число необработанных исключений по парам (тип команды, тип исключения)"""
+        with self.lock:
+            return {key: stats.total for key, stats in self.stats.items()}
+
+
+unhandled_exceptions = UnhandledExceptions()
+
+
+def handle_exception(cmd: ICommand, exc: Exception):
+    """
+    Обработать исключение команды с помощью зарегистрированного в IoC обработчика ошибок.
+    Необработанные исключения не выбрасываются дальше, чтобы не прерывать цикл выполнения команд,
+    а учитываются в unhandled_exceptions.
+    """
+    try:
+        exc_handler = IoC.resolve('ExceptionHandler')
+        exc_handler.handle(cmd, exc)
+    except Exception as unhandled_e:
+        unhandled_exceptions.record(cmd, unhandled_e)
@@ -1,2 +1,10 @@
 class CommandException(Exception):
     pass
+
+
+class BatchCommandException(CommandException):
+    """Ошибка групповой команды для части объектов игры"""
+
+    def __init__(self, message, object_ids):
+        super().__init__(message)
+        self.object_ids = object_ids
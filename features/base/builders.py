@@ -1,13 +1,45 @@
+import weakref
+
 from features.base.commands import MacroCommand
 from features.base.interfaces import UObject
 from iocs import IoC
 
 
+class OperationPlan:
+    """Скомпилированное описание операции - фабрики команд, из которых операция собирается для объекта"""
+
+    def __init__(self, factories: list):
+        self.factories = factories
+
+    def bind(self, obj: UObject) -> MacroCommand:
+        """Собрать операцию для объекта без обращения к IoC за описанием и фабриками команд"""
+        return MacroCommand([factory(obj) for factory in self.factories])
+
+
 class OperationBuilder:
+    """
+    Строит операцию по описанию '{операция}.Description' - списку ключей IoC фабрик команд.
+
+    Описание и фабрики разрешаются один раз для скоупа и хранятся в виде OperationPlan. План строится заново,
+    если в скоупе менялись зависимости (Scope.generation).
+    """
+
     def __init__(self, name):
         self.operation_name = name
+        self.plans = weakref.WeakKeyDictionary()  # Скоуп -> (поколение, план)
+
+    def compile(self, scope) -> OperationPlan:
+        command_names = scope.resolve(f'{self.operation_name}.Description')
+        return OperationPlan([scope.get_strategy(c) for c in command_names])
+
+    def get_plan(self) -> OperationPlan:
+        scope = IoC.resolve('Scopes.Current') or IoC.resolve('Scopes.Root')
+
+        generation, plan = self.plans.get(scope, (None, None))
+        if generation != scope.generation:
+            plan = self.compile(scope)
+            self.plans[scope] = (scope.generation, plan)
+        return plan
 
     def build(self, obj: UObject):
-        command_names = IoC.resolve(f'{self.operation_name}.Description')
-        commands = [IoC.resolve(c, obj) for c in command_names]
-        return MacroCommand(commands)
+        return self.get_plan().bind(obj)
@@ -1,7 +1,8 @@
 import inspect
+import weakref
 from typing import Iterable
 
-from exceptions import CommandException
+from exceptions import CommandException, BatchCommandException
 from iocs import IoC
 from .interfaces import ICommand, UObject
 
@@ -15,7 +16,7 @@ class MacroCommand(ICommand):
             for cmd in self.commands:
                 cmd.execute()
         except Exception as e:
-            raise CommandException(e)
+            raise CommandException(e) from e
 
 
 class GetProperty(ICommand):
@@ -37,6 +38,29 @@ class SetProperty(ICommand):
         self.obj.set_property(self.key, self.value)
 
 
+class PropertyGetter:
+    """
+    Стратегия IoC для геттера адаптера, читающего свойство объекта: PropertyGetter('position')(obj).
+    В отличие от произвольной функции, скомпилированный адаптер распознает эту стратегию и читает свойство напрямую.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def __call__(self, obj: UObject) -> object:
+        return obj.get_property(self.key)
+
+
+class PropertySetter:
+    """Стратегия IoC для сеттера адаптера, возвращающая команду SetProperty: PropertySetter('position')(obj, value)"""
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def __call__(self, obj: UObject, value: object) -> SetProperty:
+        return SetProperty(obj, self.key, value)
+
+
 class LambdaCommand(ICommand):
     def __init__(self, action):
         self.action = action
@@ -87,9 +111,30 @@ class InitCreateCommandAdapterStrategy(ICommand):
 
             def get_field_2(self):
                 return IoC.resolve('IActionable:field_2.get', self.obj)
+
+    В режиме компиляции (compiled=True) стратегии 'IActionable:field_1.get' и т.д. разрешаются один раз при создании
+    класса адаптера, а методы адаптера вызывают их без обращения к IoC. Стратегии PropertyGetter и PropertySetter
+    заменяются прямым обращением к свойству объекта, а для объектов с direct_storage - чтением словаря storage:
+
+        class IActionableAdapter(IActionable):
+            def get_field_1(self):
+                return self.obj.storage['field_1']
+
+            def set_field_1(self, value):
+                self.obj.set_property('field_1', value)
+
+    Скомпилированный класс зависит от скоупа, в котором разрешены стратегии, и от класса объекта. Классы кэшируются
+    для каждого скоупа и перестраиваются при изменении его поколения (Scope.generation), т.е. при регистрации
+    зависимостей. Уже созданные адаптеры продолжают использовать стратегии, действовавшие при их создании.
     """
 
     adapters = {}  # Ранее созданные адаптеры
+    object_adapters = weakref.WeakKeyDictionary()  # Объект -> {интерфейс: адаптер}
+    compiled_adapters = weakref.WeakKeyDictionary()  # Скоуп -> {(интерфейс, класс объекта): (поколение, адаптер)}
+
+    def __init__(self, compiled: bool = False):
+        """:param compiled: создавать адаптеры со стратегиями, разрешенными при создании класса адаптера"""
+        self.compiled = compiled
 
     def function_factory(self, interface, f_name):
         """Создает метод для генерируемого класса адаптера"""
@@ -98,27 +143,61 @@ class InitCreateCommandAdapterStrategy(ICommand):
 
         if op_type == 'set':
             def new_f(self, *args, **kwargs):
-                IoC.resolve(ioc_path, self.obj, *args, **kwargs).execute()
+                IoC.resolve(ioc_path, self.ref(), *args, **kwargs).execute()
         elif op_type == 'get':
             def new_f(self, *args, **kwargs):
-                return IoC.resolve(ioc_path, self.obj, *args, **kwargs)
+                return IoC.resolve(ioc_path, self.ref(), *args, **kwargs)
         else:
             raise CreateAdapterException(f"'{op_type}' is not allowd operation type!")
 
         return new_f
 
+    @staticmethod
+    def adapter_class_attributes(interface) -> dict:
+        """
+        Общие атрибуты генерируемых классов адаптеров. Экземпляр адаптера хранит только функцию ref,
+        возвращающую объект (см. get_adapter)
+        """
+        def constructor(self, ref):
+            self.ref = ref
+
+        return {
+            '__slots__': ('ref',),
+            '__init__': constructor,
+            'obj': property(lambda self: self.ref())
+        }
+
+    def get_adapter(self, interface, adapter_class, obj):
+        """
+        Адаптер adapter_class для объекта obj.
+
+        Адаптеры хранятся в object_adapters - словаре со слабыми ссылками на объекты, поэтому команды, разрешаемые
+        для объекта каждый такт, получают один и тот же адаптер. Адаптер ссылается на объект слабой ссылкой:
+        иначе словарь удерживал бы объект через свой же адаптер. Адаптер освобождается вместе с объектом
+        без участия сборщика циклов, а объект, пока его адаптер используется, должен принадлежать игре.
+        Для интерфейса хранится один адаптер: адаптер устаревшего класса (скомпилированного до регистрации
+        зависимостей) заменяется новым. Объекты, на которые нельзя создать слабую ссылку, получают новый
+        адаптер, удерживающий объект.
+        """
+        try:
+            adapters = self.object_adapters.get(obj)
+            if adapters is None:
+                adapters = self.object_adapters[obj] = {}
+        except TypeError:
+            return adapter_class(lambda: obj)
+
+        adapter = adapters.get(interface)
+        if adapter is None or adapter.__class__ is not adapter_class:
+            adapter = adapters[interface] = adapter_class(weakref.ref(obj))
+        return adapter
+
     def create_adapter(self, interface):
         """Создание адаптера"""
         if interface in self.adapters:
             # Пользуемся адаптерами созданными ранее
             return self.adapters[interface]
 
-        def constructor(self, obj):
-            self.obj = obj
-
-        class_methods = {
-            '__init__': constructor
-        }
+        class_methods = self.adapter_class_attributes(interface)
 
         for f_name, f in inspect.getmembers(interface, predicate=inspect.isfunction):
             class_methods[f_name] = self.function_factory(interface, f_name)
@@ -128,9 +207,84 @@ class InitCreateCommandAdapterStrategy(ICommand):
 
         return adapter
 
+    def compiled_function_factory(self, interface, f_name, scope, obj_type):
+        """Создает метод скомпилированного адаптера"""
+        op_type, property_name = f_name.split('_', 1)
+        ioc_path = f'{interface.__name__}:{property_name}.{op_type}'
+
+        if op_type not in ('get', 'set'):
+            raise CreateAdapterException(f"'{op_type}' is not allowd operation type!")
+
+        try:
+            strategy = scope.get_strategy(ioc_path)
+        except KeyError:
+            # Стратегия еще не зарегистрирована - разрешаем ее при вызове, как в обычном адаптере
+            return self.function_factory(interface, f_name)
+
+        if op_type == 'get':
+            if isinstance(strategy, PropertyGetter):
+                key = strategy.key
+                if getattr(obj_type, 'direct_storage', False):
+                    def new_f(self):
+                        return self.ref().storage[key]
+                else:
+                    def new_f(self):
+                        return self.ref().get_property(key)
+            else:
+                def new_f(self, *args, **kwargs):
+                    return strategy(self.ref(), *args, **kwargs)
+        else:
+            if isinstance(strategy, PropertySetter):
+                key = strategy.key
+
+                # Запись идет через set_property, чтобы объект мог отследить изменение свойства
+                def new_f(self, value):
+                    self.ref().set_property(key, value)
+            else:
+                def new_f(self, *args, **kwargs):
+                    strategy(self.ref(), *args, **kwargs).execute()
+
+        return new_f
+
+    def compile_adapter(self, interface, obj_type):
+        """Создание скомпилированного адаптера для текущего скоупа"""
+        scope = IoC.resolve('Scopes.Current') or IoC.resolve('Scopes.Root')
+        adapters = self.compiled_adapters.get(scope)
+        if adapters is None:
+            adapters = self.compiled_adapters[scope] = {}
+
+        generation, adapter = adapters.get((interface, obj_type), (None, None))
+        if generation == scope.generation:
+            return adapter
+
+        class_methods = self.adapter_class_attributes(interface)
+
+        for f_name, f in inspect.getmembers(interface, predicate=inspect.isfunction):
+            class_methods[f_name] = self.compiled_function_factory(interface, f_name, scope, obj_type)
+
+        adapter = type(f'{interface.__name__}Adapter', (interface,), class_methods)
+        adapters[(interface, obj_type)] = (scope.generation, adapter)
+
+        return adapter
+
     def execute(self) -> None:
+        if self.compiled:
+            strategy = lambda interface, obj: self.get_adapter(
+                interface, self.compile_adapter(interface, type(obj)), obj
+            )
+        else:
+            strategy = lambda interface, obj: self.get_adapter(interface, self.create_adapter(interface), obj)
+
         IoC.resolve(
             'IoC.Register',
             'Adapter',
-            lambda interface, obj: self.create_adapter(interface)(obj)
+            strategy
         ).execute()
+
+
+def columnar_storage(command_name: str):
+    """Колоночное хранилище объектов текущей игры для групповой команды"""
+    try:
+        return IoC.resolve('Objects.Storage')
+    except KeyError:
+        raise BatchCommandException(f'{command_name} requires a game with columnar objects', []) from None
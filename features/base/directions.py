@@ -0,0 +1,42 @@
+import math
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+
+@lru_cache(maxsize=64)
+def direction_vectors(directions_number: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Таблица единичных векторов для всех направлений [0, directions_number).
+    Углы и тригонометрия вычисляются так же, как и при расчете скорости одного объекта,
+    поэтому результаты групповой и поштучной обработки совпадают.
+    Таблицы кэшируются и общие для всех игр, поэтому массивы доступны только для чтения.
+    """
+    step = 2 * math.pi / directions_number
+    cos = np.array([math.cos(step * direction) for direction in range(directions_number)])
+    sin = np.array([math.sin(step * direction) for direction in range(directions_number)])
+    cos.flags.writeable = False
+    sin.flags.writeable = False
+    return cos, sin
+
+
+@lru_cache(maxsize=4096)
+def velocity_vector(directions_number: int, direction: int, velocity_modulus) -> np.ndarray:
+    """
+    Вектор скорости объекта. Зависит только от аргументов, поэтому результат кэшируется и не требует инвалидации
+    при изменении направления или модуля скорости объекта. Массив доступен только для чтения.
+    """
+    if 0 <= direction < directions_number:
+        cos, sin = direction_vectors(directions_number)
+        cos, sin = cos[direction], sin[direction]
+    else:
+        angle = (2 * math.pi / directions_number) * direction
+        cos, sin = math.cos(angle), math.sin(angle)
+
+    velocity = np.array([
+        round(velocity_modulus * cos),
+        round(velocity_modulus * sin)
+    ])
+    velocity.flags.writeable = False
+    return velocity
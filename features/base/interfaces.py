@@ -8,6 +8,8 @@ class ICommand(ABC):
 
 
 class UObject(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def get_property(self, key: str) -> object:
         ...
@@ -1,9 +1,8 @@
-import math
-
 import numpy as np
 
-from exceptions import CommandException
-from features.base.commands import GetProperty, SetProperty
+from exceptions import CommandException, BatchCommandException
+from features.base.commands import GetProperty, PropertyGetter, PropertySetter, columnar_storage
+from features.base.directions import direction_vectors, velocity_vector
 from features.base.interfaces import ICommand
 from iocs import IoC
 from .interfaces import IMovable, IFuelable, IMovementStartable
@@ -17,6 +16,28 @@ class Move(ICommand):
         self.m.set_position(self.m.get_position() + self.m.get_velocity())
 
 
+class InPlaceMove(ICommand):
+    """
+    Move без создания нового массива позиции: скорость прибавляется к хранимому массиву позиции на месте.
+    Позиция все равно записывается через set_position, чтобы объект отметил ее изменение.
+    Подходит для объектов, которые возвращают из get_position сам хранимый массив (GameObject), и только если
+    этот массив не используется где-то еще.
+    """
+
+    def __init__(self, movable: IMovable):
+        self.m = movable
+
+    def execute(self):
+        position = self.m.get_position()
+        velocity = self.m.get_velocity()
+        try:
+            np.add(position, velocity, out=position)
+        except (TypeError, ValueError, AttributeError):
+            # Позиция не массив, доступна только для чтения или ее тип не вмещает результат
+            position = position + velocity
+        self.m.set_position(position)
+
+
 class CheckFuel(ICommand):
     def __init__(self, fuelable: IFuelable):
         self.obj = fuelable
@@ -34,6 +55,65 @@ class BurnFuel(ICommand):
         self.obj.set_fuel_level(self.obj.get_fuel_level() - self.obj.get_fuel_consumption())
 
 
+def batch_velocities(velocity_modulus: np.ndarray, direction: np.ndarray, directions_number: np.ndarray) -> np.ndarray:
+    """Векторы скорости для массива объектов с округлением как в MoveCommandPluginCommand.get_velocity"""
+    vx = np.empty(len(direction), dtype=np.float64)
+    vy = np.empty(len(direction), dtype=np.float64)
+
+    for number in np.unique(directions_number):
+        selected = directions_number == number
+        cos, sin = direction_vectors(int(number))
+        d = direction[selected] % number
+        vx[selected] = velocity_modulus[selected] * cos[d]
+        vy[selected] = velocity_modulus[selected] * sin[d]
+
+    # np.rint, как и round, округляет половины к ближайшему четному
+    return np.stack((np.rint(vx), np.rint(vy)), axis=1).astype(np.int64)
+
+
+class BatchMovement(ICommand):
+    """
+    Движение всех объектов игры за один шаг (CheckFuel + Move + BurnFuel) над колонками ColumnarStorage.
+
+    Двигаются объекты, у которых заданы все необходимые свойства. Объекты без достаточного количества топлива
+    остаются на месте: после движения остальных объектов команда выбрасывает BatchCommandException
+    с их идентификаторами.
+    """
+
+    properties = ('position', 'velocity', 'direction', 'directions_number', 'fuel_level', 'fuel_consumption')
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def execute(self) -> None:
+        storage = self.storage
+        if not storage.size or any(key not in storage.columns for key in self.properties):
+            return
+
+        movable = np.logical_and.reduce([storage.mask(key) for key in self.properties])
+
+        fuel_consumption = storage.column('fuel_consumption')
+        # Как и BurnFuel, списание дробного расхода делает уровень топлива дробным
+        fuel_level = storage.widen('fuel_level', fuel_consumption.dtype)
+        enough_fuel = fuel_level >= fuel_consumption
+
+        rows = np.flatnonzero(movable & enough_fuel)
+        if len(rows):
+            velocity = batch_velocities(
+                storage.column('velocity')[rows],
+                storage.column('direction')[rows],
+                storage.column('directions_number')[rows]
+            )
+            storage.widen('position', velocity.dtype)[rows] += velocity
+            fuel_level[rows] -= fuel_consumption[rows]
+            storage.mark_dirty('position', rows)
+            storage.mark_dirty('fuel_level', rows)
+
+        failed_rows = np.flatnonzero(movable & ~enough_fuel)
+        if len(failed_rows):
+            raise BatchCommandException('Not enough fuel', storage.get_ids(failed_rows.tolist()))
+
+
 class StartMovement(ICommand):
     def __init__(self, obj: IMovementStartable, initial_velocity: int):
         self.initial_velocity = initial_velocity
@@ -51,13 +131,13 @@ class MoveCommandPluginCommand(ICommand):
         IoC.resolve(
             'IoC.Register',
             'IMovable:position.get',
-            lambda obj: GetProperty(obj, "position").execute()
+            PropertyGetter("position")
         ).execute()
 
         IoC.resolve(
             'IoC.Register',
             'IMovable:position.set',
-            lambda obj, value: SetProperty(obj, "position", value)
+            PropertySetter("position")
         ).execute()
 
         def get_velocity(obj):
@@ -65,11 +145,7 @@ class MoveCommandPluginCommand(ICommand):
             directions_number = GetProperty(obj, "directions_number").execute()
             velocity_modulus = GetProperty(obj, "velocity").execute()
 
-            angle = (2 * math.pi / directions_number) * direction
-            return (np.array([
-                round(velocity_modulus * math.cos(angle)),
-                round(velocity_modulus * math.sin(angle))
-            ]))
+            return velocity_vector(directions_number, direction, velocity_modulus)
 
         IoC.resolve(
             'IoC.Register',
@@ -83,10 +159,22 @@ class MoveCommandPluginCommand(ICommand):
             lambda obj: Move(IoC.resolve("Adapter", IMovable, obj))
         ).execute()
 
+        IoC.resolve(
+            'IoC.Register',
+            'Commands.Move.InPlace',
+            lambda obj: InPlaceMove(IoC.resolve("Adapter", IMovable, obj))
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Commands.Move.Batch',
+            lambda: BatchMovement(columnar_storage('Commands.Move.Batch'))
+        ).execute()
+
         IoC.resolve(
             'IoC.Register',
             'IMovementStartable:velocity.set',
-            lambda obj, value: SetProperty(obj, "velocity", value)
+            PropertySetter("velocity")
         ).execute()
 
         IoC.resolve(
@@ -107,19 +195,19 @@ class FuelCommandsPluginCommand(ICommand):
         IoC.resolve(
             'IoC.Register',
             'IFuelable:fuel_level.get',
-            lambda obj: GetProperty(obj, "fuel_level").execute()
+            PropertyGetter("fuel_level")
         ).execute()
 
         IoC.resolve(
             'IoC.Register',
             'IFuelable:fuel_level.set',
-            lambda obj, value: SetProperty(obj, "fuel_level", value)
+            PropertySetter("fuel_level")
         ).execute()
 
         IoC.resolve(
             'IoC.Register',
             'IFuelable:fuel_consumption.get',
-            lambda obj: GetProperty(obj, "fuel_consumption").execute()
+            PropertyGetter("fuel_consumption")
         ).execute()
 
         IoC.resolve(
@@ -6,6 +6,8 @@ from features.base.interfaces import UObject
 
 
 class IMovable(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def get_position(self) -> np.array:
         ...
@@ -20,6 +22,8 @@ class IMovable(ABC):
 
 
 class IFuelable(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def get_fuel_level(self) -> int:
         ...
@@ -34,6 +38,8 @@ class IFuelable(ABC):
 
 
 class IMovementStartable(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def set_velocity(self, v: int) -> None:
         ...
@@ -3,7 +3,8 @@ from typing import Union
 
 import numpy as np
 
-from features.base.commands import MacroCommand, GetProperty, SetProperty
+from features.base.commands import MacroCommand, GetProperty, PropertyGetter, PropertySetter, columnar_storage
+from features.base.directions import direction_vectors
 from features.base.interfaces import ICommand
 from features.rotation.interfaces import IVelocityChangeable, IRotatable
 from iocs import IoC
@@ -48,31 +49,91 @@ class RotateWithChangeVelocity(ICommand):
         ]).execute()
 
 
+def batch_change_velocities(velocity: np.ndarray, cos: np.ndarray, sin: np.ndarray) -> np.ndarray:
+    """
+    Поворот векторов скорости массива объектов на углы, заданные косинусами и синусами.
+    Модуль скорости и округление вычисляются так же, как в ChangeVelocity.
+    """
+    velocity_modulus = np.sqrt((velocity ** 2).sum(axis=1))
+    # np.rint, как и round, округляет половины к ближайшему четному
+    return np.stack((np.rint(velocity_modulus * cos), np.rint(velocity_modulus * sin)), axis=1).astype(np.int64)
+
+
+class BatchRotate(ICommand):
+    """
+    Поворот всех объектов игры за один шаг над колонками ColumnarStorage.
+
+    Для объектов с заданными direction, angular_velocity и directions_number направление меняется как в Rotate.
+    Если скорость объекта хранится вектором, он поворачивается в новое направление как в ChangeVelocity.
+    """
+
+    properties = ('direction', 'angular_velocity', 'directions_number')
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def execute(self) -> None:
+        storage = self.storage
+        if not storage.size or any(key not in storage.columns for key in self.properties):
+            return
+
+        rotatable = np.logical_and.reduce([storage.mask(key) for key in self.properties])
+        rows = np.flatnonzero(rotatable)
+        if not len(rows):
+            return
+
+        direction = storage.column('direction')
+        directions_number = storage.column('directions_number')[rows]
+        direction[rows] = (direction[rows] + storage.column('angular_velocity')[rows]) % directions_number
+        storage.mark_dirty('direction', rows)
+
+        velocity = storage.columns.get('velocity')
+        if velocity is None or velocity.ndim != 2:
+            # Скорость задана модулем - вектор скорости вычисляется из направления при движении
+            return
+
+        rows_with_velocity = storage.mask('velocity')[rows]
+        rows = rows[rows_with_velocity]
+        directions_number = directions_number[rows_with_velocity]
+
+        cos = np.empty(len(rows), dtype=np.float64)
+        sin = np.empty(len(rows), dtype=np.float64)
+        for number in np.unique(directions_number):
+            selected = directions_number == number
+            cos_table, sin_table = direction_vectors(int(number))
+            cos[selected] = cos_table[direction[rows[selected]]]
+            sin[selected] = sin_table[direction[rows[selected]]]
+
+        velocity = storage.column('velocity')
+        velocity[rows] = batch_change_velocities(velocity[rows], cos, sin)
+        storage.mark_dirty('velocity', rows)
+
+
 class RotateCommandsPluginCommand(ICommand):
     def execute(self) -> None:
         # IRotatable
         IoC.resolve(
             'IoC.Register',
             'IRotatable:direction.get',
-            lambda obj: GetProperty(obj, "direction").execute()
+            PropertyGetter("direction")
         ).execute()
 
         IoC.resolve(
             'IoC.Register',
             'IRotatable:direction.set',
-            lambda obj, value: SetProperty(obj, "direction", value)
+            PropertySetter("direction")
         ).execute()
 
         IoC.resolve(
             'IoC.Register',
             'IRotatable:angular_velocity.get',
-            lambda obj: GetProperty(obj, "angular_velocity").execute()
+            PropertyGetter("angular_velocity")
         ).execute()
 
         IoC.resolve(
             'IoC.Register',
             'IRotatable:directions_number.get',
-            lambda obj: GetProperty(obj, "directions_number").execute()
+            PropertyGetter("directions_number")
         ).execute()
 
         # IVelocityChangeable
@@ -85,7 +146,7 @@ class RotateCommandsPluginCommand(ICommand):
         IoC.resolve(
             'IoC.Register',
             'IVelocityChangeable:velocity.set',
-            lambda obj, value: SetProperty(obj, "velocity", value)
+            PropertySetter("velocity")
         ).execute()
 
         IoC.resolve(
@@ -101,6 +162,12 @@ class RotateCommandsPluginCommand(ICommand):
             lambda obj: Rotate(IoC.resolve("Adapter", IRotatable, obj))
         ).execute()
 
+        IoC.resolve(
+            'IoC.Register',
+            'Commands.Rotate.Batch',
+            lambda: BatchRotate(columnar_storage('Commands.Rotate.Batch'))
+        ).execute()
+
         IoC.resolve(
             'IoC.Register',
             'Commands.ChangeVelocity',
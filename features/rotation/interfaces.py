@@ -4,6 +4,8 @@ import numpy as np
 
 
 class IRotatable(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def get_direction(self) -> int:
         ...
@@ -22,6 +24,8 @@ class IRotatable(ABC):
 
 
 class IVelocityChangeable(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def get_velocity(self) -> np.array:
         ...
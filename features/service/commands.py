@@ -1,4 +1,8 @@
+from random import Random
+from time import monotonic
+
 from features.base.interfaces import ICommand
+from iocs import IoC
 
 
 class Log(ICommand):
@@ -24,3 +28,113 @@ class DoubleRetry(ICommand):
 
     def execute(self) -> None:
         self.cmd.execute()
+
+
+class ScheduledRetry(ICommand):
+    """
+    Повтор команды, отложенный политикой RetryPolicy. Выполняется в скоупе, в котором выполнялась
+    повторяемая команда (например, в скоупе игры).
+    """
+
+    def __init__(self, cmd: ICommand, attempt: int, scope_id=None):
+        """:param attempt: номер повтора, начиная с 1"""
+        self.cmd = cmd
+        self.attempt = attempt
+        self.scope_id = scope_id
+        # Повтор команды игры выполняется потоком этой игры
+        self.game_id = getattr(cmd, 'game_id', None)
+
+    def execute(self) -> None:
+        if self.scope_id is not None:
+            IoC.resolve('Scopes.Current.Set', self.scope_id).execute()
+        self.cmd.execute()
+
+
+class RetryPolicy:
+    """
+    Политика повтора команд для ExceptionHandler: exc_handler.setup(ICommand, None, policy.handle).
+
+    Упавшая команда не выполняется повторно сразу, а откладывается с экспоненциально растущей задержкой со
+    случайным разбросом, поэтому повторы не блокируют поток и не нагружают ресурс, из-за которого произошла ошибка.
+    Повтор команды игры откладывается в очередь этой игры (Queue.PutNotBefore) и выполняется в ее такте, повтор
+    остальных команд - в очередь потока (Thread.PutNotBefore). Число повторов ограничено для каждой команды
+    (max_attempts) и для каждого типа команд за период времени (budget). Когда повторять больше нельзя,
+    вызывается give_up - по умолчанию в очередь потока ставится команда Log.
+    """
+
+    def __init__(
+            self,
+            max_attempts: int = 3,
+            base_delay: float = 0.05,
+            max_delay: float = 5.0,
+            jitter: float = 0.5,
+            budget: int = None,
+            budget_period: float = 1.0,
+            give_up=None,
+            clock=monotonic,
+            rng: Random = None
+    ):
+        """
+        :param max_attempts: максимальное число повторов одной команды
+        :param base_delay: задержка перед первым повтором, с; каждый следующий повтор откладывается вдвое дольше
+        :param max_delay: максимальная задержка, с
+        :param jitter: доля задержки, на которую она случайно уменьшается (0 - без разброса)
+        :param budget: максимальное число повторов команд одного типа за budget_period, None - без ограничения
+        :param budget_period: период бюджета повторов, с
+        :param give_up: действие give_up(cmd, exc) для команды, которую больше нельзя повторять
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.budget = budget
+        self.budget_period = budget_period
+        self.give_up = give_up or self.log
+        self.clock = clock
+        self.rng = rng or Random()
+        self.budgets = {}  # Тип команды -> [начало периода, число повторов за период]
+
+    @staticmethod
+    def log(cmd: ICommand, exc: Exception) -> None:
+        IoC.resolve('Thread.Put', Log(cmd, exc)).execute()
+
+    def get_delay(self, attempt: int) -> float:
+        delay = min(self.base_delay * 2 ** (attempt - 1), self.max_delay)
+        return delay * (1 - self.jitter * self.rng.random())
+
+    def spend_budget(self, cmd_type, now: float) -> bool:
+        """Учесть повтор команды типа cmd_type; False - бюджет повторов исчерпан"""
+        if self.budget is None:
+            return True
+
+        budget = self.budgets.get(cmd_type)
+        if budget is None or now - budget[0] >= self.budget_period:
+            budget = self.budgets[cmd_type] = [now, 0]
+        if budget[1] >= self.budget:
+            return False
+        budget[1] += 1
+        return True
+
+    def handle(self, cmd: ICommand, exc: Exception) -> None:
+        if isinstance(cmd, ScheduledRetry):
+            attempt = cmd.attempt + 1
+            scope_id = cmd.scope_id
+            cmd = cmd.cmd
+        else:
+            attempt = 1
+            scope = IoC.resolve('Scopes.Current')
+            scope_id = scope.id if scope is not None else None
+
+        now = self.clock()
+        if attempt > self.max_attempts or not self.spend_budget(cmd.__class__, now):
+            self.give_up(cmd, exc)
+            return
+
+        retry = ScheduledRetry(cmd, attempt, scope_id)
+        not_before = now + self.get_delay(attempt)
+        try:
+            # Команда выполнялась в скоупе игры - повтор остается в очереди игры
+            put = IoC.resolve('Queue.PutNotBefore', retry, not_before)
+        except KeyError:
+            put = IoC.resolve('Thread.PutNotBefore', retry, not_before)
+        put.execute()
@@ -1,19 +1,38 @@
+import math
+from collections import deque
+from itertools import count
+from time import monotonic, perf_counter
+
 import numpy as np
 
+from exception_handler import handle_exception
 from features.base.commands import LambdaCommand
 from features.base.interfaces import ICommand, UObject
 from iocs import IoC
+from thread.commands import TimerHeap
+from thread.interfaces import ISchedulable
+from .journal import ChangeJournal
+from .snapshots import SnapshotPublisher, print_snapshot
+from .storage import ColumnarStorage
 
 
 class GameObject(UObject):
-    def __init__(self):
+    # Свойства хранятся в словаре storage и читаются без дополнительной логики,
+    # поэтому скомпилированные адаптеры читают их из storage напрямую
+    direct_storage = True
+
+    def __init__(self, journal: ChangeJournal = None):
+        """:param journal: журнал изменений игры, в который записываются изменения свойств"""
         self.storage = {}
+        self.journal = journal
 
     def get_property(self, key: str) -> object:
         return self.storage[key]
 
     def set_property(self, key: str, value: object) -> None:
         self.storage[key] = value
+        if self.journal is not None:
+            self.journal.record(self, key)
 
 
 class GameRepeatedCommand(ICommand):
@@ -32,17 +51,78 @@ class InterpretGameCommand(ICommand):
 
     def execute(self) -> None:
         IoC.resolve('Scopes.Current.Set', self.game_id).execute()
-        game_obj = IoC.resolve('Objects.Get', self.operation.pop('object_id'))
         operation_name = self.operation.pop('name')
 
-        operation = IoC.resolve(f'Operations.{operation_name}', game_obj, **self.operation)
+        if 'object_id' in self.operation:
+            game_obj = IoC.resolve('Objects.Get', self.operation.pop('object_id'))
+            operation = IoC.resolve(f'Operations.{operation_name}', game_obj, **self.operation)
+        else:
+            # Групповые операции выполняются над всеми объектами игры
+            operation = IoC.resolve(f'Operations.{operation_name}', **self.operation)
+
         IoC.resolve('Queue.Put', operation).execute()
 
 
-class GameCommand(ICommand):
-    def __init__(self, game_id):
+class TickLag:
+    """Отставание игры с фиксированным шагом от расписания тактов"""
+
+    def __init__(self):
+        self.ticks = 0  # Число тактов, выполнение которых начато
+        self.catch_up_ticks = 0  # Число тактов, выполненных сверх одного для нагона расписания
+        self.dropped_ticks = 0  # Число тактов, пропущенных сверх max_catch_up_ticks
+        self.last_lag = 0.0  # Отставание начала последних тактов от расписания, с
+        self.max_lag = 0.0  # Максимальное отставание от расписания, с
+
+    def record(self, lag: float, ticks: int, dropped: int) -> None:
+        self.ticks += ticks
+        self.catch_up_ticks += ticks - 1
+        self.dropped_ticks += dropped
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+
+
+class GameCommand(ICommand, ISchedulable):
+    def __init__(
+            self,
+            game_id,
+            columnar: bool = False,
+            max_commands: int = None,
+            time_budget_ms: float = None,
+            debug: bool = False,
+            move_in_place: bool = False,
+            tick_rate: float = None,
+            max_catch_up_ticks: int = 5,
+            track_changes: bool = False
+    ):
+        """
+        :param game_id: идентификатор игры
+        :param columnar: хранить объекты игры в колоночном хранилище ColumnarStorage вместо отдельных GameObject
+        :param max_commands: максимальное число команд, выполняемых за один такт игры
+        :param time_budget_ms: время в миллисекундах, после которого такт игры завершается
+        :param debug: выводить состояние объектов игры в stdout перед каждым тактом
+        :param move_in_place: выполнять Commands.Move игры как Commands.Move.InPlace - без создания нового массива
+                              позиции при каждом движении
+        :param tick_rate: число тактов игры в секунду. Если задано, такты выполняются по расписанию с фиксированным
+                          шагом, а не каждый раз, когда до игры доходит очередь в потоке
+        :param max_catch_up_ticks: максимальное число тактов, выполняемых подряд, если игра отстала от расписания;
+                                   остальные пропущенные такты не выполняются
+        :param track_changes: отслеживать изменения объектов игры (Objects.Changes.Reader). Без отслеживания
+                              подписчики на изменения получают полные снимки состояния игры
+        """
         self.game_id = game_id
-        self.queue = []
+        self.queue = deque()
+        self.delayed = TimerHeap()  # Команды игры, отложенные до заданного момента (Queue.PutNotBefore)
+        self.tick_left = 0
+        self.max_commands = max_commands
+        self.time_budget_ms = time_budget_ms
+        self.tick_interval = 1 / tick_rate if tick_rate else None
+        self.max_catch_up_ticks = max_catch_up_ticks
+        self.next_tick_time = None
+        self.ticks_due = 0
+        self.lag = TickLag()
+        self.snapshots = SnapshotPublisher(game_id, self.get_objects, self.get_changes_reader)
+        if debug:
+            self.snapshots.subscribe(print_snapshot, delta=False)
 
         IoC.resolve('Scopes.New', game_id)
         IoC.resolve('Scopes.Current.Set', game_id).execute()
@@ -50,7 +130,7 @@ class GameCommand(ICommand):
         IoC.resolve(
             'IoC.Register',
             'Queue.Put',
-            lambda cmd: LambdaCommand(lambda: self.queue.append(cmd))
+            lambda cmd: LambdaCommand(lambda: self.put(cmd))
         ).execute()
 
         IoC.resolve(
@@ -59,27 +139,45 @@ class GameCommand(ICommand):
             lambda cmd: IoC.resolve('Queue.Put', GameRepeatedCommand(cmd))
         ).execute()
 
-        game_objects = {}
+        # Отложенная команда попадает в очередь игры в начале первого такта после срока not_before
+        # (по часам time.monotonic). Вызывается только из команд этой игры - в ее потоке
+        IoC.resolve(
+            'IoC.Register',
+            'Queue.PutNotBefore',
+            lambda cmd, not_before: LambdaCommand(lambda: self.delayed.push(not_before, cmd))
+        ).execute()
 
         IoC.resolve(
             'IoC.Register',
-            'Objects.Add',
-            lambda obj_id, obj: LambdaCommand(lambda: game_objects.update({obj_id: obj}))
+            'Snapshots.Subscribe',
+            lambda sink, rate=None, delta=True: LambdaCommand(lambda: self.snapshots.subscribe(sink, rate, delta))
         ).execute()
 
         IoC.resolve(
             'IoC.Register',
-            'Objects.Get',
-            lambda obj_id: game_objects[obj_id]
+            'Game.Lag',
+            lambda: self.lag
         ).execute()
 
         IoC.resolve(
             'IoC.Register',
-            'Objects.All',
-            lambda: game_objects.values()
+            'Game.Stop',
+            lambda: LambdaCommand(self.stop)
         ).execute()
 
-        obj1 = GameObject()
+        if columnar:
+            self.register_columnar_objects(track_changes)
+        else:
+            self.register_objects(track_changes)
+
+        if move_in_place:
+            IoC.resolve(
+                'IoC.Register',
+                'Commands.Move',
+                lambda obj: IoC.resolve('Commands.Move.InPlace', obj)
+            ).execute()
+
+        obj1 = IoC.resolve('Objects.Create')
         obj1_id = 'obj-1'
         obj1.set_property('id', obj1_id)
         obj1.set_property('position', np.array([0, 0]))
@@ -90,7 +188,7 @@ class GameCommand(ICommand):
         obj1.set_property('fuel_consumption', 1)
         IoC.resolve('Objects.Add', obj1_id, obj1).execute()
 
-        obj2 = GameObject()
+        obj2 = IoC.resolve('Objects.Create')
         obj2_id = 'obj-2'
         obj2.set_property('id', obj2_id)
         obj2.set_property('position', np.array([0, 1000]))
@@ -101,39 +199,362 @@ class GameCommand(ICommand):
         obj2.set_property('fuel_consumption', 1)
         IoC.resolve('Objects.Add', obj2_id, obj2).execute()
 
+    @staticmethod
+    def register_objects(track_changes: bool = False):
+        """Объекты игры хранятся по отдельности, каждый в своем GameObject"""
+        game_objects = {}
+        object_ids = {}
+        journal = ChangeJournal(object_ids) if track_changes else None
+
+        def add(obj_id, obj):
+            game_objects[obj_id] = obj
+            object_ids[obj] = obj_id
+
+        IoC.resolve(
+            'IoC.Register',
+            'Objects.Create',
+            lambda: GameObject(journal)
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Objects.Add',
+            lambda obj_id, obj: LambdaCommand(lambda: add(obj_id, obj))
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Objects.Get',
+            lambda obj_id: game_objects[obj_id]
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Objects.All',
+            lambda: game_objects.values()
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Objects.Changes.Reader',
+            lambda: journal.reader() if journal is not None else None
+        ).execute()
+
+    @staticmethod
+    def register_columnar_objects(track_changes: bool = False):
+        """Свойства объектов игры хранятся в колонках ColumnarStorage, объекты - представления строк хранилища"""
+        storage = ColumnarStorage()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Objects.Storage',
+            lambda: storage
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Objects.Create',
+            lambda: storage.new_row()
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Objects.Add',
+            lambda obj_id, obj: LambdaCommand(lambda: storage.add(obj_id, obj))
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Objects.Get',
+            lambda obj_id: storage.get_object(obj_id)
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Objects.All',
+            lambda: storage.objects()
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Objects.Changes.Reader',
+            lambda: storage.changes_reader() if track_changes else None
+        ).execute()
+
     def execute(self) -> None:
+        self.drain()
+
+    def drain(self) -> None:
+        """
+        Выполнить такт игры.
+        Такт может быть ограничен числом команд и временем выполнения.
+        """
+        self.start_tick()
+
+        deadline = None
+        if self.time_budget_ms is not None:
+            deadline = perf_counter() + self.time_budget_ms / 1000
+
+        while self.has_work():
+            self.step()
+            if deadline is not None and perf_counter() >= deadline:
+                break
+
+    def get_id(self):
+        return self.game_id
+
+    def start_tick(self) -> None:
+        """
+        За такт выполняются команды, находившиеся в очереди на его начало: команды, поставленные в очередь во время
+        такта (например, повторяемые GameRepeatedCommand), выполнятся в следующем такте.
+        Перед тактом подписчикам рассылается снимок состояния игры, если для него пришло время.
+
+        С фиксированным шагом (tick_rate) новые такты начинаются только по расписанию: если срок очередного такта
+        не наступил, работы у игры нет.
+        """
+        if self.tick_interval is not None:
+            self.ticks_due = self.get_due_ticks(monotonic())
+            if not self.ticks_due:
+                return
+
+        self.snapshots.publish()
+
+        if self.tick_interval is None:
+            self.fill_tick()
+
+    def put(self, cmd: ICommand) -> None:
+        # Игра без фиксированного шага без команд не сообщает планировщику срок работы - команда в пустую очередь
+        # будит планировщик потока
+        wake = self.tick_interval is None and not self.queue
+        self.queue.append(cmd)
+        if wake:
+            IoC.resolve('Thread.Scheduler.Wake').execute()
+
+    def fill_tick(self) -> None:
+        if self.delayed:
+            self.queue.extend(self.delayed.pop_due(monotonic()))
+        self.tick_left = len(self.queue)
+        if self.max_commands is not None:
+            self.tick_left = min(self.tick_left, self.max_commands)
+
+    def next_due_time(self):
+        """
+        Срок следующего такта игры с фиксированным шагом; до него у игры нет работы.
+        Без фиксированного шага - срок ближайшей отложенной команды (None, если их нет).
+        """
+        if self.tick_interval is None:
+            return self.delayed.next_deadline()
+        return self.next_tick_time
+
+    def get_due_ticks(self, now: float) -> int:
+        """
+        Число тактов, срок которых наступил к моменту now. Если их больше max_catch_up_ticks, лишние такты
+        пропускаются: модельное время игры отстает, но поток не тратит все время на нагон одной игры.
+        """
+        if self.next_tick_time is None:
+            self.next_tick_time = now
+        if now < self.next_tick_time:
+            return 0
+
+        behind = int((now - self.next_tick_time) / self.tick_interval) + 1
+        ticks = min(behind, self.max_catch_up_ticks)
+        self.lag.record(now - self.next_tick_time, ticks, behind - ticks)
+        self.next_tick_time += behind * self.tick_interval
+        return ticks
+
+    def stop(self) -> None:
+        """Остановить игру: невыполненные команды отбрасываются, игра убирается из планировщика потока"""
+        self.queue.clear()
+        self.delayed = TimerHeap()
+        self.tick_left = 0
+        self.ticks_due = 0
+        IoC.resolve('Thread.Scheduler.Remove', self).execute()
+        IoC.resolve('Thread.Game.Release', self.game_id).execute()
+
+    def get_objects(self):
         IoC.resolve('Scopes.Current.Set', self.game_id).execute()
+        return IoC.resolve('Objects.All')
 
-        print(f'Game : {self.game_id}')
-        for obj in IoC.resolve('Objects.All'):
-            print('\t', f'{obj.get_property("id")}:')
-            print('\t\t', f'position: {obj.get_property("position")}')
-            print('\t\t', f'fuel_level: {obj.get_property("fuel_level")}')
-            print('\t\t', f'fuel_consumption: {obj.get_property("fuel_consumption")}')
-            print('\t\t', f'direction: {obj.get_property("direction")}')
-            print('\t\t', f'directions_number: {obj.get_property("directions_number")}')
-            print('\t\t', f'angular_velocity: {obj.get_property("angular_velocity")}')
-        print()
+    def get_changes_reader(self):
+        IoC.resolve('Scopes.Current.Set', self.game_id).execute()
+        return IoC.resolve('Objects.Changes.Reader')
 
-        try:
-            cmd = self.queue.pop(0)
-        except IndexError:
+    def has_work(self) -> bool:
+        if self.tick_interval is not None:
+            return self.ticks_due > 0
+        return self.tick_left > 0
+
+    def step(self) -> None:
+        IoC.resolve('Scopes.Current.Set', self.game_id).execute()
+
+        if self.tick_interval is None:
+            self.execute_next()
             return
 
-        cmd.execute()
+        # Такт с фиксированным шагом выполняется целиком: все операции кораблей такта видят одно и то же
+        # модельное время, независимо от того, сколько игр делят поток
+        self.ticks_due -= 1
+        self.fill_tick()
+        while self.tick_left > 0:
+            self.execute_next()
+
+    def execute_next(self) -> None:
+        self.tick_left -= 1
+        cmd = self.queue.popleft()
+        try:
+            cmd.execute()
+        except Exception as e:
+            # Ошибка одной команды не должна прерывать такт игры
+            handle_exception(cmd, e)
+
+
+class SubscribeCommand(ICommand):
+    def __init__(self, game_id, sink, rate: float = None):
+        """
+        :param sink: функция sink(game_id, objects), получающая изменения состояния игры
+        :param rate: число снимков состояния в секунду, None - после каждого такта игры
+        """
+        self.game_id = game_id
+        self.sink = sink
+        self.rate = rate
+
+    def execute(self) -> None:
+        IoC.resolve('Scopes.Current.Set', self.game_id).execute()
+        IoC.resolve('Snapshots.Subscribe', self.sink, self.rate).execute()
+
+
+class StopGameCommand(ICommand):
+    def __init__(self, game_id):
+        self.game_id = game_id
+
+    def execute(self) -> None:
+        IoC.resolve('Scopes.Current.Set', self.game_id).execute()
+        IoC.resolve('Game.Stop').execute()
+
+
+def flag_setting(value) -> bool:
+    if not isinstance(value, bool):
+        raise ValueError('expected true or false')
+    return value
+
+
+def positive_int_setting(value) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError('expected a positive integer')
+    return value
+
+
+def non_negative_int_setting(value) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError('expected a non-negative integer')
+    return value
+
+
+def positive_number_setting(value) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 < value < math.inf:
+        raise ValueError('expected a positive number')
+    return value
+
+
+# Параметры GameCommand, которые клиент может задать при создании игры, и их проверки.
+# game_id назначается сервером, debug выводит состояние игры в stdout сервера - клиенту они недоступны
+CLIENT_GAME_SETTINGS = {
+    'columnar': flag_setting,
+    'max_commands': positive_int_setting,
+    'time_budget_ms': positive_number_setting,
+    'move_in_place': flag_setting,
+    'tick_rate': positive_number_setting,
+    'max_catch_up_ticks': non_negative_int_setting,
+    'track_changes': flag_setting,
+}
+
+
+def validate_game_settings(settings: dict) -> dict:
+    """Проверить параметры игры из сообщения клиента; неизвестный или неверный параметр - ValueError"""
+    validated = {}
+    for key, value in settings.items():
+        validate = CLIENT_GAME_SETTINGS.get(key)
+        if validate is None:
+            raise ValueError(f"Unknown game setting '{key}'")
+        try:
+            validated[key] = validate(value)
+        except ValueError as e:
+            raise ValueError(f"Invalid game setting '{key}': {e}") from None
+    return validated
 
 
 class CreateGameCommand(ICommand):
-    id_counter = 1
+    id_counter = count(1)
+
+    def __init__(self, game_id=None, **game_settings):
+        """
+        Идентификатор игры выдается при создании команды, чтобы по нему можно было выбрать поток,
+        в котором будет выполняться игра.
+        :param game_id: идентификатор игры, если он назначен заранее (например, при распределении игр по процессам)
+        :param game_settings: параметры игры, передаваемые в GameCommand
+        """
+        self.game_id = game_id or f'game-{next(self.id_counter)}'
+        self.game_settings = game_settings
+
+    def execute(self) -> None:
+        game_cmd = GameCommand(self.game_id, **self.game_settings)
+
+        # Игра выполняется планировщиком потока
+        IoC.resolve('Thread.Scheduler.Add', game_cmd).execute()
+
+
+def resolve_action(action_data: dict) -> ICommand:
+    """Создать команду пользователя UserActions.* по сообщению клиента"""
+    action_data = dict(action_data)
+    action_name = action_data.pop('name')
+    return IoC.resolve(f'UserActions.{action_name}', **action_data)
+
+
+class ActionsBatchCommand(ICommand):
+    """
+    Пакет команд пользователя, который ставится в очередь потока как одна команда.
+    Ошибка одной команды пакета обрабатывается ExceptionHandler и не прерывает выполнение остальных.
+    """
+
+    def __init__(self, actions, game_id=None):
+        """:param game_id: игра, к которой относятся все команды пакета (используется для выбора потока)"""
+        self.actions = actions
+        self.game_id = game_id
 
     def execute(self) -> None:
-        game_id = f'game-{self.id_counter}'
-        CreateGameCommand.id_counter += 1
+        for action in self.actions:
+            try:
+                action.execute()
+            except Exception as e:
+                handle_exception(action, e)
+
+
+def resolve_actions(actions_data: list):
+    """
+    Создать пакеты команд пользователя по сообщениям клиента.
+    Команды группируются в пакеты по играм, чтобы каждый пакет мог быть выполнен потоком, которому принадлежит игра.
+    :return: список пакетов и результат по каждому сообщению - принято или отклонено
+    """
+    batches = {}
+    results = []
+    for action_data in actions_data:
+        try:
+            action = resolve_action(action_data)
+        except Exception as e:
+            results.append({'status': 'rejected', 'error': str(e)})
+            continue
 
-        game_cmd = GameCommand(game_id)
+        game_id = getattr(action, 'game_id', None)
+        if game_id not in batches:
+            batches[game_id] = ActionsBatchCommand([], game_id)
+        batches[game_id].actions.append(action)
+        if isinstance(action, CreateGameCommand):
+            # Клиент узнает идентификатор созданной игры из подтверждения
+            results.append({'status': 'accepted', 'game_id': action.game_id})
+        else:
+            results.append({'status': 'accepted'})
 
-        # Команда кладет в очередь сама себя
-        IoC.resolve('Thread.PutWithRepeat', game_cmd).execute()
+    return list(batches.values()), results
 
 
 class UserActionsPlugin(ICommand):
@@ -141,7 +562,13 @@ class UserActionsPlugin(ICommand):
         IoC.resolve(
             'IoC.Register',
             'UserActions.CreateGame',
-            lambda: CreateGameCommand()
+            lambda **settings: CreateGameCommand(**validate_game_settings(settings))
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'UserActions.StopGame',
+            lambda game_id: StopGameCommand(game_id)
         ).execute()
 
         IoC.resolve(
@@ -150,4 +577,10 @@ class UserActionsPlugin(ICommand):
             lambda game_id, operation: InterpretGameCommand(game_id, operation)
         ).execute()
 
+        IoC.resolve(
+            'IoC.Register',
+            'UserActions.Subscribe',
+            lambda game_id, sink, rate=None: SubscribeCommand(game_id, sink, rate)
+        ).execute()
+
 
@@ -0,0 +1,62 @@
+class ChangeReader:
+    """
+    Изменения объектов игры для одного потребителя (рассылки снимков, репликации, сохранения и т.п.).
+    Каждый потребитель собирает изменения через свой ChangeReader, поэтому сбор изменений одним потребителем
+    не влияет на изменения, накопленные для других.
+    """
+
+    def __init__(self, journal: 'ChangeJournal'):
+        self.journal = journal
+        self.changed = {}  # Объект -> измененные свойства; объекты в порядке первого изменения
+
+    def record(self, obj, key: str) -> None:
+        keys = self.changed.get(obj)
+        if keys is None:
+            self.changed[obj] = keys = set()
+        keys.add(key)
+
+    def collect(self) -> dict:
+        """
+        Измененные с предыдущего сбора свойства объектов и их текущие значения.
+        Изменения объектов, не зарегистрированных в игре, не собираются.
+        :return: идентификатор объекта -> {свойство: значение}
+        """
+        changed, self.changed = self.changed, {}
+        object_ids = self.journal.object_ids
+
+        changes = {}
+        for obj, keys in changed.items():
+            obj_id = object_ids.get(obj)
+            if obj_id is not None:
+                changes[obj_id] = {key: obj.get_property(key) for key in keys}
+        return changes
+
+    def close(self) -> None:
+        """Перестать отслеживать изменения для этого потребителя"""
+        if self in self.journal.readers:
+            self.journal.readers.remove(self)
+
+
+class ChangeJournal:
+    """
+    Журнал изменений объектов игры.
+
+    Изменение свойства записывается в ChangeReader каждого потребителя изменений, поэтому сбор изменений
+    обходит только измененные объекты и свойства, а не все объекты игры. Пока потребителей нет,
+    запись изменения ничего не стоит.
+    """
+
+    def __init__(self, object_ids: dict = None):
+        """:param object_ids: объект -> идентификатор объекта в игре"""
+        self.object_ids = {} if object_ids is None else object_ids
+        self.readers = []
+
+    def reader(self) -> ChangeReader:
+        """Новый потребитель изменений; изменения, сделанные до его создания, ему не передаются"""
+        reader = ChangeReader(self)
+        self.readers.append(reader)
+        return reader
+
+    def record(self, obj, key: str) -> None:
+        for reader in self.readers:
+            reader.record(obj, key)
@@ -0,0 +1,256 @@
+from threading import Event, Lock, Thread
+from time import perf_counter
+
+import numpy as np
+
+from exception_handler import handle_exception
+from features.base.commands import LambdaCommand
+from features.base.interfaces import ICommand
+from thread.queues import SingleConsumerQueue
+
+
+# Свойства объектов, передаваемые подписчикам
+SNAPSHOT_PROPERTIES = (
+    'position',
+    'fuel_level',
+    'fuel_consumption',
+    'direction',
+    'directions_number',
+    'angular_velocity',
+)
+
+
+def _copy(value):
+    # Снимок не должен меняться вместе с объектом
+    return value.copy() if isinstance(value, np.ndarray) else value
+
+
+def take_snapshot(objects, properties=SNAPSHOT_PROPERTIES) -> dict:
+    """
+    Снимок состояния объектов игры.
+    :return: идентификатор объекта -> {свойство: значение}, отсутствующие у объекта свойства пропускаются
+    """
+    snapshot = {}
+    for obj in objects:
+        state = {}
+        for key in properties:
+            try:
+                value = obj.get_property(key)
+            except KeyError:
+                continue
+            state[key] = _copy(value)
+        snapshot[obj.get_property('id')] = state
+    return snapshot
+
+
+class SnapshotSubscription:
+    """
+    Подписка на снимки состояния игры.
+    Время передачи и признак полученного полного снимка меняет поток игры, накопленные изменения и признак
+    отключения - поток рассылки.
+    """
+
+    def __init__(self, sink, rate: float = None, delta: bool = True):
+        """
+        :param sink: функция sink(game_id, objects), получающая снимки состояния игры
+        :param rate: число снимков в секунду, None - снимок после каждого такта игры
+        :param delta: передавать только объекты и свойства, изменившиеся с момента предыдущей передачи
+        """
+        self.sink = sink
+        self.interval = 1 / rate if rate else 0
+        self.delta = delta
+        self.next_time = 0
+        self.started = False  # Подписчику передан полный снимок
+        self.closed = False  # Подписчик отключился
+        self.pending = {}  # Изменения, накопленные с предыдущей передачи
+
+    def is_due(self, now: float) -> bool:
+        return now >= self.next_time
+
+    def needs_snapshot(self, tracked: bool) -> bool:
+        """:param tracked: изменения игры отслеживаются; иначе подписчик всегда получает полный снимок"""
+        return not (self.delta and tracked and self.started)
+
+    def add_changes(self, changes: dict) -> None:
+        if not self.delta:
+            return
+        for obj_id, obj_changes in changes.items():
+            self.pending.setdefault(obj_id, {}).update(obj_changes)
+
+    def send(self, game_id, snapshot: dict = None) -> None:
+        """:param snapshot: полный снимок состояния игры; None - передать накопленные изменения"""
+        if snapshot is None:
+            objects = self.pending
+        else:
+            objects = snapshot
+        self.pending = {}
+        if objects:
+            self.sink(game_id, objects)
+
+
+class DeliverSnapshotCommand(ICommand):
+    """Передача подписчикам изменений и снимка состояния игры, собранных за один такт"""
+
+    def __init__(self, game_id, subscriptions: list, due: list, changes: dict = None, snapshot: dict = None):
+        """
+        :param subscriptions: все подписки игры - им передаются изменения
+        :param due: подписки, которым пришло время передачи, и признак "передать полный снимок"
+        """
+        self.game_id = game_id
+        self.subscriptions = subscriptions
+        self.due = due
+        self.changes = changes
+        self.snapshot = snapshot
+
+    def execute(self) -> None:
+        if self.changes:
+            for subscription in self.subscriptions:
+                subscription.add_changes(self.changes)
+
+        for subscription, use_snapshot in self.due:
+            if subscription.closed:
+                continue
+            try:
+                subscription.send(self.game_id, self.snapshot if use_snapshot else None)
+            except ConnectionError:
+                # Подписчик отключился, поток игры удалит подписку перед следующей рассылкой
+                subscription.closed = True
+            except Exception as e:
+                # Ошибка одного подписчика не должна мешать остальным
+                handle_exception(self, e)
+
+
+class SnapshotDelivery:
+    """
+    Поток рассылки снимков состояния игр. Объединяет изменения для подписчиков и вызывает их sink, не задерживая
+    потоки игр. Поток запускается при первой рассылке.
+    """
+
+    def __init__(self):
+        self.q = SingleConsumerQueue()
+        self.thread = None
+        self.lock = Lock()
+
+    def put(self, cmd: ICommand) -> None:
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = Thread(target=self.run, daemon=True)
+                    self.thread.start()
+        self.q.put(cmd)
+
+    def run(self) -> None:
+        while True:
+            cmd = self.q.get()
+            try:
+                cmd.execute()
+            except Exception as e:
+                handle_exception(cmd, e)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Дождаться выполнения рассылок, поставленных в очередь до вызова"""
+        done = Event()
+        self.put(LambdaCommand(done.set))
+        return done.wait(timeout)
+
+
+default_delivery = SnapshotDelivery()
+
+
+class SnapshotPublisher:
+    """
+    Рассылка снимков состояния игры подписчикам.
+
+    Новый подписчик получает полный снимок, затем - только изменения, накопленные с предыдущей передачи.
+    Изменения публикатор собирает через собственного потребителя изменений игры (ChangeReader), поэтому
+    не мешает другим потребителям; потребитель создается, пока есть подписчики на изменения.
+
+    В потоке игры выполняется только то, что должно видеть согласованное состояние игры: сбор изменений
+    с копированием изменившихся значений (стоимость зависит от числа изменений, а не от размера игры)
+    и полный снимок, если он нужен подписчику. Объединение изменений для подписчиков и вызов sink выполняются
+    в потоке рассылки (deliver), сериализацию сетевой sink выполняет в цикле событий сервера.
+    Без подписчиков или пока ни одному подписчику не пришло время передачи публикация ничего не стоит.
+    Если игра не отслеживает изменения, подписчики получают полные снимки.
+    """
+
+    def __init__(self, game_id, objects, changes_reader, deliver=None):
+        """
+        :param objects: функция, возвращающая объекты игры
+        :param changes_reader: функция, создающая потребителя изменений игры (ChangeReader) или возвращающая None,
+                               если игра не отслеживает изменения
+        :param deliver: функция, выполняющая DeliverSnapshotCommand вне потока игры;
+                        по умолчанию - общий поток рассылки default_delivery
+        """
+        self.game_id = game_id
+        self.objects = objects
+        self.changes_reader = changes_reader
+        self.deliver = deliver or default_delivery.put
+        self.reader = None
+        self.subscriptions = []
+
+    def subscribe(self, sink, rate: float = None, delta: bool = True) -> SnapshotSubscription:
+        subscription = SnapshotSubscription(sink, rate, delta)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: SnapshotSubscription) -> None:
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+        if self.reader is not None and not any(s.delta for s in self.subscriptions):
+            self.reader.close()
+            self.reader = None
+
+    def collect_changes(self) -> dict:
+        """Изменения свойств SNAPSHOT_PROPERTIES с предыдущего сбора; None - изменения не отслеживаются"""
+        if self.reader is None:
+            if not any(s.delta for s in self.subscriptions):
+                return None
+            # Подписчики на изменения еще не получили полный снимок, поэтому более ранние изменения им не нужны
+            self.reader = self.changes_reader()
+            if self.reader is None:
+                return None
+
+        collected = {}
+        for obj_id, obj_changes in self.reader.collect().items():
+            obj_changes = {key: _copy(value) for key, value in obj_changes.items() if key in SNAPSHOT_PROPERTIES}
+            if obj_changes:
+                collected[obj_id] = obj_changes
+        return collected
+
+    def publish(self, now: float = None) -> None:
+        for subscription in [s for s in self.subscriptions if s.closed]:
+            self.unsubscribe(subscription)
+        if not self.subscriptions:
+            return
+
+        now = perf_counter() if now is None else now
+        due_subscriptions = [s for s in self.subscriptions if s.is_due(now)]
+        if not due_subscriptions:
+            # Изменения продолжают накапливаться в ChangeReader до ближайшей передачи
+            return
+
+        changes = self.collect_changes()
+        tracked = changes is not None
+
+        snapshot = None
+        due = []
+        for subscription in due_subscriptions:
+            subscription.next_time = now + subscription.interval
+            use_snapshot = subscription.needs_snapshot(tracked)
+            if use_snapshot:
+                if snapshot is None:
+                    snapshot = take_snapshot(self.objects())
+                subscription.started = tracked
+            due.append((subscription, use_snapshot))
+
+        self.deliver(DeliverSnapshotCommand(self.game_id, list(self.subscriptions), due, changes, snapshot))
+
+
+def print_snapshot(game_id, objects: dict) -> None:
+    """Отладочный sink: вывод снимка состояния игры в stdout"""
+    print(f'Game : {game_id}')
+    for obj_id, state in objects.items():
+        print('\t', f'{obj_id}:')
+        for key, value in state.items():
+            print('\t\t', f'{key}: {value}')
+    print()
@@ -0,0 +1,257 @@
+import numpy as np
+
+from features.base.interfaces import UObject
+
+
+class ColumnarStorage:
+    """
+    Колоночное хранилище свойств игровых объектов (structure of arrays).
+
+    Каждое свойство хранится в отдельном массиве NumPy, объект игры - это номер строки в этих массивах.
+    Для свойства-вектора (например, position) массив двумерный: (число объектов, размерность вектора).
+    Маска свойства показывает, у каких объектов свойство задано.
+    Изменения свойств отслеживаются для каждого потребителя изменений отдельно (changes_reader): у каждого
+    ColumnarChangeReader свои маски изменений. Групповые команды, меняющие колонки напрямую,
+    отмечают измененные строки через mark_dirty.
+
+    Объекты выдаются наружу в виде легковесных представлений строк - ColumnarGameObject. Для каждой строки
+    создается одно представление, поэтому адаптеры объекта (см. InitCreateCommandAdapterStrategy.get_adapter)
+    переиспользуются между тактами.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.size = 0
+        self.columns = {}  # Свойство -> массив значений
+        self.masks = {}  # Свойство -> массив признаков "свойство задано"
+        self.readers = []  # Потребители изменений
+        self.index = {}  # Идентификатор объекта -> номер строки
+        self.row_ids = {}  # Номер строки -> идентификатор объекта
+        self.views = []  # Номер строки -> представление строки
+
+    def new_row(self) -> 'ColumnarGameObject':
+        """Добавить в хранилище новый объект без свойств"""
+        if self.size == self.capacity:
+            self._grow()
+
+        row = self.size
+        self.size += 1
+        view = ColumnarGameObject(self, row)
+        self.views.append(view)
+        return view
+
+    def row(self, row: int) -> 'ColumnarGameObject':
+        return self.views[row]
+
+    def add(self, obj_id, obj: UObject) -> 'ColumnarGameObject':
+        """
+        Зарегистрировать объект под идентификатором obj_id.
+        Объект этого хранилища регистрируется как есть, свойства GameObject копируются в новую строку.
+        """
+        if isinstance(obj, ColumnarGameObject) and obj.storage is self:
+            row_obj = obj
+        elif hasattr(obj, 'storage') and isinstance(obj.storage, dict):
+            row_obj = self.new_row()
+            for key, value in obj.storage.items():
+                row_obj.set_property(key, value)
+        else:
+            raise TypeError(f'Cannot add {obj.__class__.__name__} to columnar storage')
+
+        self.index[obj_id] = row_obj.row
+        self.row_ids[row_obj.row] = obj_id
+        return row_obj
+
+    def get_object(self, obj_id) -> 'ColumnarGameObject':
+        return self.views[self.index[obj_id]]
+
+    def get_ids(self, rows) -> list:
+        """Идентификаторы объектов для номеров строк"""
+        return [self.row_ids.get(row) for row in rows]
+
+    def objects(self):
+        return (self.views[row] for row in self.index.values())
+
+    def get(self, row: int, key: str) -> object:
+        try:
+            mask = self.masks[key]
+        except KeyError:
+            raise KeyError(key) from None
+        if not mask[row]:
+            raise KeyError(key)
+
+        value = self.columns[key][row]
+        if isinstance(value, np.ndarray):
+            # Возвращаем копию, чтобы последующая запись в хранилище не меняла ранее прочитанное значение
+            return value.copy()
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    def set(self, row: int, key: str, value: object) -> None:
+        column = self.columns.get(key)
+        if column is None:
+            column = self._create_column(key, value)
+        elif not self._fits(column, value):
+            column = self._convert_column(key, value)
+
+        column[row] = value
+        self.masks[key][row] = True
+        for reader in self.readers:
+            reader.mark(key, row)
+
+    def mark_dirty(self, key: str, rows) -> None:
+        """Отметить свойство key измененным у объектов в строках rows"""
+        for reader in self.readers:
+            reader.mark(key, rows)
+
+    def changes_reader(self) -> 'ColumnarChangeReader':
+        """Новый потребитель изменений; изменения, сделанные до его создания, ему не передаются"""
+        reader = ColumnarChangeReader(self)
+        self.readers.append(reader)
+        return reader
+
+    def column(self, key: str) -> np.ndarray:
+        """Массив значений свойства для всех объектов хранилища"""
+        return self.columns[key][:self.size]
+
+    def widen(self, key: str, dtype) -> np.ndarray:
+        """Расширить тип колонки key так, чтобы в нее помещались значения типа dtype"""
+        column = self.columns[key]
+        if not np.can_cast(dtype, column.dtype):
+            column = self.columns[key] = column.astype(np.result_type(column.dtype, dtype))
+        return column[:self.size]
+
+    def mask(self, key: str) -> np.ndarray:
+        """Признаки наличия свойства для всех объектов хранилища"""
+        return self.masks[key][:self.size]
+
+    def _grow(self) -> None:
+        self.capacity *= 2
+        for key, column in self.columns.items():
+            new_column = np.zeros((self.capacity,) + column.shape[1:], dtype=column.dtype)
+            new_column[:self.size] = column[:self.size]
+            self.columns[key] = new_column
+
+            new_mask = np.zeros(self.capacity, dtype=bool)
+            new_mask[:self.size] = self.masks[key][:self.size]
+            self.masks[key] = new_mask
+
+        for reader in self.readers:
+            reader.grow(self.capacity)
+
+    @staticmethod
+    def _dtype_and_shape(value):
+        if isinstance(value, np.ndarray):
+            return value.dtype, value.shape
+        if isinstance(value, (bool, np.bool_)):
+            return np.dtype(bool), ()
+        if isinstance(value, (int, np.integer)):
+            return np.dtype(np.int64), ()
+        if isinstance(value, (float, np.floating)):
+            return np.dtype(np.float64), ()
+        return np.dtype(object), ()
+
+    def _create_column(self, key, value) -> np.ndarray:
+        dtype, shape = self._dtype_and_shape(value)
+        column = np.zeros((self.capacity,) + shape, dtype=dtype)
+        if dtype == object:
+            column.fill(None)
+        self.columns[key] = column
+        self.masks[key] = np.zeros(self.capacity, dtype=bool)
+        return column
+
+    def _fits(self, column, value) -> bool:
+        if column.dtype == object and column.ndim == 1:
+            return True
+
+        dtype, shape = self._dtype_and_shape(value)
+        return shape == column.shape[1:] and dtype != object and np.can_cast(dtype, column.dtype)
+
+    def _convert_column(self, key, value) -> np.ndarray:
+        """Расширить тип колонки так, чтобы в нее можно было записать value"""
+        column = self.columns[key]
+        dtype, shape = self._dtype_and_shape(value)
+
+        if shape == column.shape[1:] and dtype != object:
+            new_column = column.astype(np.result_type(column.dtype, dtype))
+        else:
+            # Значения разной формы или произвольные объекты храним поэлементно
+            new_column = np.empty(self.capacity, dtype=object)
+            for row in range(self.capacity):
+                new_column[row] = column[row]
+
+        self.columns[key] = new_column
+        return new_column
+
+
+class ColumnarChangeReader:
+    """Изменения объектов колоночного хранилища для одного потребителя: маски измененных строк по свойствам"""
+
+    def __init__(self, storage: ColumnarStorage):
+        self.storage = storage
+        self.dirty = {}  # Свойство -> массив признаков "свойство изменено"
+
+    def mark(self, key: str, rows) -> None:
+        dirty = self.dirty.get(key)
+        if dirty is None:
+            self.dirty[key] = dirty = np.zeros(self.storage.capacity, dtype=bool)
+        dirty[rows] = True
+
+    def grow(self, capacity: int) -> None:
+        for key, dirty in self.dirty.items():
+            new_dirty = np.zeros(capacity, dtype=bool)
+            new_dirty[:len(dirty)] = dirty
+            self.dirty[key] = new_dirty
+
+    def collect(self, rows=None) -> dict:
+        """
+        Измененные свойства объектов и их текущие значения. Признаки изменений собранных свойств сбрасываются.
+        Изменения объектов, еще не зарегистрированных в хранилище (add), не собираются.
+        :param rows: номера строк, изменения которых собираются; по умолчанию - все объекты хранилища
+        :return: идентификатор объекта -> {свойство: значение}
+        """
+        storage = self.storage
+        changes = {}
+        for key, dirty in self.dirty.items():
+            if rows is None:
+                changed_rows = np.flatnonzero(dirty[:storage.size])
+            else:
+                changed_rows = [row for row in rows if dirty[row]]
+            for row in changed_rows:
+                obj_id = storage.row_ids.get(int(row))
+                if obj_id is None:
+                    continue
+                dirty[row] = False
+                changes.setdefault(obj_id, {})[key] = storage.get(row, key)
+        return changes
+
+    def close(self) -> None:
+        """Перестать отслеживать изменения для этого потребителя"""
+        if self in self.storage.readers:
+            self.storage.readers.remove(self)
+
+
+class ColumnarGameObject(UObject):
+    """Игровой объект - представление строки колоночного хранилища"""
+
+    __slots__ = ('storage', 'row', '__weakref__')
+
+    def __init__(self, storage: ColumnarStorage, row: int):
+        self.storage = storage
+        self.row = row
+
+    def get_property(self, key: str) -> object:
+        return self.storage.get(self.row, key)
+
+    def set_property(self, key: str, value: object) -> None:
+        self.storage.set(self.row, key, value)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ColumnarGameObject) and
+            self.storage is other.storage and
+            self.row == other.row
+        )
+
+    def __hash__(self):
+        return hash((id(self.storage), self.row))
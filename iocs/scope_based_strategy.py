@@ -6,18 +6,76 @@ from iocs.base import IoC
 
 
 class Scope:
+    """
+    Скоуп с зависимостями.
+
+    Для ускорения разрешения зависимостей каждый скоуп хранит кэш (ключ -> стратегия), в котором лежат стратегии,
+    найденные как в самом скоупе, так и в его родителях. Кэш заполняется лениво при первом обращении к ключу,
+    поэтому разрешение зависимости не зависит от глубины иерархии скоупов.
+    Кэш инвалидируется точечно: при регистрации зависимости ключ удаляется из кэша скоупа и всех его потомков.
+
+    Поколение скоупа (generation) увеличивается при каждой инвалидации. По нему кэши, построенные поверх
+    разрешенных в скоупе стратегий (например, скомпилированные адаптеры), определяют, что они устарели.
+    """
+
     def __init__(self, scope_id, dependencies, parent=None):
         self.id = scope_id
         self.dependencies = dependencies
         self.parent = parent
+        self.children = []
+        self.cache = {}
+        self.generation = 0
+
+        if parent is not None:
+            parent.children.append(self)
+
+    def get_strategy(self, key):
+        """Найти стратегию для ключа с учетом иерархии скоупов"""
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+
+        generation = self.generation
+        scope = self
+        while scope is not None:
+            if key in scope.dependencies:
+                strategy = scope.dependencies[key]
+                self.cache[key] = strategy
+                if self.generation != generation:
+                    # Пока шел поиск, другой поток изменил зависимости скоупа - найденная стратегия могла устареть
+                    self.cache.pop(key, None)
+                return strategy
+            scope = scope.parent
+
+        raise KeyError(f"Unknown dependency '{key}'")
 
     def resolve(self, key, *args, **kwargs):
-        if key in self.dependencies:
-            return self.dependencies[key](*args, **kwargs)
-        elif self.parent:
-            return self.parent.resolve(key, *args, **kwargs)
-        else:
-            raise KeyError(f"Unknown dependency '{key}'")
+        try:
+            strategy = self.cache[key]
+        except KeyError:
+            strategy = self.get_strategy(key)
+        return strategy(*args, **kwargs)
+
+    def register(self, key, strategy):
+        """Зарегистрировать зависимость в скоупе и сбросить закэшированные стратегии для этого ключа у потомков"""
+        self.dependencies[key] = strategy
+        self.invalidate(key)
+
+    def invalidate(self, key):
+        # Поколение увеличивается до очистки кэша, чтобы get_strategy, записавший в кэш устаревшую стратегию,
+        # увидел изменение поколения
+        self.generation += 1
+        self.cache.pop(key, None)
+        for child in self.children:
+            child.invalidate(key)
+
+    def reset(self):
+        """Очистить кэш скоупа и всех его потомков"""
+        self.generation += 1
+        self.cache.clear()
+        for child in self.children:
+            child.reset()
 
 
 class HierarchicalScopeBasedDependencyStrategy:
@@ -42,7 +100,7 @@ class HierarchicalScopeBasedDependencyStrategy:
         if key == 'Scopes.Root':
             return cls.root
 
-        scope = cls.get_current_scope()
+        scope = getattr(cls.current_scopes, 'value', None)
         if scope is None:
             scope = cls.get_default_scope()
 
@@ -75,7 +133,7 @@ class RegisterIoCDependencyCommand(ICommand):
             if self.key in scope.dependencies:
                 raise Exception('Dependency already registered')
             else:
-                scope.dependencies[self.key] = self.strategy
+                scope.register(self.key, self.strategy)
         else:
             raise Exception('Cannot register dependency - unknown scope')
 
@@ -109,9 +167,10 @@ class InitScopesCommand(ICommand):
             if not parent_scope:
                 raise Exception('Cannot identify parent scope!')
 
-            new_scope = Scope(scope_id, IoC.resolve('Scopes.Storage'), parent_scope)
+            # Проверка до создания скоупа: конструктор Scope добавляет скоуп в потомки родителя
             if scope_id in scopes:
                 raise Exception(f'Scope with id {scope_id} aleready exists')
+            new_scope = Scope(scope_id, IoC.resolve('Scopes.Storage'), parent_scope)
             scopes[scope_id] = new_scope
             return new_scope
 
@@ -120,6 +179,9 @@ class InitScopesCommand(ICommand):
         def clear_scopes():
             scopes.clear()
             scopes[root_scope_id] = root_scope
+            # Удаленные скоупы больше не являются потомками корневого скоупа
+            root_scope.children.clear()
+            root_scope.reset()
 
         root_dependencies['Scopes.Clear'] = lambda: LambdaCommand(clear_scopes)
 
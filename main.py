@@ -1,15 +1,17 @@
-import json
-import socket
-from time import sleep
+import argparse
+import asyncio
+import logging
 
 from exception_handler import ExceptionHandler
 from features.base.builders import OperationBuilder
-from features.base.commands import InitCreateCommandAdapterStrategy, MacroCommand, LambdaCommand
+from features.base.commands import InitCreateCommandAdapterStrategy, LambdaCommand
 from features.movement.commands import MoveCommandPluginCommand, FuelCommandsPluginCommand
 from features.rotation.commands import RotateCommandsPluginCommand
-from game.commands import UserActionsPlugin
+from game.commands import UserActionsPlugin, resolve_action, resolve_actions
 from iocs import IoC
 from iocs.scope_based_strategy import InitScopesCommand
+from network.server import ActionServer
+from process.commands import StartProcessPoolCommandPlugin
 from thread.commands import StartThreadCommandPlugin
 
 
@@ -17,26 +19,26 @@ HOST = "127.0.0.1"
 PORT = 12345
 
 
-def listen_socket():
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind((HOST, PORT))
-        s.listen()
+def listen_socket(dispatch, dispatch_batch, subscribe=None):
+    """
+    :param dispatch: функция, передающая сообщение клиента на выполнение
+    :param dispatch_batch: функция, передающая на выполнение пакет сообщений клиента
+    :param subscribe: функция, подписывающая клиента на изменения состояния игры
+    """
+    asyncio.run(ActionServer(HOST, PORT, dispatch, dispatch_batch, subscribe).serve())
 
-        while True:
-            conn, addr = s.accept()
-            data = conn.recv(1024)
 
-            action_data = json.loads(data.decode('utf-8'))
-            action_name = action_data.pop("name")
-            action = IoC.resolve(f'UserActions.{action_name}', **action_data)
-            IoC.resolve("Thread.Put", action).execute()
+def put_actions(actions_data):
+    batches, results = resolve_actions(actions_data)
+    for batch in batches:
+        IoC.resolve("Thread.Put", batch).execute()
+    return results
 
-            conn.close()
 
-
-if __name__ == '__main__':
+def bootstrap():
+    """Инициализация IoC, плагинов и правил игры"""
     InitScopesCommand().execute()
-    InitCreateCommandAdapterStrategy().execute()
+    InitCreateCommandAdapterStrategy(compiled=True).execute()
     MoveCommandPluginCommand().execute()
     FuelCommandsPluginCommand().execute()
     RotateCommandsPluginCommand().execute()
@@ -79,24 +81,60 @@ if __name__ == '__main__':
 
     IoC.resolve(
         'IoC.Register',
-        'Operations.StartMovement',
-        lambda obj, *args, **kwargs: IoC.resolve('Commands.StartMovement', obj, *args, **kwargs)
+        'Operations.Movement.Batch',
+        lambda: IoC.resolve('Commands.Move.Batch')
     ).execute()
 
-    thread_id = 'thread-id'
-    IoC.resolve("Thread.Start", thread_id).execute()
-    IoC.resolve('Scopes.Current.Set', thread_id).execute()
+    IoC.resolve(
+        'IoC.Register',
+        'Operations.Rotation.Batch',
+        lambda: IoC.resolve('Commands.Rotate.Batch')
+    ).execute()
 
     IoC.resolve(
-        "Thread.PutWithRepeat",
-        MacroCommand([
-            LambdaCommand(lambda: print('-----------------')),
-            LambdaCommand(lambda: sleep(2))
-        ])
+        'IoC.Register',
+        'Operations.StartMovement',
+        lambda obj, *args, **kwargs: IoC.resolve('Commands.StartMovement', obj, *args, **kwargs)
     ).execute()
 
-    listen_socket()
 
-    thread = IoC.resolve("Thread")
-    # IoC.resolve("Thread.Put", IoC.resolve("Thread.SoftStop")).execute()
-    thread.join()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--processes', type=int, default=0, help='число процессов-обработчиков игр')
+    args = parser.parse_args()
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    if args.processes:
+        # Игры распределяются по процессам, текущий процесс только принимает и пересылает сообщения клиентов
+        InitScopesCommand().execute()
+        StartProcessPoolCommandPlugin().execute()
+        IoC.resolve('Process.Pool.Start', 'process', args.processes, bootstrap).execute()
+        listen_socket(
+            lambda action_data: IoC.resolve('Process.Put', action_data).execute(),
+            lambda actions_data: IoC.resolve('Process.PutBatch.Async', actions_data)
+        )
+        IoC.resolve('Process.Pool.Stop').execute()
+    else:
+        bootstrap()
+
+        thread_id = 'thread-id'
+        IoC.resolve("Thread.Start", thread_id).execute()
+        IoC.resolve('Scopes.Current.Set', thread_id).execute()
+
+        IoC.resolve(
+            "Thread.PutPeriodic",
+            LambdaCommand(lambda: print('-----------------')),
+            2
+        ).execute()
+
+        listen_socket(
+            lambda action_data: IoC.resolve("Thread.Put", resolve_action(action_data)).execute(),
+            put_actions,
+            lambda action_data, sink: IoC.resolve(
+                "Thread.Put", resolve_action(dict(action_data, sink=sink))
+            ).execute()
+        )
+
+        thread = IoC.resolve("Thread")
+        # IoC.resolve("Thread.Put", IoC.resolve("Thread.SoftStop")).execute()
+        thread.join()
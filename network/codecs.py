@@ -0,0 +1,294 @@
+import json
+import struct
+
+import numpy as np
+
+
+class CodecException(Exception):
+    pass
+
+
+class JsonCodec:
+    """
+    Текстовый формат: сообщения в JSON, по одному на строку.
+    Используется по умолчанию, если клиент не запросил другой формат.
+    """
+
+    async def read_frame(self, reader) -> bytes:
+        return await reader.readline()
+
+    def decode(self, data: bytes):
+        return json.loads(data)
+
+    def encode_ack(self, results: list) -> bytes:
+        return json.dumps({'ack': results}).encode('utf-8') + b'\n'
+
+    def encode_snapshot(self, game_id, objects: dict) -> bytes:
+        """
+        :param objects: идентификатор объекта -> {свойство: значение}
+        """
+        return json.dumps({'game_id': game_id, 'objects': objects}, default=self.default).encode('utf-8') + b'\n'
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+        raise TypeError(f'Object of type {value.__class__.__name__} is not JSON serializable')
+
+
+class BinaryCodec:
+    """
+    Компактный двоичный формат. Каждый кадр - длина (uint32) и тело кадра, все числа little-endian.
+    Тело начинается с типа сообщения (uint8). Строки кодируются как длина (uint16) и байты UTF-8.
+
+    Сообщения клиента:
+        CREATE_GAME
+        INTERPRET_GAME_COMMAND: game_id, object_id (пустая строка - операция без объекта), имя операции,
+                                число параметров (uint8), параметры: имя, тип (i - int64, f - float64, s - строка),
+                                значение
+        BATCH: число сообщений (uint16), сообщения: длина (uint32) и тело сообщения
+        SUBSCRIBE: game_id, число снимков в секунду (float64, 0 - после каждого такта)
+    Сообщения сервера:
+        ACK: число результатов (uint16), результаты: статус (uint8, 1 - принято) и строка - текст ошибки
+             для отклоненного действия, идентификатор игры для принятого CreateGame, иначе пустая строка
+        SNAPSHOT: game_id, число объектов (uint32), объекты: id, маска свойств (uint8), свойства из маски -
+                  position (2 x float64), fuel_level (float64), direction (int32)
+    """
+
+    MAGIC = b'\x00BIN'
+
+    CREATE_GAME = 1
+    INTERPRET_GAME_COMMAND = 2
+    BATCH = 3
+    ACK = 4
+    SNAPSHOT = 5
+    SUBSCRIBE = 6
+
+    HEADER = struct.Struct('<I')
+    TYPE = struct.Struct('<B')
+    STRING_LENGTH = struct.Struct('<H')
+    COUNT = struct.Struct('<H')
+    OBJECTS_COUNT = struct.Struct('<I')
+    INT = struct.Struct('<q')
+    FLOAT = struct.Struct('<d')
+
+    # Свойства объекта в снимке состояния: имя, бит маски, формат
+    SNAPSHOT_PROPERTIES = (
+        ('position', 1, struct.Struct('<dd')),
+        ('fuel_level', 2, struct.Struct('<d')),
+        ('direction', 4, struct.Struct('<i')),
+    )
+
+    def __init__(self, max_frame_size: int = 16 * 1024 * 1024):
+        self.max_frame_size = max_frame_size
+
+    async def read_frame(self, reader) -> bytes:
+        header = await reader.read(self.HEADER.size)
+        if not header:
+            return b''
+        if len(header) < self.HEADER.size:
+            header += await reader.readexactly(self.HEADER.size - len(header))
+
+        length, = self.HEADER.unpack(header)
+        if length > self.max_frame_size:
+            raise ValueError(f'Frame is too large: {length} bytes')
+        return await reader.readexactly(length)
+
+    @classmethod
+    def frame(cls, payload: bytes) -> bytes:
+        return cls.HEADER.pack(len(payload)) + payload
+
+    # Кодирование
+
+    @classmethod
+    def pack_string(cls, value: str) -> bytes:
+        data = value.encode('utf-8')
+        return cls.STRING_LENGTH.pack(len(data)) + data
+
+    @classmethod
+    def pack_value(cls, value) -> bytes:
+        if isinstance(value, (bool, np.bool_)):
+            return b'i' + cls.INT.pack(int(value))
+        if isinstance(value, (int, np.integer)):
+            return b'i' + cls.INT.pack(int(value))
+        if isinstance(value, (float, np.floating)):
+            return b'f' + cls.FLOAT.pack(float(value))
+        if isinstance(value, str):
+            return b's' + cls.pack_string(value)
+        raise CodecException(f'Unsupported value type {value.__class__.__name__}')
+
+    @classmethod
+    def encode_action(cls, action_data: dict) -> bytes:
+        """Тело сообщения клиента (используется клиентами и в тестах)"""
+        if isinstance(action_data, list):
+            payload = cls.TYPE.pack(cls.BATCH) + cls.COUNT.pack(len(action_data))
+            for item in action_data:
+                payload += cls.frame(cls.encode_action(item))
+            return payload
+
+        if action_data['name'] == 'CreateGame':
+            return cls.TYPE.pack(cls.CREATE_GAME)
+
+        if action_data['name'] == 'Subscribe':
+            return (
+                cls.TYPE.pack(cls.SUBSCRIBE) +
+                cls.pack_string(action_data['game_id']) +
+                cls.FLOAT.pack(action_data.get('rate') or 0)
+            )
+
+        if action_data['name'] == 'InterpretGameCommand':
+            operation = dict(action_data['operation'])
+            payload = (
+                cls.TYPE.pack(cls.INTERPRET_GAME_COMMAND) +
+                cls.pack_string(action_data['game_id']) +
+                cls.pack_string(operation.pop('object_id', '')) +
+                cls.pack_string(operation.pop('name'))
+            )
+            payload += cls.TYPE.pack(len(operation))
+            for key, value in operation.items():
+                payload += cls.pack_string(key) + cls.pack_value(value)
+            return payload
+
+        raise CodecException(f"Action '{action_data['name']}' is not supported by binary codec")
+
+    def encode_ack(self, results: list) -> bytes:
+        payload = self.TYPE.pack(self.ACK) + self.COUNT.pack(len(results))
+        for result in results:
+            text = result.get('error', '') if result['status'] != 'accepted' else result.get('game_id', '')
+            payload += self.TYPE.pack(result['status'] == 'accepted') + self.pack_string(text)
+        return self.frame(payload)
+
+    def encode_snapshot(self, game_id, objects: dict) -> bytes:
+        payload = [
+            self.TYPE.pack(self.SNAPSHOT),
+            self.pack_string(game_id),
+            self.OBJECTS_COUNT.pack(len(objects))
+        ]
+        for obj_id, properties in objects.items():
+            mask = 0
+            values = []
+            for key, bit, fmt in self.SNAPSHOT_PROPERTIES:
+                if key in properties:
+                    mask |= bit
+                    try:
+                        values.append(fmt.pack(*np.ravel(properties[key]).tolist()))
+                    except struct.error as e:
+                        # Например, дробное направление: целочисленные свойства не округляются молча
+                        raise CodecException(f'Cannot pack {key}={properties[key]!r}: {e}') from None
+            payload.append(self.pack_string(str(obj_id)))
+            payload.append(self.TYPE.pack(mask))
+            payload.extend(values)
+        return self.frame(b''.join(payload))
+
+    # Декодирование
+
+    @classmethod
+    def unpack_string(cls, data: bytes, offset: int):
+        length, = cls.STRING_LENGTH.unpack_from(data, offset)
+        offset += cls.STRING_LENGTH.size
+        if offset + length > len(data):
+            raise CodecException(f'Malformed message: string of {length} bytes is truncated')
+        try:
+            return data[offset:offset + length].decode('utf-8'), offset + length
+        except UnicodeDecodeError as e:
+            raise CodecException(f'Malformed message: {e}') from None
+
+    @classmethod
+    def unpack_value(cls, data: bytes, offset: int):
+        value_type = data[offset:offset + 1]
+        offset += 1
+        if value_type == b'i':
+            return cls.INT.unpack_from(data, offset)[0], offset + cls.INT.size
+        if value_type == b'f':
+            return cls.FLOAT.unpack_from(data, offset)[0], offset + cls.FLOAT.size
+        if value_type == b's':
+            return cls.unpack_string(data, offset)
+        raise CodecException(f'Unknown value type {value_type!r}')
+
+    def decode(self, data: bytes):
+        try:
+            message_type, = self.TYPE.unpack_from(data, 0)
+            offset = self.TYPE.size
+
+            if message_type == self.CREATE_GAME:
+                return {'name': 'CreateGame'}
+
+            if message_type == self.INTERPRET_GAME_COMMAND:
+                game_id, offset = self.unpack_string(data, offset)
+                object_id, offset = self.unpack_string(data, offset)
+                operation_name, offset = self.unpack_string(data, offset)
+                operation = {'name': operation_name}
+                if object_id:
+                    operation['object_id'] = object_id
+
+                params_number, = self.TYPE.unpack_from(data, offset)
+                offset += self.TYPE.size
+                for _ in range(params_number):
+                    key, offset = self.unpack_string(data, offset)
+                    operation[key], offset = self.unpack_value(data, offset)
+
+                return {'name': 'InterpretGameCommand', 'game_id': game_id, 'operation': operation}
+
+            if message_type == self.SUBSCRIBE:
+                game_id, offset = self.unpack_string(data, offset)
+                rate, = self.FLOAT.unpack_from(data, offset)
+                return {'name': 'Subscribe', 'game_id': game_id, 'rate': rate or None}
+
+            if message_type == self.BATCH:
+                count, = self.COUNT.unpack_from(data, offset)
+                offset += self.COUNT.size
+                actions = []
+                for _ in range(count):
+                    length, = self.HEADER.unpack_from(data, offset)
+                    offset += self.HEADER.size
+                    if offset + length > len(data):
+                        raise CodecException(f'Malformed message: batch message of {length} bytes is truncated')
+                    actions.append(self.decode(data[offset:offset + length]))
+                    offset += length
+                return actions
+        except struct.error as e:
+            raise CodecException(f'Malformed message: {e}')
+
+        raise CodecException(f'Unknown message type {message_type}')
+
+    def decode_snapshot(self, data: bytes):
+        """Декодирование снимка состояния (используется клиентами и в тестах)"""
+        offset = self.TYPE.size
+        game_id, offset = self.unpack_string(data, offset)
+        count, = self.OBJECTS_COUNT.unpack_from(data, offset)
+        offset += self.OBJECTS_COUNT.size
+
+        objects = {}
+        for _ in range(count):
+            obj_id, offset = self.unpack_string(data, offset)
+            mask, = self.TYPE.unpack_from(data, offset)
+            offset += self.TYPE.size
+
+            properties = {}
+            for key, bit, fmt in self.SNAPSHOT_PROPERTIES:
+                if mask & bit:
+                    values = fmt.unpack_from(data, offset)
+                    offset += fmt.size
+                    properties[key] = list(values) if len(values) > 1 else values[0]
+            objects[obj_id] = properties
+        return game_id, objects
+
+    def decode_ack(self, data: bytes) -> list:
+        """Декодирование подтверждения (используется клиентами и в тестах)"""
+        offset = self.TYPE.size
+        count, = self.COUNT.unpack_from(data, offset)
+        offset += self.COUNT.size
+
+        results = []
+        for _ in range(count):
+            accepted, = self.TYPE.unpack_from(data, offset)
+            text, offset = self.unpack_string(data, offset + self.TYPE.size)
+            if not accepted:
+                results.append({'status': 'rejected', 'error': text})
+            elif text:
+                results.append({'status': 'accepted', 'game_id': text})
+            else:
+                results.append({'status': 'accepted'})
+        return results
@@ -0,0 +1,183 @@
+import asyncio
+import inspect
+
+from .codecs import BinaryCodec, CodecException, JsonCodec
+
+
+class ActionServer:
+    """
+    Асинхронный сервер, принимающий сообщения клиентов.
+
+    Клиент держит постоянное соединение и отправляет сообщения в формате JSON, по одному на строку
+    (newline-delimited JSON). Каждое сообщение передается в dispatch, который ставит соответствующую команду
+    в очередь потока (Thread.Put потокобезопасен), поэтому обработка сообщений не блокирует цикл событий.
+
+    Сообщение может содержать пакет действий:
+        [{"name": ...}, {"name": ...}]
+        {"game_id": "game-1", "actions": [{"name": ...}, ...]} - game_id добавляется в каждое действие пакета
+    Пакет передается в dispatch_batch целиком, в ответ клиенту отправляется подтверждение
+        {"ack": [{"status": "accepted"}, {"status": "rejected", "error": ...}, ...]}
+    с результатом по каждому действию в порядке их следования в пакете.
+
+    Вместо JSON клиент может выбрать компактный двоичный формат BinaryCodec (см. negotiate).
+
+    Сообщение {"name": "Subscribe", "game_id": ..., "rate": ...} подписывает соединение на изменения состояния игры:
+    сервер отправляет клиенту снимки с объектами и свойствами, изменившимися с предыдущего снимка,
+    не чаще rate раз в секунду.
+    """
+
+    def __init__(
+            self,
+            host,
+            port,
+            dispatch,
+            dispatch_batch=None,
+            subscribe=None,
+            max_message_size: int = 16 * 1024 * 1024,
+            backlog: int = 4096
+    ):
+        """
+        :param dispatch: функция, передающая сообщение клиента на выполнение
+        :param dispatch_batch: функция, передающая на выполнение пакет сообщений и возвращающая результат по каждому
+                               из них. Если получение результата требует ожидания (например, ответов процессов),
+                               функция возвращает awaitable. По умолчанию сообщения пакета передаются в dispatch
+                               по одному
+        :param subscribe: функция subscribe(action_data, sink), подписывающая sink на снимки состояния игры.
+                          По умолчанию подписка не поддерживается
+        :param max_message_size: максимальный размер одного сообщения в байтах
+        :param backlog: размер очереди ожидающих подключения клиентов
+        """
+        self.host = host
+        self.port = port
+        self.dispatch = dispatch
+        self.dispatch_batch = dispatch_batch or self.dispatch_each
+        self.subscribe = subscribe
+        self.max_message_size = max_message_size
+        self.backlog = backlog
+        self.server = None
+
+    def dispatch_each(self, actions_data: list) -> list:
+        results = []
+        for action_data in actions_data:
+            try:
+                self.dispatch(action_data)
+                results.append({'status': 'accepted'})
+            except Exception as e:
+                results.append({'status': 'rejected', 'error': str(e)})
+        return results
+
+    @staticmethod
+    def get_batch(message):
+        """Действия пакета или None, если сообщение содержит одно действие"""
+        if isinstance(message, list):
+            return message
+
+        if isinstance(message, dict) and 'actions' in message:
+            game_id = message.get('game_id')
+            if game_id is None:
+                return message['actions']
+            return [
+                dict(action_data, game_id=game_id)
+                if isinstance(action_data, dict) and 'game_id' not in action_data else action_data
+                for action_data in message['actions']
+            ]
+
+        return None
+
+    async def negotiate(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Выбрать формат сообщений соединения. Клиент, использующий двоичный формат, начинает соединение с
+        BinaryCodec.MAGIC, сервер подтверждает выбор теми же байтами. Иначе используется JSON.
+        :return: формат и уже прочитанное начало первого сообщения
+        """
+        first = await reader.read(1)
+        if first == BinaryCodec.MAGIC[:1]:
+            magic = first + await reader.readexactly(len(BinaryCodec.MAGIC) - 1)
+            if magic != BinaryCodec.MAGIC:
+                raise CodecException(f'Unknown codec {magic!r}')
+            writer.write(BinaryCodec.MAGIC)
+            return BinaryCodec(self.max_message_size), b''
+
+        return JsonCodec(), first
+
+    async def handle_message(self, data: bytes, codec, writer) -> None:
+        message = codec.decode(data)
+
+        if isinstance(message, dict) and message.get('name') == 'Subscribe':
+            self.subscribe_client(message, codec, writer)
+            return
+
+        actions_data = self.get_batch(message)
+        if actions_data is None:
+            self.dispatch(message)
+            return
+
+        results = self.dispatch_batch(actions_data)
+        if inspect.isawaitable(results):
+            results = await results
+        writer.write(codec.encode_ack(results))
+        await writer.drain()
+
+    def subscribe_client(self, action_data: dict, codec, writer) -> None:
+        if self.subscribe is None:
+            raise ValueError('Subscriptions are not supported')
+
+        loop = asyncio.get_running_loop()
+
+        def send_snapshot(game_id, objects):
+            if not writer.is_closing():
+                writer.write(codec.encode_snapshot(game_id, objects))
+
+        def sink(game_id, objects):
+            """Вызывается в потоке игры, кодирование и отправка снимка выполняются в цикле событий"""
+            if writer.is_closing():
+                raise ConnectionError('Subscriber is disconnected')
+            try:
+                loop.call_soon_threadsafe(send_snapshot, game_id, objects)
+            except RuntimeError:
+                # Цикл событий сервера остановлен
+                raise ConnectionError('Server is stopped') from None
+
+        self.subscribe(action_data, sink)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            codec, data = await self.negotiate(reader, writer)
+            if not data and isinstance(codec, JsonCodec):
+                return
+
+            while True:
+                try:
+                    data += await codec.read_frame(reader)
+                except ValueError:
+                    # Сообщение больше max_message_size - дальнейшее чтение потока невозможно
+                    print(f'Message is too large from {writer.get_extra_info("peername")}')
+                    break
+
+                if not data:
+                    break
+                if data.strip():
+                    try:
+                        await self.handle_message(data, codec, writer)
+                    except Exception as e:
+                        # Ошибка в сообщении клиента не должна прерывать соединение
+                        print(f'Cannot handle message {data!r}: {e}')
+                data = b''
+        except (ConnectionError, EOFError, CodecException):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(
+            self.handle_client,
+            self.host,
+            self.port,
+            limit=self.max_message_size,
+            backlog=self.backlog
+        )
+
+    async def serve(self) -> None:
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
@@ -0,0 +1,244 @@
+import asyncio
+import multiprocessing
+from itertools import count
+from threading import Lock
+
+from features.base.commands import LambdaCommand
+from features.base.interfaces import ICommand
+from game.commands import CreateGameCommand, resolve_action, resolve_actions, validate_game_settings
+from iocs import IoC
+
+
+def run_worker_process(conn, bootstrap, thread_id):
+    """
+    Точка входа процесса-обработчика игр.
+    Процесс инициализирует IoC и плагины с помощью bootstrap, запускает поток StartThreadCommand и передает в него
+    команды пользователей, полученные из канала conn. Состояние игр остается внутри процесса.
+    """
+    bootstrap()
+
+    # Сообщения в процесс приходят только от роутера: идентификатор новой игры назначен роутером
+    IoC.resolve('Scopes.New', f'{thread_id}-actions')
+    IoC.resolve('Scopes.Current.Set', f'{thread_id}-actions').execute()
+    IoC.resolve(
+        'IoC.Register',
+        'UserActions.CreateGame',
+        lambda game_id, **settings: CreateGameCommand(game_id, **validate_game_settings(settings))
+    ).execute()
+
+    IoC.resolve('Thread.Start', thread_id).execute()
+
+    while True:
+        action_data = conn.recv()
+        if action_data is None:
+            break
+
+        if isinstance(action_data, list):
+            # Пакет действий одной игры: результат разрешения действий возвращается роутеру для ответа клиенту
+            batches, results = resolve_actions(action_data)
+            conn.send(results)
+            for batch in batches:
+                IoC.resolve('Thread.Put', batch).execute()
+            continue
+
+        try:
+            action = resolve_action(action_data)
+        except Exception as e:
+            print(f'Cannot resolve action {action_data}: {e}')
+            continue
+        IoC.resolve('Thread.Put', action).execute()
+
+    # Команды, полученные до остановки, будут выполнены - Hard Stop встает в очередь после них
+    IoC.resolve('Thread.Put', IoC.resolve('Thread.HardStop')).execute()
+    IoC.resolve('Thread').join()
+
+
+class ProcessRouter:
+    """
+    Распределяет сообщения клиентов по процессам-обработчикам игр.
+
+    Сообщения передаются как есть (dict), в процесс-обработчик не передается состояние игр.
+    Новая игра получает идентификатор в роутере и закрепляется за процессом с наименьшим числом игр,
+    все последующие сообщения с этим game_id отправляются в этот же процесс.
+    Сообщения без игры распределяются по процессам по очереди.
+    На пакет действий процесс-обработчик отвечает результатом разрешения каждого действия.
+    """
+
+    def __init__(self, connections):
+        self.connections = connections
+        self.locks = [Lock() for _ in connections]
+        self.games_number = [0] * len(connections)
+        self.affinity = {}  # Идентификатор игры -> номер процесса
+        self.game_counter = count(1)
+        self.next_process = 0
+        self.lock = Lock()
+
+    def get_process(self, game_id=None) -> int:
+        with self.lock:
+            if game_id is None:
+                process = self.next_process
+                self.next_process = (self.next_process + 1) % len(self.connections)
+                return process
+
+            process = self.affinity.get(game_id)
+            if process is None:
+                process = self.games_number.index(min(self.games_number))
+                self.games_number[process] += 1
+                self.affinity[game_id] = process
+            return process
+
+    def assign_game_id(self, action_data: dict) -> dict:
+        if action_data.get('name') == 'CreateGame':
+            # Идентификатор игры назначает только роутер, game_id клиента не используется
+            return dict(action_data, game_id=f'game-{next(self.game_counter)}')
+        return action_data
+
+    def send(self, process: int, message) -> None:
+        with self.locks[process]:
+            self.connections[process].send(message)
+
+    def exchange(self, messages: dict) -> dict:
+        """
+        Отправить сообщения процессам и дождаться их ответов. Все сообщения отправляются до ожидания первого
+        ответа, поэтому процессы обрабатывают их одновременно.
+        :param messages: номер процесса -> сообщение
+        :return: номер процесса -> ответ
+        """
+        # Блокировки берутся в одном порядке, чтобы параллельные пакеты не ждали друг друга по кругу
+        processes = sorted(messages)
+        for process in processes:
+            self.locks[process].acquire()
+        try:
+            for process in processes:
+                self.connections[process].send(messages[process])
+            return {process: self.connections[process].recv() for process in processes}
+        finally:
+            for process in processes:
+                self.locks[process].release()
+
+    def release(self, game_id) -> None:
+        """Освободить привязку остановленной игры к процессу"""
+        with self.lock:
+            process = self.affinity.pop(game_id, None)
+            if process is not None:
+                self.games_number[process] -= 1
+
+    def put(self, action_data: dict) -> None:
+        action_data = self.assign_game_id(action_data)
+        game_id = action_data.get('game_id')
+        self.send(self.get_process(game_id), action_data)
+        if action_data.get('name') == 'StopGame':
+            self.release(game_id)
+
+    def put_batch(self, actions_data: list) -> list:
+        """
+        Отправить пакет действий: действия игр одного процесса передаются в процесс одним сообщением.
+        Команды создаются в процессах-обработчиках, поэтому роутер проверяет только формат действий, а результат
+        по остальным действиям получает от процессов.
+        :return: результат по каждому действию - принято или отклонено
+        """
+        messages = {}  # Номер процесса -> номера действий в пакете и действия
+        results = [None] * len(actions_data)
+        for i, action_data in enumerate(actions_data):
+            if not isinstance(action_data, dict) or 'name' not in action_data:
+                results[i] = {'status': 'rejected', 'error': 'Action name is missing'}
+                continue
+
+            action_data = self.assign_game_id(action_data)
+            indexes, batch = messages.setdefault(self.get_process(action_data.get('game_id')), ([], []))
+            indexes.append(i)
+            batch.append(action_data)
+
+        replies = self.exchange({process: batch for process, (_, batch) in messages.items()})
+        for process, (indexes, batch) in messages.items():
+            for i, result in zip(indexes, replies[process]):
+                results[i] = result
+            for action_data in batch:
+                if action_data['name'] == 'StopGame':
+                    self.release(action_data.get('game_id'))
+        return results
+
+    async def put_batch_async(self, actions_data: list) -> list:
+        """put_batch, ожидающий ответов процессов вне цикла событий"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.put_batch, actions_data)
+
+    def stop(self) -> None:
+        for process, conn in enumerate(self.connections):
+            with self.locks[process]:
+                conn.send(None)
+
+
+class StartProcessPoolCommand(ICommand):
+    """
+    Команда запускает процессы-обработчики игр и регистрирует в текущем скоупе:
+        Process.Put - отправить сообщение клиента в процесс, которому принадлежит игра
+        Process.PutBatch - отправить пакет сообщений, возвращает результат по каждому сообщению
+        Process.PutBatch.Async - то же, но возвращает корутину; ответы процессов ожидаются вне цикла событий
+        Process.Pool - список процессов
+        Process.Pool.Stop - остановить процессы после выполнения полученных ими команд
+
+    :param bootstrap: функция инициализации IoC и плагинов в процессе-обработчике; должна быть доступна по имени
+                      модуля, так как процессы запускаются методом spawn
+    """
+
+    def __init__(self, pool_id, processes_number: int, bootstrap):
+        self.pool_id = pool_id
+        self.processes_number = processes_number
+        self.bootstrap = bootstrap
+
+    def execute(self) -> None:
+        context = multiprocessing.get_context('spawn')
+
+        connections = []
+        processes = []
+        for i in range(self.processes_number):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=run_worker_process,
+                args=(child_conn, self.bootstrap, f'{self.pool_id}-{i}'),
+                daemon=True
+            )
+            process.start()
+            connections.append(parent_conn)
+            processes.append(process)
+
+        router = ProcessRouter(connections)
+
+        IoC.resolve(
+            'IoC.Register',
+            'Process.Put',
+            lambda action_data: LambdaCommand(lambda: router.put(action_data))
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Process.PutBatch',
+            lambda actions_data: router.put_batch(actions_data)
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Process.PutBatch.Async',
+            lambda actions_data: router.put_batch_async(actions_data)
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Process.Pool',
+            lambda: processes
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Process.Pool.Stop',
+            lambda: LambdaCommand(router.stop)
+        ).execute()
+
+
+class StartProcessPoolCommandPlugin(ICommand):
+    def execute(self) -> None:
+        IoC.resolve(
+            'IoC.Register',
+            'Process.Pool.Start',
+            lambda pool_id, processes_number, bootstrap: StartProcessPoolCommand(pool_id, processes_number, bootstrap)
+        ).execute()
@@ -0,0 +1,105 @@
+import json
+from unittest import TestCase
+
+import numpy as np
+
+from network.codecs import BinaryCodec, CodecException, JsonCodec
+
+
+class TestBinaryCodec(TestCase):
+    def setUp(self) -> None:
+        self.codec = BinaryCodec()
+
+    def test_create_game(self):
+        payload = self.codec.encode_action({'name': 'CreateGame'})
+        self.assertEqual(b'\x01', payload)
+        self.assertEqual({'name': 'CreateGame'}, self.codec.decode(payload))
+
+    def test_interpret_game_command(self):
+        action = {
+            'name': 'InterpretGameCommand',
+            'game_id': 'game-1',
+            'operation': {'name': 'StartMovement', 'object_id': 'obj-1', 'initial_velocity': 3, 'scale': 0.5}
+        }
+        self.assertEqual(action, self.codec.decode(self.codec.encode_action(action)))
+
+    def test_operation_without_object(self):
+        action = {'name': 'InterpretGameCommand', 'game_id': 'game-1', 'operation': {'name': 'Movement.Batch'}}
+        self.assertEqual(action, self.codec.decode(self.codec.encode_action(action)))
+
+    def test_batch(self):
+        actions = [
+            {'name': 'CreateGame'},
+            {'name': 'InterpretGameCommand', 'game_id': 'game-1', 'operation': {'name': 'Rotation', 'object_id': 'a'}}
+        ]
+        self.assertEqual(actions, self.codec.decode(self.codec.encode_action(actions)))
+
+    def test_subscribe(self):
+        action = {'name': 'Subscribe', 'game_id': 'game-1', 'rate': 20.0}
+        self.assertEqual(action, self.codec.decode(self.codec.encode_action(action)))
+
+        action = {'name': 'Subscribe', 'game_id': 'game-1', 'rate': None}
+        self.assertEqual(action, self.codec.decode(self.codec.encode_action(action)))
+
+    def test_malformed_message(self):
+        with self.assertRaises(CodecException):
+            self.codec.decode(b'\x02\x05')
+
+        with self.assertRaises(CodecException):
+            self.codec.decode(b'\x7f')
+
+    def test_truncated_string(self):
+        payload = self.codec.encode_action({'name': 'Subscribe', 'game_id': 'game-1', 'rate': None})
+        with self.assertRaisesRegex(CodecException, 'truncated'):
+            self.codec.decode(payload[:5])
+
+        payload = self.codec.encode_action([{'name': 'CreateGame'}])
+        with self.assertRaisesRegex(CodecException, 'truncated'):
+            self.codec.decode(payload[:-1])
+
+    def test_ack(self):
+        results = [
+            {'status': 'accepted'},
+            {'status': 'rejected', 'error': 'Unknown action'},
+            {'status': 'accepted', 'game_id': 'game-1'}
+        ]
+        frame = self.codec.encode_ack(results)
+        self.assertEqual(len(frame) - 4, int.from_bytes(frame[:4], 'little'))
+        self.assertEqual(results, self.codec.decode_ack(frame[4:]))
+
+    def test_snapshot(self):
+        """Снимок упаковывает только переданные свойства объектов"""
+        objects = {
+            'obj-1': {'position': np.array([10, -20]), 'fuel_level': 99, 'direction': 3},
+            'obj-2': {'fuel_level': 5},
+        }
+        frame = self.codec.encode_snapshot('game-1', objects)
+
+        game_id, decoded = self.codec.decode_snapshot(frame[4:])
+        self.assertEqual('game-1', game_id)
+        self.assertEqual({
+            'obj-1': {'position': [10, -20], 'fuel_level': 99, 'direction': 3},
+            'obj-2': {'fuel_level': 5},
+        }, decoded)
+
+        # Объект с полным набором свойств: id (2 + 5), маска (1), position (16), fuel_level (8), direction (4)
+        self.assertEqual(36, len(BinaryCodec().encode_snapshot('', {'obj-1': objects['obj-1']})) - 4 - 1 - 2 - 4)
+
+
+    def test_snapshot_fractional_values(self):
+        """Дробные позиция и уровень топлива передаются без округления, дробное направление не упаковывается"""
+        objects = {'obj-1': {'position': np.array([1.5, -2.25]), 'fuel_level': 0.5}}
+        _, decoded = self.codec.decode_snapshot(self.codec.encode_snapshot('game-1', objects)[4:])
+        self.assertEqual({'obj-1': {'position': [1.5, -2.25], 'fuel_level': 0.5}}, decoded)
+
+        with self.assertRaises(CodecException):
+            self.codec.encode_snapshot('game-1', {'obj-1': {'direction': 1.5}})
+
+
+class TestJsonCodec(TestCase):
+    def test_snapshot(self):
+        data = JsonCodec().encode_snapshot('game-1', {'obj-1': {'position': np.array([1, 2]), 'fuel_level': np.int64(5)}})
+        self.assertEqual(
+            {'game_id': 'game-1', 'objects': {'obj-1': {'position': [1, 2], 'fuel_level': 5}}},
+            json.loads(data)
+        )
@@ -0,0 +1,146 @@
+from unittest import TestCase
+
+import numpy as np
+
+from game.commands import GameCommand, GameObject
+from game.storage import ColumnarStorage, ColumnarGameObject
+from iocs import IoC
+from iocs.scope_based_strategy import InitScopesCommand
+
+
+class TestColumnarStorage(TestCase):
+    def setUp(self) -> None:
+        self.storage = ColumnarStorage(capacity=2)
+
+    def test_get_set_property(self):
+        obj = self.storage.new_row()
+        obj.set_property('position', np.array([1, 2]))
+        obj.set_property('fuel_level', 100)
+        obj.set_property('id', 'obj-1')
+
+        np.testing.assert_array_equal(np.array([1, 2]), obj.get_property('position'))
+        self.assertEqual(100, obj.get_property('fuel_level'))
+        self.assertEqual('obj-1', obj.get_property('id'))
+
+        # Свойства хранятся в колонках хранилища
+        self.assertEqual((2, 2), self.storage.columns['position'].shape)
+        self.assertEqual(np.int64, self.storage.columns['fuel_level'].dtype)
+
+    def test_unknown_property(self):
+        obj_1 = self.storage.new_row()
+        obj_2 = self.storage.new_row()
+        obj_1.set_property('fuel_level', 100)
+
+        with self.assertRaises(KeyError):
+            obj_2.get_property('fuel_level')
+
+        with self.assertRaises(KeyError):
+            obj_1.get_property('position')
+
+    def test_read_value_is_not_changed_by_write(self):
+        """Прочитанный вектор не меняется при последующей записи свойства"""
+        obj = self.storage.new_row()
+        obj.set_property('position', np.array([1, 2]))
+
+        position = obj.get_property('position')
+        obj.set_property('position', np.array([5, 5]))
+        np.testing.assert_array_equal(np.array([1, 2]), position)
+
+    def test_column_type_is_extended(self):
+        obj = self.storage.new_row()
+        obj.set_property('velocity', 2)
+        obj.set_property('velocity', 2.5)
+        self.assertEqual(2.5, obj.get_property('velocity'))
+
+        obj.set_property('velocity', np.array([1, 2]))
+        np.testing.assert_array_equal(np.array([1, 2]), obj.get_property('velocity'))
+
+    def test_storage_grows(self):
+        objects = [self.storage.new_row() for _ in range(5)]
+        for i, obj in enumerate(objects):
+            obj.set_property('fuel_level', i)
+
+        self.assertEqual(8, self.storage.capacity)
+        self.assertEqual([0, 1, 2, 3, 4], [obj.get_property('fuel_level') for obj in objects])
+        np.testing.assert_array_equal(np.array([0, 1, 2, 3, 4]), self.storage.column('fuel_level'))
+
+    def test_add_game_object(self):
+        """Свойства GameObject копируются в хранилище"""
+        game_obj = GameObject()
+        game_obj.set_property('fuel_level', 10)
+
+        self.storage.add('obj-1', game_obj)
+        obj = self.storage.get_object('obj-1')
+
+        self.assertIsInstance(obj, ColumnarGameObject)
+        self.assertEqual(10, obj.get_property('fuel_level'))
+        self.assertEqual(obj, self.storage.get_object('obj-1'))
+        self.assertEqual([obj], list(self.storage.objects()))
+
+    def test_collect_changes(self):
+        obj_1 = self.storage.add('obj-1', self.storage.new_row())
+        obj_2 = self.storage.add('obj-2', self.storage.new_row())
+        reader = self.storage.changes_reader()
+        obj_1.set_property('fuel_level', 10)
+        obj_2.set_property('direction', 1)
+        self.assertEqual({'obj-1': {'fuel_level': 10}, 'obj-2': {'direction': 1}}, reader.collect())
+        self.assertEqual({}, reader.collect())
+
+        # Групповые команды отмечают измененные строки сами
+        self.storage.column('fuel_level')[:] -= 1
+        self.storage.mark_dirty('fuel_level', [0])
+        obj_2.set_property('direction', 2)
+        self.assertEqual({'obj-1': {'fuel_level': 9}}, reader.collect([0]))
+        self.assertEqual({'obj-2': {'direction': 2}}, reader.collect())
+
+    def test_readers_are_independent(self):
+        obj = self.storage.add('obj-1', self.storage.new_row())
+        reader_1 = self.storage.changes_reader()
+        reader_2 = self.storage.changes_reader()
+        obj.set_property('fuel_level', 10)
+        self.assertEqual({'obj-1': {'fuel_level': 10}}, reader_1.collect())
+        self.assertEqual({'obj-1': {'fuel_level': 10}}, reader_2.collect())
+
+        # Маски изменений растут вместе с хранилищем
+        rows = [self.storage.new_row() for _ in range(self.storage.capacity)]
+        self.storage.add('obj-last', rows[-1])
+        rows[-1].set_property('fuel_level', 5)
+        reader_2.close()
+        rows[-1].set_property('direction', 1)
+        self.assertEqual({'obj-last': {'fuel_level': 5, 'direction': 1}}, reader_1.collect())
+        self.assertEqual({'obj-last': {'fuel_level': 5}}, reader_2.collect())
+
+
+class TestColumnarGame(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        InitScopesCommand().execute()
+
+    def tearDown(self) -> None:
+        IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+        IoC.resolve('Scopes.Clear').execute()
+
+    def test_game_objects_are_storage_rows(self):
+        GameCommand('game-id', columnar=True)
+
+        storage = IoC.resolve('Objects.Storage')
+        obj = IoC.resolve('Objects.Get', 'obj-2')
+        self.assertIsInstance(obj, ColumnarGameObject)
+        self.assertIs(storage, obj.storage)
+        np.testing.assert_array_equal(np.array([0, 1000]), obj.get_property('position'))
+        self.assertEqual(2, len(list(IoC.resolve('Objects.All'))))
+
+    def test_changes(self):
+        for columnar in (False, True):
+            with self.subTest(columnar=columnar):
+                GameCommand(f'game-id-{columnar}', columnar=columnar, track_changes=True)
+                reader = IoC.resolve('Objects.Changes.Reader')
+
+                IoC.resolve('Objects.Get', 'obj-2').set_property('fuel_level', 50)
+                self.assertEqual({'obj-2': {'fuel_level': 50}}, reader.collect())
+
+    def test_changes_are_not_tracked_by_default(self):
+        for columnar in (False, True):
+            with self.subTest(columnar=columnar):
+                GameCommand(f'game-id-{columnar}', columnar=columnar)
+                self.assertIsNone(IoC.resolve('Objects.Changes.Reader'))
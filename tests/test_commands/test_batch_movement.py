@@ -0,0 +1,127 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+import numpy as np
+
+from exception_handler import ExceptionHandler
+from exceptions import BatchCommandException
+from features.movement.commands import BatchMovement, MoveCommandPluginCommand
+from game.commands import GameObject
+from game.storage import ColumnarStorage
+from iocs import IoC
+from iocs.scope_based_strategy import InitScopesCommand
+
+
+class TestBatchMovement(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        InitScopesCommand().execute()
+
+    def setUp(self) -> None:
+        # Создаем новый скоуп чтобы не вносить зависимости в Root скоуп
+        IoC.resolve('Scopes.New', 'scope-id')
+        IoC.resolve('Scopes.Current.Set', 'scope-id').execute()
+        MoveCommandPluginCommand().execute()
+
+        self.exc_handler = Mock(ExceptionHandler)
+        IoC.resolve('IoC.Register', 'ExceptionHandler', lambda: self.exc_handler).execute()
+
+        self.storage = ColumnarStorage()
+        IoC.resolve('IoC.Register', 'Objects.Storage', lambda: self.storage).execute()
+
+    def tearDown(self) -> None:
+        IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+        IoC.resolve('Scopes.Clear').execute()
+
+    def add_object(self, obj_id, **properties):
+        obj = GameObject()
+        for key, value in properties.items():
+            obj.set_property(key, value)
+        return self.storage.add(obj_id, obj)
+
+    def test_command(self):
+        """Тестируем, что групповое движение совпадает с движением каждого объекта по отдельности"""
+        objects = []
+        for i, (directions_number, direction, velocity) in enumerate([(4, 1, 3), (8, 3, 5), (6, 1, 1), (16, 13, 7)]):
+            objects.append(self.add_object(
+                f'obj-{i}',
+                position=np.array([10, 20]),
+                velocity=velocity,
+                direction=direction,
+                directions_number=directions_number,
+                fuel_level=10,
+                fuel_consumption=3
+            ))
+
+        expected_positions = [
+            obj.get_property('position') + IoC.resolve('IMovable:velocity.get', obj)
+            for obj in objects
+        ]
+
+        IoC.resolve('Commands.Move.Batch').execute()
+
+        for obj, expected_position in zip(objects, expected_positions):
+            np.testing.assert_array_equal(expected_position, obj.get_property('position'))
+            self.assertEqual(7, obj.get_property('fuel_level'))
+        self.exc_handler.handle.assert_not_called()
+
+    def test_not_enough_fuel(self):
+        """Объекты без топлива не двигаются, их идентификаторы передаются в BatchCommandException"""
+        properties = dict(velocity=1, direction=0, directions_number=4, fuel_consumption=3)
+        obj_1 = self.add_object('obj-1', position=np.array([0, 0]), fuel_level=2, **properties)
+        obj_2 = self.add_object('obj-2', position=np.array([0, 0]), fuel_level=3, **properties)
+
+        with self.assertRaises(BatchCommandException) as context:
+            BatchMovement(self.storage).execute()
+
+        np.testing.assert_array_equal(np.array([0, 0]), obj_1.get_property('position'))
+        self.assertEqual(2, obj_1.get_property('fuel_level'))
+        np.testing.assert_array_equal(np.array([1, 0]), obj_2.get_property('position'))
+        self.assertEqual(0, obj_2.get_property('fuel_level'))
+
+        self.assertEqual(['obj-1'], context.exception.object_ids)
+
+    def test_objects_without_velocity_are_not_moved(self):
+        self.add_object('obj-1', position=np.array([0, 0]), fuel_level=5, fuel_consumption=1, velocity=1,
+                        direction=0, directions_number=4)
+        obj_2 = self.add_object('obj-2', position=np.array([0, 0]), fuel_level=5, fuel_consumption=1,
+                                direction=0, directions_number=4)
+
+        BatchMovement(self.storage).execute()
+
+        np.testing.assert_array_equal(np.array([0, 0]), obj_2.get_property('position'))
+        self.assertEqual(5, obj_2.get_property('fuel_level'))
+
+    def test_moved_objects_are_marked_changed(self):
+        properties = dict(velocity=1, direction=0, directions_number=4, fuel_consumption=3)
+        self.add_object('obj-1', position=np.array([0, 0]), fuel_level=2, **properties)
+        self.add_object('obj-2', position=np.array([0, 0]), fuel_level=3, **properties)
+        reader = self.storage.changes_reader()
+
+        with self.assertRaises(BatchCommandException):
+            BatchMovement(self.storage).execute()
+
+        changes = reader.collect()
+        self.assertEqual(['obj-2'], list(changes))
+        self.assertEqual({'position', 'fuel_level'}, set(changes['obj-2']))
+
+    def test_fractional_fuel_consumption(self):
+        """Дробный расход топлива списывается с целого уровня топлива так же, как в BurnFuel"""
+        properties = dict(velocity=1, direction=0, directions_number=4)
+        obj_1 = self.add_object('obj-1', position=np.array([0, 0]), fuel_level=2, fuel_consumption=0.5, **properties)
+        obj_2 = self.add_object('obj-2', position=np.array([0, 0]), fuel_level=2, fuel_consumption=1, **properties)
+
+        BatchMovement(self.storage).execute()
+
+        self.assertEqual(1.5, obj_1.get_property('fuel_level'))
+        self.assertEqual(1, obj_2.get_property('fuel_level'))
+        np.testing.assert_array_equal(np.array([1, 0]), obj_1.get_property('position'))
+
+    def test_game_without_columnar_storage(self):
+        # Скоуп игры без Objects.Storage
+        IoC.resolve('Scopes.New', 'game-id', 'ROOT')
+        IoC.resolve('Scopes.Current.Set', 'game-id').execute()
+        MoveCommandPluginCommand().execute()
+
+        with self.assertRaisesRegex(BatchCommandException, 'columnar'):
+            IoC.resolve('Commands.Move.Batch')
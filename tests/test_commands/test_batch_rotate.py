@@ -0,0 +1,81 @@
+import math
+from unittest import TestCase
+from unittest.mock import Mock
+
+import numpy as np
+
+from features.rotation.commands import BatchRotate, ChangeVelocity, Rotate
+from features.rotation.interfaces import IRotatable, IVelocityChangeable
+from game.commands import GameObject
+from game.storage import ColumnarStorage
+
+
+class TestBatchRotate(TestCase):
+    def setUp(self) -> None:
+        self.storage = ColumnarStorage()
+        self.params = [(13, 5, 16), (1, 1, 4), (7, 3, 8), (2, -1, 6)]
+
+    def add_object(self, obj_id, **properties):
+        obj = GameObject()
+        for key, value in properties.items():
+            obj.set_property(key, value)
+        return self.storage.add(obj_id, obj)
+
+    def test_rotate(self):
+        """Тестируем, что групповой поворот совпадает с поворотом каждого объекта по отдельности"""
+        objects = []
+        expected = []
+        for i, (direction, angular_velocity, directions_number) in enumerate(self.params):
+            objects.append(self.add_object(
+                f'obj-{i}',
+                direction=direction,
+                angular_velocity=angular_velocity,
+                directions_number=directions_number,
+                velocity=3
+            ))
+
+            rotatable = Mock(IRotatable)
+            rotatable.get_direction.return_value = direction
+            rotatable.get_angular_velocity.return_value = angular_velocity
+            rotatable.get_directions_number.return_value = directions_number
+            Rotate(rotatable).execute()
+            expected.append(rotatable.set_direction.call_args[0][0])
+
+        BatchRotate(self.storage).execute()
+
+        self.assertEqual(expected, [obj.get_property('direction') for obj in objects])
+        # Скорость задана модулем и не меняется
+        self.assertEqual([3, 3, 3, 3], [obj.get_property('velocity') for obj in objects])
+
+    def test_rotate_velocity_vector(self):
+        """Вектор скорости поворачивается в новое направление с тем же округлением, что и в ChangeVelocity"""
+        objects = []
+        expected = []
+        for i, (direction, angular_velocity, directions_number) in enumerate(self.params):
+            velocity = np.array([4 + i, 6 - i])
+            objects.append(self.add_object(
+                f'obj-{i}',
+                direction=direction,
+                angular_velocity=angular_velocity,
+                directions_number=directions_number,
+                velocity=velocity
+            ))
+
+            new_direction = (direction + angular_velocity) % directions_number
+            velocity_changeable = Mock(IVelocityChangeable)
+            velocity_changeable.get_velocity.return_value = velocity
+            velocity_changeable.get_angle.return_value = (2 * math.pi / directions_number) * new_direction
+            ChangeVelocity(velocity_changeable).execute()
+            expected.append(velocity_changeable.set_velocity.call_args[0][0])
+
+        BatchRotate(self.storage).execute()
+
+        for obj, expected_velocity in zip(objects, expected):
+            np.testing.assert_array_equal(expected_velocity, obj.get_property('velocity'))
+
+    def test_objects_without_rotation_properties_are_not_rotated(self):
+        obj = self.add_object('obj-1', direction=1, directions_number=4)
+        self.add_object('obj-2', direction=1, angular_velocity=1, directions_number=4)
+
+        BatchRotate(self.storage).execute()
+        self.assertEqual(1, obj.get_property('direction'))
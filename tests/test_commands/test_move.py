@@ -3,7 +3,7 @@ from unittest.mock import Mock
 
 import numpy as np
 
-from features.movement.commands import Move
+from features.movement.commands import InPlaceMove, Move
 from features.movement.interfaces import IMovable
 
 
@@ -44,3 +44,34 @@ class TestMove(TestCase):
         move = Move(self.movable)
         with self.assertRaisesRegex(Exception, 'Error set position'):
             move.execute()
+
+
+class TestInPlaceMove(TestCase):
+    def setUp(self) -> None:
+        self.movable = Mock(IMovable)
+        self.movable.get_velocity.return_value = np.array([-7, 3])
+
+    def test_move(self):
+        position = np.array([12, 5])
+        self.movable.get_position.return_value = position
+
+        InPlaceMove(self.movable).execute()
+
+        np.testing.assert_array_equal(np.array([5, 8]), position)
+        self.assertIs(position, self.movable.set_position.call_args[0][0])
+
+    def test_position_cannot_be_changed_in_place(self):
+        """Если позицию нельзя изменить на месте, создается новый массив, как в Move"""
+        read_only = np.array([12, 5])
+        read_only.flags.writeable = False
+
+        for position, velocity in [(read_only, np.array([-7, 3])), (np.array([12, 5]), np.array([-7.5, 3]))]:
+            with self.subTest(position=position, velocity=velocity):
+                self.movable.get_position.return_value = position
+                self.movable.get_velocity.return_value = velocity
+
+                InPlaceMove(self.movable).execute()
+
+                new_position = self.movable.set_position.call_args[0][0]
+                self.assertIsNot(position, new_position)
+                np.testing.assert_array_equal(position + velocity, new_position)
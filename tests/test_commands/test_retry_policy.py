@@ -0,0 +1,115 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from features.base.interfaces import ICommand
+from features.service.commands import Log, RetryPolicy, ScheduledRetry
+from iocs import IoC
+from iocs.scope_based_strategy import InitScopesCommand
+
+
+class OtherCommand(ICommand):
+    def execute(self) -> None:
+        ...
+
+
+class TestRetryPolicy(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        InitScopesCommand().execute()
+
+    def setUp(self) -> None:
+        IoC.resolve('Scopes.New', 'scope-id')
+        IoC.resolve('Scopes.Current.Set', 'scope-id').execute()
+
+        self.delayed = []  # (команда, срок)
+        self.queue = []
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.PutNotBefore',
+            lambda cmd, not_before: Mock(execute=lambda: self.delayed.append((cmd, not_before)))
+        ).execute()
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Put',
+            lambda cmd: Mock(execute=lambda: self.queue.append(cmd))
+        ).execute()
+
+        self.now = 100.0
+        self.rng = Mock(random=Mock(return_value=0.0))
+        self.cmd = Mock(ICommand)
+        self.exc = ValueError('Error')
+
+    def tearDown(self) -> None:
+        IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+        IoC.resolve('Scopes.Clear').execute()
+
+    def create_policy(self, **kwargs):
+        return RetryPolicy(clock=lambda: self.now, rng=self.rng, **kwargs)
+
+    def test_exponential_backoff(self):
+        """Каждый следующий повтор откладывается вдвое дольше, после max_attempts команда пишется в лог"""
+        policy = self.create_policy(max_attempts=3, base_delay=0.1)
+
+        cmd = self.cmd
+        for expected_delay in (0.1, 0.2, 0.4):
+            policy.handle(cmd, self.exc)
+            cmd, not_before = self.delayed.pop()
+            self.assertIsInstance(cmd, ScheduledRetry)
+            self.assertIs(self.cmd, cmd.cmd)
+            self.assertAlmostEqual(self.now + expected_delay, not_before)
+
+        policy.handle(cmd, self.exc)
+        self.assertEqual([], self.delayed)
+        self.assertIsInstance(self.queue[0], Log)
+        self.assertIs(self.cmd, self.queue[0].cmd)
+
+    def test_jitter_and_max_delay(self):
+        self.rng.random.return_value = 1.0
+        policy = self.create_policy(base_delay=1, max_delay=3, jitter=0.5)
+
+        self.assertAlmostEqual(0.5, policy.get_delay(1))
+        self.assertAlmostEqual(1.5, policy.get_delay(5))
+
+    def test_budget(self):
+        """Бюджет повторов считается для каждого типа команд за период"""
+        policy = self.create_policy(budget=2, budget_period=1)
+
+        for _ in range(3):
+            policy.handle(self.cmd, self.exc)
+        policy.handle(OtherCommand(), self.exc)
+        self.assertEqual(3, len(self.delayed))
+        self.assertEqual(1, len(self.queue))
+
+        self.now += 1
+        policy.handle(self.cmd, self.exc)
+        self.assertEqual(4, len(self.delayed))
+
+    def test_retry_in_original_scope(self):
+        IoC.resolve('Scopes.New', 'game-id')
+        IoC.resolve('Scopes.Current.Set', 'game-id').execute()
+        self.cmd.execute.side_effect = lambda: self.assertEqual('game-id', IoC.resolve('Scopes.Current').id)
+
+        self.create_policy().handle(self.cmd, self.exc)
+        IoC.resolve('Scopes.Current.Set', 'scope-id').execute()
+
+        retry, _ = self.delayed.pop()
+        retry.execute()
+        self.cmd.execute.assert_called_once()
+
+    def test_retry_in_game_queue(self):
+        """Повтор команды игры откладывается в очередь игры, а не потока"""
+        game_delayed = []
+        IoC.resolve('Scopes.New', 'game-id')
+        IoC.resolve('Scopes.Current.Set', 'game-id').execute()
+        IoC.resolve(
+            'IoC.Register',
+            'Queue.PutNotBefore',
+            lambda cmd, not_before: Mock(execute=lambda: game_delayed.append((cmd, not_before)))
+        ).execute()
+
+        self.create_policy(base_delay=0.1).handle(self.cmd, self.exc)
+
+        self.assertEqual([], self.delayed)
+        retry, not_before = game_delayed.pop()
+        self.assertIs(self.cmd, retry.cmd)
+        self.assertAlmostEqual(self.now + 0.1, not_before)
@@ -0,0 +1,34 @@
+import math
+from unittest import TestCase
+
+import numpy as np
+
+from features.base.directions import velocity_vector, direction_vectors
+
+
+class TestVelocityVector(TestCase):
+    def test_table_matches_trigonometry(self):
+        """Тестируем, что вектор скорости из таблицы совпадает с вычисленным через тригонометрию"""
+        for directions_number in (1, 3, 4, 6, 8, 12, 16, 360):
+            for direction in range(-2, directions_number + 2):
+                for velocity_modulus in (1, 2, 5, 7, 2.5):
+                    angle = (2 * math.pi / directions_number) * direction
+                    expected = np.array([
+                        round(velocity_modulus * math.cos(angle)),
+                        round(velocity_modulus * math.sin(angle))
+                    ])
+                    np.testing.assert_array_equal(
+                        expected,
+                        velocity_vector(directions_number, direction, velocity_modulus)
+                    )
+
+    def test_cached_vectors_are_read_only(self):
+        velocity = velocity_vector(4, 1, 10)
+        self.assertIs(velocity, velocity_vector(4, 1, 10))
+
+        with self.assertRaises(ValueError):
+            velocity[0] = 1
+
+        cos, sin = direction_vectors(4)
+        with self.assertRaises(ValueError):
+            cos[0] = 0
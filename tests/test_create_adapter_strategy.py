@@ -1,8 +1,13 @@
+import gc
+import weakref
+from abc import ABC, abstractmethod
 from unittest import TestCase
 from unittest.mock import Mock, patch
 
-from features.base.commands import InitCreateCommandAdapterStrategy
+from features.base.commands import InitCreateCommandAdapterStrategy, PropertyGetter, PropertySetter
 from features.base.interfaces import UObject
+from game.commands import GameObject
+from game.storage import ColumnarStorage
 from iocs import IoC
 from iocs.scope_based_strategy import InitScopesCommand
 
@@ -26,6 +31,14 @@ class IAnotherActionable:
         ...
 
 
+class ISlotted(ABC):
+    __slots__ = ()
+
+    @abstractmethod
+    def get_field_1(self):
+        ...
+
+
 class TestCreateCommandAdapterStrategy(TestCase):
     @classmethod
     def setUpClass(cls) -> None:
@@ -100,3 +113,130 @@ class TestCreateCommandAdapterStrategy(TestCase):
 
             another_actionable.get_field_3()
             mocked_resolve.assert_called_with('IAnotherActionable:field_3.get', obj)
+
+    def test_adapter_is_reused(self):
+        """Для того же объекта и интерфейса возвращается тот же адаптер, даже если предыдущий уже не используется"""
+        obj = Mock(UObject)
+        adapter_id = id(IoC.resolve("Adapter", IActionable, obj))
+        actionable = IoC.resolve("Adapter", IActionable, obj)
+        self.assertEqual(adapter_id, id(actionable))
+        self.assertIsNot(actionable, IoC.resolve("Adapter", IActionable, Mock(UObject)))
+        self.assertIsNot(actionable, IoC.resolve("Adapter", IAnotherActionable, obj))
+
+    def test_adapter_is_released_with_object(self):
+        """Адаптер освобождается вместе с объектом без сборщика циклов"""
+        gc.disable()
+        try:
+            obj = GameObject()
+            adapter = weakref.ref(IoC.resolve("Adapter", IActionable, obj))
+            self.assertIsNotNone(adapter())
+
+            del obj
+            self.assertIsNone(adapter())
+        finally:
+            gc.enable()
+
+    def test_adapter_does_not_keep_object(self):
+        obj = GameObject()
+        obj_ref = weakref.ref(obj)
+        actionable = IoC.resolve("Adapter", IActionable, obj)
+        self.assertIs(obj, actionable.obj)
+
+        del obj
+        self.assertIsNone(obj_ref())
+
+    def test_slotted_adapter(self):
+        """Адаптер интерфейса со __slots__ хранит только ссылку на объект"""
+        adapter = IoC.resolve("Adapter", ISlotted, Mock(UObject))
+        self.assertFalse(hasattr(adapter, '__dict__'))
+
+
+class TestCompiledAdapter(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        InitScopesCommand().execute()
+
+    def setUp(self) -> None:
+        IoC.resolve('Scopes.New', 'scope-id')
+        IoC.resolve('Scopes.Current.Set', 'scope-id').execute()
+
+        InitCreateCommandAdapterStrategy(compiled=True).execute()
+        IoC.resolve('IoC.Register', 'IActionable:field_1.get', PropertyGetter('field_1')).execute()
+        IoC.resolve('IoC.Register', 'IActionable:field_1.set', PropertySetter('field_1')).execute()
+
+    def tearDown(self) -> None:
+        IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+        IoC.resolve('Scopes.Clear').execute()
+
+    def test_property_access_without_ioc(self):
+        obj = Mock(UObject)
+        obj.get_property.return_value = 'value'
+        actionable = IoC.resolve("Adapter", IActionable, obj)
+
+        with patch('iocs.base.IoC.resolve') as mocked_resolve:
+            self.assertEqual('value', actionable.get_field_1())
+            actionable.set_field_1('value 1')
+            mocked_resolve.assert_not_called()
+
+        obj.get_property.assert_called_once_with('field_1')
+        obj.set_property.assert_called_once_with('field_1', 'value 1')
+
+    def test_direct_storage(self):
+        obj = GameObject()
+        obj.set_property('field_1', 'value')
+        actionable = IoC.resolve("Adapter", IActionable, obj)
+
+        with patch.object(GameObject, 'get_property') as get_property:
+            self.assertEqual('value', actionable.get_field_1())
+            get_property.assert_not_called()
+
+    def test_custom_strategy_is_resolved_once(self):
+        strategy = Mock(return_value='value 2')
+        IoC.resolve('IoC.Register', 'IActionable:field_2.get', strategy).execute()
+        obj = Mock(UObject)
+        actionable = IoC.resolve("Adapter", IActionable, obj)
+
+        with patch('iocs.base.IoC.resolve') as mocked_resolve:
+            self.assertEqual('value 2', actionable.get_field_2())
+            mocked_resolve.assert_not_called()
+        strategy.assert_called_once_with(obj)
+
+    def test_reregistered_strategy(self):
+        """Адаптер, созданный после регистрации стратегии в дочернем скоупе, использует новую стратегию"""
+        obj = Mock(UObject)
+        adapter_class = IoC.resolve("Adapter", IActionable, obj).__class__
+        self.assertIs(adapter_class, IoC.resolve("Adapter", IActionable, obj).__class__)
+
+        IoC.resolve('Scopes.New', 'child-scope-id', 'scope-id')
+        IoC.resolve('Scopes.Current.Set', 'child-scope-id').execute()
+        IoC.resolve('IoC.Register', 'IActionable:field_1.get', lambda obj: 'child value').execute()
+
+        self.assertEqual('child value', IoC.resolve("Adapter", IActionable, obj).get_field_1())
+
+        IoC.resolve('Scopes.Current.Set', 'scope-id').execute()
+        self.assertIs(adapter_class, IoC.resolve("Adapter", IActionable, obj).__class__)
+
+    def test_adapter_is_reused(self):
+        obj = GameObject()
+        actionable = IoC.resolve("Adapter", IActionable, obj)
+        self.assertIs(actionable, IoC.resolve("Adapter", IActionable, obj))
+
+        # После регистрации стратегии создается адаптер нового класса, адаптер устаревшего класса не хранится
+        IoC.resolve('IoC.Register', 'IActionable:field_2.get', lambda obj: 'value 2').execute()
+        new_actionable = IoC.resolve("Adapter", IActionable, obj)
+        self.assertIsNot(actionable, new_actionable)
+        self.assertEqual({IActionable: new_actionable}, InitCreateCommandAdapterStrategy.object_adapters[obj])
+
+    def test_columnar_object_adapter_is_reused(self):
+        storage = ColumnarStorage()
+        storage.add('obj-1', GameObject())
+        actionable = IoC.resolve("Adapter", IActionable, storage.get_object('obj-1'))
+        self.assertIs(actionable, IoC.resolve("Adapter", IActionable, storage.get_object('obj-1')))
+
+    def test_unregistered_strategy_is_resolved_on_call(self):
+        obj = Mock(UObject)
+        actionable = IoC.resolve("Adapter", IActionable, obj)
+
+        with patch('iocs.base.IoC.resolve') as mocked_resolve:
+            actionable.get_field_2()
+            mocked_resolve.assert_called_with('IActionable:field_2.get', obj)
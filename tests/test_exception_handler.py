@@ -1,9 +1,11 @@
 from unittest import TestCase
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
+from exceptions import CommandException
+from features.base.commands import LambdaCommand, MacroCommand
 from features.service.commands import Log, Retry, DoubleRetry
 from features.base.interfaces import ICommand
-from exception_handler import ExceptionHandler
+from exception_handler import ExceptionHandler, UnhandledExceptions
 
 
 class TestExceptionHandler(TestCase):
@@ -104,3 +106,103 @@ class TestExceptionHandler(TestCase):
                 cmd = self.queue.pop(0)  # Берем следующую команду из очереди
 
         self.assertIsInstance(cmd, Log)
+
+
+class FailingCommand(ICommand):
+    def __init__(self, exc):
+        self.exc = exc
+
+    def execute(self) -> None:
+        raise self.exc
+
+
+class TestExceptionHandlerDispatch(TestCase):
+    def setUp(self) -> None:
+        self.exc_handler = ExceptionHandler()
+        self.handled = []
+
+    def rule(self, name):
+        return lambda _cmd, _exc: self.handled.append((name, _exc))
+
+    def test_base_classes(self):
+        """Правила для базовых классов команды и исключения подходят и для их наследников"""
+        self.exc_handler.setup(ICommand, LookupError, self.rule('lookup'))
+
+        exc = KeyError('key')
+        self.exc_handler.handle(FailingCommand(exc), exc)
+        self.assertEqual([('lookup', exc)], self.handled)
+
+        with self.assertRaises(ValueError):
+            self.exc_handler.handle(FailingCommand(ValueError()), ValueError())
+
+    def test_most_specific_rule(self):
+        self.exc_handler.setup(ICommand, None, self.rule('any command, any exception'))
+        self.exc_handler.setup(ICommand, KeyError, self.rule('any command'))
+        self.exc_handler.setup(FailingCommand, None, self.rule('failing command, any exception'))
+        self.exc_handler.setup(FailingCommand, LookupError, self.rule('failing command'))
+
+        for cmd, exc, expected in [
+            (FailingCommand(None), KeyError(), 'failing command'),
+            (FailingCommand(None), ValueError(), 'failing command, any exception'),
+            (Retry(None), KeyError(), 'any command'),
+            (Retry(None), ValueError(), 'any command, any exception'),
+        ]:
+            self.exc_handler.handle(cmd, exc)
+            self.assertEqual(expected, self.handled.pop()[0])
+
+    def test_new_rule_resets_index(self):
+        exc = KeyError()
+        self.exc_handler.setup(ICommand, None, self.rule('any'))
+        self.exc_handler.handle(FailingCommand(exc), exc)
+
+        self.exc_handler.setup(FailingCommand, KeyError, self.rule('specific'))
+        self.exc_handler.handle(FailingCommand(exc), exc)
+        self.assertEqual(['any', 'specific'], [name for name, _ in self.handled])
+
+    def test_unwrap_causes(self):
+        """Ошибка команды внутри MacroCommand обрабатывается по правилу для исходного исключения"""
+        exc_handler = ExceptionHandler(unwrap_causes=True)
+        exc_handler.setup(ICommand, CommandException, self.rule('wrapped'))
+        exc_handler.setup(ICommand, KeyError, self.rule('cause'))
+
+        for error, expected in [(KeyError('key'), 'cause'), (ValueError('value'), 'wrapped')]:
+            cmd = MacroCommand([LambdaCommand(lambda: None), FailingCommand(error)])
+            try:
+                cmd.execute()
+            except Exception as exc:
+                exc_handler.handle(cmd, exc)
+
+            name, handled_exc = self.handled.pop()
+            self.assertEqual(expected, name)
+            if expected == 'cause':
+                self.assertIs(error, handled_exc)
+            else:
+                self.assertIsInstance(handled_exc, CommandException)
+                self.assertIs(error, handled_exc.__cause__)
+
+
+class TestUnhandledExceptions(TestCase):
+    def test_failure_storm_is_aggregated(self):
+        """Одинаковые необработанные исключения попадают в лог не чаще раза в интервал, но все учитываются"""
+        unhandled = UnhandledExceptions(report_interval=60)
+        cmd = FailingCommand(None)
+
+        with self.assertLogs('exception_handler', level='ERROR') as logs:
+            for _ in range(1000):
+                unhandled.record(cmd, KeyError('key'))
+            unhandled.record(cmd, ValueError('value'))
+
+        self.assertEqual(2, len(logs.records))
+        self.assertEqual({(FailingCommand, KeyError): 1000, (FailingCommand, ValueError): 1}, unhandled.get_counts())
+
+    @patch('exception_handler.monotonic', side_effect=[0, 1, 2, 11])
+    def test_suppressed_number_is_reported(self, _):
+        unhandled = UnhandledExceptions(report_interval=10)
+        cmd = FailingCommand(None)
+
+        with self.assertLogs('exception_handler', level='ERROR') as logs:
+            for _ in range(4):
+                unhandled.record(cmd, KeyError('key'))
+
+        self.assertEqual(2, len(logs.records))
+        self.assertIn('2 more since the last report, 4 in total', logs.output[1])
@@ -0,0 +1,198 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from exception_handler import ExceptionHandler
+from features.base.interfaces import ICommand
+from game.commands import GameCommand
+from game.snapshots import default_delivery
+from iocs import IoC
+from iocs.scope_based_strategy import InitScopesCommand
+
+
+@patch('builtins.print')
+class TestGameCommand(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        InitScopesCommand().execute()
+
+    def setUp(self) -> None:
+        IoC.resolve('Scopes.New', 'scope-id')
+        IoC.resolve('Scopes.Current.Set', 'scope-id').execute()
+
+        self.exc_handler = Mock(ExceptionHandler)
+        IoC.resolve('IoC.Register', 'ExceptionHandler', lambda: self.exc_handler).execute()
+
+        self.wake = Mock(ICommand)
+        IoC.resolve('IoC.Register', 'Thread.Scheduler.Wake', lambda: self.wake).execute()
+
+    def tearDown(self) -> None:
+        IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+        IoC.resolve('Scopes.Clear').execute()
+
+    def test_tick_executes_queued_commands(self, _):
+        """За такт выполняются все команды, находившиеся в очереди на начало такта"""
+        game = GameCommand('game-id')
+        commands = [Mock(ICommand) for _ in range(3)]
+        for cmd in commands:
+            IoC.resolve('Queue.Put', cmd).execute()
+
+        game.execute()
+        for cmd in commands:
+            cmd.execute.assert_called_once()
+
+    def test_put_wakes_scheduler(self, _):
+        """Команда в пустую очередь игры будит планировщик потока"""
+        game = GameCommand('game-id')
+        IoC.resolve('Queue.Put', Mock(ICommand)).execute()
+        IoC.resolve('Queue.Put', Mock(ICommand)).execute()
+        self.wake.execute.assert_called_once()
+
+        game.execute()
+        IoC.resolve('Queue.Put', Mock(ICommand)).execute()
+        self.assertEqual(2, self.wake.execute.call_count)
+
+    def test_repeated_command_runs_once_per_tick(self, _):
+        game = GameCommand('game-id')
+        cmd = Mock(ICommand)
+        IoC.resolve('Queue.PutWithRepeat', cmd).execute()
+
+        game.execute()
+        game.execute()
+        self.assertEqual(2, cmd.execute.call_count)
+        self.assertEqual(1, len(game.queue))
+
+    def test_max_commands(self, _):
+        game = GameCommand('game-id', max_commands=2)
+        commands = [Mock(ICommand) for _ in range(3)]
+        for cmd in commands:
+            IoC.resolve('Queue.Put', cmd).execute()
+
+        game.execute()
+        commands[0].execute.assert_called_once()
+        commands[1].execute.assert_called_once()
+        commands[2].execute.assert_not_called()
+
+        game.execute()
+        commands[2].execute.assert_called_once()
+
+    def test_time_budget(self, _):
+        game = GameCommand('game-id', time_budget_ms=0)
+        commands = [Mock(ICommand) for _ in range(2)]
+        for cmd in commands:
+            IoC.resolve('Queue.Put', cmd).execute()
+
+        game.execute()
+        commands[0].execute.assert_called_once()
+        commands[1].execute.assert_not_called()
+
+    def test_command_error_does_not_stop_tick(self, _):
+        game = GameCommand('game-id')
+        cmd_1 = Mock(ICommand)
+        cmd_error = ValueError('Error')
+        cmd_1.execute.side_effect = cmd_error
+        cmd_2 = Mock(ICommand)
+        IoC.resolve('Queue.Put', cmd_1).execute()
+        IoC.resolve('Queue.Put', cmd_2).execute()
+
+        game.execute()
+        self.exc_handler.handle.assert_called_once_with(cmd_1, cmd_error)
+        cmd_2.execute.assert_called_once()
+
+    def test_snapshot_subscription(self, _):
+        """Подписчик получает снимок состояния игры перед тактом"""
+        game = GameCommand('game-id')
+        sink = Mock()
+        IoC.resolve('Snapshots.Subscribe', sink).execute()
+
+        game.execute()
+        self.assertTrue(default_delivery.flush(timeout=5))
+        sink.assert_called_once()
+        game_id, objects = sink.call_args[0]
+        self.assertEqual('game-id', game_id)
+        self.assertEqual({'obj-1', 'obj-2'}, set(objects))
+
+    def test_debug(self, print_mock):
+        GameCommand('game-id').execute()
+        self.assertTrue(default_delivery.flush(timeout=5))
+        print_mock.assert_not_called()
+
+        GameCommand('debug-game-id', debug=True).execute()
+        self.assertTrue(default_delivery.flush(timeout=5))
+        print_mock.assert_any_call('Game : debug-game-id')
+
+    def test_move_in_place(self, _):
+        in_place_move = Mock(ICommand)
+        IoC.resolve('IoC.Register', 'Commands.Move.InPlace', lambda obj: in_place_move).execute()
+
+        GameCommand('game-id', move_in_place=True)
+        self.assertIs(in_place_move, IoC.resolve('Commands.Move', IoC.resolve('Objects.Get', 'obj-1')))
+
+    @patch('game.commands.monotonic')
+    def test_fixed_timestep(self, monotonic_mock, _):
+        """С фиксированным шагом такт выполняется целиком и только тогда, когда наступил его срок"""
+        monotonic_mock.return_value = 10.0
+        game = GameCommand('game-id', tick_rate=10)
+        cmd = Mock(ICommand)
+        IoC.resolve('Queue.PutWithRepeat', cmd).execute()
+
+        game.start_tick()
+        self.assertTrue(game.has_work())
+        game.step()
+        self.assertFalse(game.has_work())
+        self.assertEqual(1, cmd.execute.call_count)
+
+        monotonic_mock.return_value = 10.05
+        game.start_tick()
+        self.assertFalse(game.has_work())
+        self.assertAlmostEqual(10.1, game.next_due_time())
+
+        monotonic_mock.return_value = 10.1
+        game.execute()
+        self.assertEqual(2, cmd.execute.call_count)
+
+    @patch('game.commands.monotonic')
+    def test_put_not_before(self, monotonic_mock, _):
+        """Отложенная команда выполняется в первом такте игры после ее срока"""
+        monotonic_mock.return_value = 10.0
+        game = GameCommand('game-id')
+        cmd = Mock(ICommand)
+        IoC.resolve('Queue.PutNotBefore', cmd, 10.5).execute()
+
+        game.execute()
+        cmd.execute.assert_not_called()
+        self.assertEqual(10.5, game.next_due_time())
+
+        monotonic_mock.return_value = 10.5
+        game.execute()
+        cmd.execute.assert_called_once()
+        self.assertIsNone(game.next_due_time())
+
+    @patch('game.commands.monotonic')
+    def test_fixed_timestep_catch_up(self, monotonic_mock, _):
+        """Отставшая игра нагоняет расписание не более чем max_catch_up_ticks тактами и учитывает отставание"""
+        monotonic_mock.return_value = 10.0
+        game = GameCommand('game-id', tick_rate=10, max_catch_up_ticks=3)
+        cmd = Mock(ICommand)
+        IoC.resolve('Queue.PutWithRepeat', cmd).execute()
+        game.execute()
+
+        monotonic_mock.return_value = 10.55
+        game.execute()
+        # Просрочены такты 10.1 - 10.5: три выполняются, два пропускаются
+        self.assertEqual(4, cmd.execute.call_count)
+
+        lag = IoC.resolve('Game.Lag')
+        self.assertEqual(4, lag.ticks)
+        self.assertEqual(2, lag.catch_up_ticks)
+        self.assertEqual(2, lag.dropped_ticks)
+        self.assertAlmostEqual(0.45, lag.last_lag)
+        self.assertAlmostEqual(0.45, lag.max_lag)
+
+        # Следующий такт - по расписанию после пропущенных
+        monotonic_mock.return_value = 10.58
+        game.execute()
+        self.assertEqual(4, cmd.execute.call_count)
+        monotonic_mock.return_value = 10.6
+        game.execute()
+        self.assertEqual(5, cmd.execute.call_count)
+        self.assertAlmostEqual(0.0, lag.last_lag)
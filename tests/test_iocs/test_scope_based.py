@@ -47,6 +47,14 @@ class TestScopeBasedIoC(TestCase):
         self.assertIsInstance(new_scope, Scope)
         self.assertNotEqual(IoC.resolve('Scopes.Root'), new_scope)
 
+    def test_duplicate_scope_is_not_attached_to_parent(self):
+        root_scope = IoC.resolve('Scopes.Root')
+        new_scope = IoC.resolve('Scopes.New', 'scope-id')
+
+        with self.assertRaisesRegex(Exception, 'scope-id'):
+            IoC.resolve('Scopes.New', 'scope-id')
+        self.assertEqual([new_scope], root_scope.children)
+
     def test_set_scope(self):
         new_scope = IoC.resolve('Scopes.New', 'scope-id')
         IoC.resolve('Scopes.Current.Set', 'scope-id').execute()
@@ -134,3 +142,54 @@ class TestScopeBasedIoC(TestCase):
 
         with self.assertRaisesRegex(Exception, "Unknown dependency 'thread_dependency'"):
             IoC.resolve('thread_dependency')
+
+    def test_register_dependency_in_parent_invalidates_cache(self):
+        """Регистрация зависимости в родительском скоупе сбрасывает закэшированную стратегию у потомков"""
+        IoC.resolve('Scopes.New', 'scope-id-1')
+        IoC.resolve('Scopes.Current.Set', 'scope-id-1').execute()
+        IoC.resolve('IoC.Register', 'dependency', lambda: 1).execute()
+
+        IoC.resolve('Scopes.New', 'scope-id-2')
+        IoC.resolve('Scopes.New', 'scope-id-3', 'scope-id-2')
+        IoC.resolve('Scopes.Current.Set', 'scope-id-3').execute()
+        self.assertEqual(1, IoC.resolve('dependency'))  # Стратегия закэширована в scope-id-3
+
+        IoC.resolve('Scopes.Current.Set', 'scope-id-2').execute()
+        IoC.resolve('IoC.Register', 'dependency', lambda: 2).execute()
+
+        IoC.resolve('Scopes.Current.Set', 'scope-id-3').execute()
+        self.assertEqual(2, IoC.resolve('dependency'))
+
+        IoC.resolve('Scopes.Current.Set', 'scope-id-1').execute()
+        self.assertEqual(1, IoC.resolve('dependency'))
+
+    def test_clear_scopes_resets_cache(self):
+        IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+        with self.assertRaisesRegex(Exception, "Unknown dependency 'dependency'"):
+            IoC.resolve('dependency')
+
+        IoC.resolve('Scopes.New', 'scope-id')
+        IoC.resolve('Scopes.Clear').execute()
+
+        root_scope = IoC.resolve('Scopes.Root')
+        self.assertEqual([], root_scope.children)
+        self.assertEqual({}, root_scope.cache)
+
+    def test_register_during_lookup_does_not_leave_stale_cache(self):
+        """Если зависимость перерегистрировали во время поиска стратегии, устаревшая стратегия не кэшируется"""
+
+        class RacingDependencies(dict):
+            """Зависимости родителя, которые перерегистрируются другим потоком во время поиска"""
+            def __getitem__(self, key):
+                strategy = super().__getitem__(key)
+                if key == 'dependency' and not hasattr(self, 'raced'):
+                    self.raced = True
+                    parent.register('dependency', lambda: 2)
+                return strategy
+
+        parent = Scope('parent', RacingDependencies(dependency=lambda: 1))
+        child = Scope('child', {}, parent)
+
+        self.assertEqual(1, child.resolve('dependency'))  # Поиск вернул стратегию, найденную до регистрации
+        self.assertNotIn('dependency', child.cache)
+        self.assertEqual(2, child.resolve('dependency'))
@@ -0,0 +1,65 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from features.base.builders import OperationBuilder
+from features.base.commands import MacroCommand
+from features.base.interfaces import UObject
+from iocs import IoC
+from iocs.scope_based_strategy import InitScopesCommand
+
+
+class TestOperationBuilder(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        InitScopesCommand().execute()
+
+    def setUp(self) -> None:
+        IoC.resolve('Scopes.New', 'scope-id')
+        IoC.resolve('Scopes.Current.Set', 'scope-id').execute()
+
+        self.cmd_1 = Mock(return_value=Mock())
+        self.cmd_2 = Mock(return_value=Mock())
+        IoC.resolve('IoC.Register', 'Commands.First', self.cmd_1).execute()
+        IoC.resolve('IoC.Register', 'Commands.Second', self.cmd_2).execute()
+        IoC.resolve(
+            'IoC.Register',
+            'Operations.Test.Description',
+            lambda: ['Commands.First', 'Commands.Second']
+        ).execute()
+
+        self.builder = OperationBuilder('Operations.Test')
+
+    def tearDown(self) -> None:
+        IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+        IoC.resolve('Scopes.Clear').execute()
+
+    def test_build(self):
+        obj = Mock(UObject)
+        operation = self.builder.build(obj)
+
+        self.assertIsInstance(operation, MacroCommand)
+        self.assertEqual([self.cmd_1.return_value, self.cmd_2.return_value], operation.commands)
+        self.cmd_1.assert_called_once_with(obj)
+        self.cmd_2.assert_called_once_with(obj)
+
+    def test_plan_is_reused(self):
+        """Повторная сборка операции не обращается к IoC за описанием и фабриками команд"""
+        self.builder.build(Mock(UObject))
+
+        with patch('iocs.base.IoC.resolve', wraps=IoC.resolve) as mocked_resolve:
+            self.builder.build(Mock(UObject))
+            resolved_keys = [c[0][0] for c in mocked_resolve.call_args_list]
+        self.assertNotIn('Operations.Test.Description', resolved_keys)
+        self.assertNotIn('Commands.First', resolved_keys)
+
+    def test_plan_is_rebuilt_after_registration(self):
+        self.builder.build(Mock(UObject))
+
+        IoC.resolve('Scopes.New', 'child-scope-id', 'scope-id')
+        IoC.resolve('Scopes.Current.Set', 'child-scope-id').execute()
+        IoC.resolve('IoC.Register', 'Operations.Test.Description', lambda: ['Commands.Second']).execute()
+
+        self.assertEqual([self.cmd_2.return_value], self.builder.build(Mock(UObject)).commands)
+
+        IoC.resolve('Scopes.Current.Set', 'scope-id').execute()
+        self.assertEqual(2, len(self.builder.build(Mock(UObject)).commands))
@@ -0,0 +1,168 @@
+import multiprocessing
+import os
+from functools import partial
+from unittest import TestCase
+from unittest.mock import Mock
+
+from exception_handler import ExceptionHandler
+from features.base.commands import LambdaCommand
+from iocs import IoC
+from iocs.scope_based_strategy import InitScopesCommand
+from process.commands import ProcessRouter, StartProcessPoolCommand
+from thread.commands import StartThreadCommandPlugin
+
+
+def bootstrap(results):
+    """Инициализация процесса-обработчика: действие Report сообщает, в каком процессе оно выполнилось"""
+    InitScopesCommand().execute()
+    StartThreadCommandPlugin().execute()
+
+    exc_handler = ExceptionHandler()
+    IoC.resolve('IoC.Register', 'ExceptionHandler', lambda: exc_handler).execute()
+
+    IoC.resolve(
+        'IoC.Register',
+        'UserActions.Report',
+        lambda game_id: LambdaCommand(lambda: results.put((game_id, os.getpid())))
+    ).execute()
+
+
+class TestProcessRouter(TestCase):
+    def setUp(self) -> None:
+        self.connections = [Mock(), Mock()]
+        self.router = ProcessRouter(self.connections)
+
+    def test_create_game_gets_id(self):
+        """Новая игра получает идентификатор в роутере и закрепляется за процессом"""
+        self.router.put({'name': 'CreateGame'})
+        self.router.put({'name': 'CreateGame'})
+
+        self.connections[0].send.assert_called_once_with({'name': 'CreateGame', 'game_id': 'game-1'})
+        self.connections[1].send.assert_called_once_with({'name': 'CreateGame', 'game_id': 'game-2'})
+        self.assertEqual({'game-1': 0, 'game-2': 1}, self.router.affinity)
+
+    def test_client_game_id_is_replaced(self):
+        self.router.put({'name': 'CreateGame', 'game_id': 'custom'})
+        self.connections[0].send.assert_called_once_with({'name': 'CreateGame', 'game_id': 'game-1'})
+
+    def test_stopped_game_is_released(self):
+        self.router.put({'name': 'CreateGame'})
+        self.router.put({'name': 'StopGame', 'game_id': 'game-1'})
+
+        self.connections[0].send.assert_called_with({'name': 'StopGame', 'game_id': 'game-1'})
+        self.assertEqual({}, self.router.affinity)
+        self.assertEqual([0, 0], self.router.games_number)
+
+    def test_game_messages_go_to_owner(self):
+        self.router.put({'name': 'CreateGame'})
+        self.router.put({'name': 'CreateGame'})
+
+        message = {'name': 'InterpretGameCommand', 'game_id': 'game-2', 'operation': {'name': 'Rotation'}}
+        self.router.put(message)
+        self.connections[1].send.assert_called_with(message)
+        self.assertEqual(1, self.connections[0].send.call_count)
+
+    def test_batch(self):
+        """Действия пакета отправляются в процессы своих игр, по одному сообщению на игру"""
+        self.router.put({'name': 'CreateGame'})
+        self.router.put({'name': 'CreateGame'})
+
+        action_1 = {'name': 'InterpretGameCommand', 'game_id': 'game-2', 'operation': {'name': 'Rotation'}}
+        action_2 = {'name': 'InterpretGameCommand', 'game_id': 'game-1', 'operation': {'name': 'Rotation'}}
+        # Процессы отвечают результатом разрешения действий своей игры
+        self.connections[0].recv.return_value = [{'status': 'rejected', 'error': 'Unknown action'}]
+        self.connections[1].recv.return_value = [{'status': 'accepted'}, {'status': 'accepted'}]
+        results = self.router.put_batch([action_1, {'game_id': 'game-1'}, action_2, action_1])
+
+        self.assertEqual([
+            {'status': 'accepted'},
+            {'status': 'rejected', 'error': 'Action name is missing'},
+            {'status': 'rejected', 'error': 'Unknown action'},
+            {'status': 'accepted'}
+        ], results)
+        self.connections[0].send.assert_called_with([action_2])
+        self.connections[1].send.assert_called_with([action_1, action_1])
+
+    def test_batch_is_sent_to_all_processes_before_replies(self):
+        """Процессы обрабатывают свои части пакета одновременно: ответы ожидаются после отправки всех частей"""
+        calls = Mock()
+        for process, conn in enumerate(self.connections):
+            calls.attach_mock(conn, f'conn_{process}')
+            conn.recv.return_value = [{'status': 'accepted', 'game_id': f'game-{process + 1}'}]
+
+        results = self.router.put_batch([{'name': 'CreateGame'}, {'name': 'CreateGame'}])
+
+        self.assertEqual([
+            ('conn_0.send', ([{'name': 'CreateGame', 'game_id': 'game-1'}],), {}),
+            ('conn_1.send', ([{'name': 'CreateGame', 'game_id': 'game-2'}],), {}),
+            ('conn_0.recv', (), {}),
+            ('conn_1.recv', (), {}),
+        ], calls.mock_calls)
+        self.assertEqual(['game-1', 'game-2'], [result['game_id'] for result in results])
+
+    def test_stop(self):
+        self.router.stop()
+        for conn in self.connections:
+            conn.send.assert_called_once_with(None)
+
+
+class TestProcessPool(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        InitScopesCommand().execute()
+
+    def setUp(self) -> None:
+        IoC.resolve('Scopes.New', 'scope-id')
+        IoC.resolve('Scopes.Current.Set', 'scope-id').execute()
+
+    def tearDown(self) -> None:
+        IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+        IoC.resolve('Scopes.Clear').execute()
+
+    def test_messages_are_executed_in_owner_process(self):
+        results = multiprocessing.get_context('spawn').Queue()
+        StartProcessPoolCommand('process', 2, partial(bootstrap, results)).execute()
+
+        for _ in range(3):
+            for game_id in ('game-1', 'game-2', 'game-3'):
+                IoC.resolve('Process.Put', {'name': 'Report', 'game_id': game_id}).execute()
+
+        IoC.resolve('Process.Pool.Stop').execute()
+        for process in IoC.resolve('Process.Pool'):
+            process.join(timeout=30)
+            self.assertEqual(0, process.exitcode)
+
+        pids_by_game = {}
+        for _ in range(9):
+            game_id, pid = results.get(timeout=5)
+            pids_by_game.setdefault(game_id, set()).add(pid)
+
+        self.assertEqual({'game-1', 'game-2', 'game-3'}, set(pids_by_game))
+        for pids in pids_by_game.values():
+            self.assertEqual(1, len(pids))
+        self.assertEqual(2, len(set.union(*pids_by_game.values())))
+        self.assertNotIn(os.getpid(), set.union(*pids_by_game.values()))
+
+    def test_batch_rejections_are_reported_by_owner_process(self):
+        """Действия, которые процесс-обработчик не смог разрешить, отклоняются в ответе на пакет"""
+        results = multiprocessing.get_context('spawn').Queue()
+        StartProcessPoolCommand('process', 1, partial(bootstrap, results)).execute()
+
+        batch_results = IoC.resolve('Process.PutBatch', [
+            {'name': 'Report', 'game_id': 'game-1'},
+            {'name': 'Unknown', 'game_id': 'game-1'},
+            {'name': 'Report', 'game_id': 'game-1', 'extra': 1},
+            {'name': 'CreateGame'},
+        ])
+
+        IoC.resolve('Process.Pool.Stop').execute()
+        for process in IoC.resolve('Process.Pool'):
+            process.join(timeout=30)
+
+        self.assertEqual(
+            ['accepted', 'rejected', 'rejected', 'accepted'],
+            [result['status'] for result in batch_results]
+        )
+        # Подтверждение создания игры содержит идентификатор, назначенный роутером
+        self.assertEqual('game-1', batch_results[3]['game_id'])
+        self.assertEqual(('game-1', IoC.resolve('Process.Pool')[0].pid), results.get(timeout=5))
@@ -0,0 +1,51 @@
+from queue import Empty
+from threading import Thread
+from time import monotonic
+from unittest import TestCase
+
+from thread.queues import LockedQueue, SingleConsumerQueue
+
+
+class QueueTestMixin:
+    queue_class = None
+
+    def setUp(self) -> None:
+        self.q = self.queue_class()
+
+    def test_fifo(self):
+        for i in range(3):
+            self.q.put(i)
+        self.assertEqual([0, 1, 2], [self.q.get(), self.q.get_nowait(), self.q.get(timeout=0)])
+
+    def test_empty(self):
+        self.assertRaises(Empty, self.q.get_nowait)
+        start = monotonic()
+        self.assertRaises(Empty, self.q.get, timeout=0.05)
+        self.assertGreaterEqual(monotonic() - start, 0.04)
+        self.assertRaises(Empty, self.q.get_many, 10, timeout=0)
+
+    def test_get_many(self):
+        for i in range(5):
+            self.q.put(i)
+        self.assertEqual([0, 1, 2], self.q.get_many(3))
+        self.assertEqual([3, 4], self.q.get_many(3))
+
+    def test_wakeup(self):
+        """Ожидающий потребитель просыпается, когда другой поток кладет команду"""
+        producer = Thread(target=lambda: [self.q.put(i) for i in range(1000)])
+        producer.start()
+
+        received = []
+        while len(received) < 1000:
+            received.extend(self.q.get_many(100, timeout=5))
+        producer.join(timeout=5)
+
+        self.assertEqual(list(range(1000)), received)
+
+
+class TestLockedQueue(QueueTestMixin, TestCase):
+    queue_class = LockedQueue
+
+
+class TestSingleConsumerQueue(QueueTestMixin, TestCase):
+    queue_class = SingleConsumerQueue
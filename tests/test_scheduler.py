@@ -0,0 +1,217 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from thread.commands import SchedulerCommand, SchedulerLoopCommand
+from thread.interfaces import ISchedulable
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeTask(ISchedulable):
+    """Задача, каждый такт которой состоит из commands_per_tick команд длительностью command_time"""
+
+    def __init__(self, task_id, clock, command_time, commands_per_tick=1):
+        self.task_id = task_id
+        self.clock = clock
+        self.command_time = command_time
+        self.commands_per_tick = commands_per_tick
+        self.tick_left = 0
+        self.executed = 0
+
+    def get_id(self):
+        return self.task_id
+
+    def start_tick(self) -> None:
+        self.tick_left = self.commands_per_tick
+
+    def has_work(self) -> bool:
+        return self.tick_left > 0
+
+    def step(self) -> None:
+        self.tick_left -= 1
+        self.executed += 1
+        self.clock.now += self.command_time
+
+
+class TestScheduler(TestCase):
+    def setUp(self) -> None:
+        self.clock = Clock()
+        patcher = patch('thread.commands.perf_counter', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.scheduler = SchedulerCommand(quantum_ms=10)
+
+    def test_each_task_runs_its_tick(self):
+        """Быстрые задачи выполняют за раунд все команды такта"""
+        task_1 = FakeTask('game-1', self.clock, command_time=0.001, commands_per_tick=3)
+        task_2 = FakeTask('game-2', self.clock, command_time=0.001, commands_per_tick=2)
+        self.scheduler.add(task_1)
+        self.scheduler.add(task_2)
+
+        self.scheduler.execute()
+        self.assertEqual(3, task_1.executed)
+        self.assertEqual(2, task_2.executed)
+
+        self.scheduler.execute()
+        self.assertEqual(6, task_1.executed)
+        self.assertEqual(4, task_2.executed)
+
+    def test_expensive_task_does_not_starve_others(self):
+        """Задача, перерасходовавшая квант, пропускает раунды, остальные задачи выполняются каждый раунд"""
+        slow = FakeTask('slow', self.clock, command_time=0.035)
+        fast = FakeTask('fast', self.clock, command_time=0.001)
+        self.scheduler.add(slow)
+        self.scheduler.add(fast)
+
+        for _ in range(7):
+            self.scheduler.execute()
+
+        self.assertEqual(7, fast.executed)
+        # Команда медленной задачи длится 3.5 кванта: выполняется в 1-м и 4-м раундах (с перерасходом 0.5 кванта)
+        self.assertEqual(2, slow.executed)
+
+    def test_weights(self):
+        heavy = FakeTask('heavy', self.clock, command_time=0.01, commands_per_tick=100)
+        light = FakeTask('light', self.clock, command_time=0.01, commands_per_tick=100)
+        self.scheduler.add(heavy, weight=3)
+        self.scheduler.add(light)
+
+        for _ in range(4):
+            self.scheduler.execute()
+
+        self.assertEqual(12, heavy.executed)
+        self.assertEqual(4, light.executed)
+
+    def test_stats(self):
+        task_1 = FakeTask('game-1', self.clock, command_time=0.002, commands_per_tick=2)
+        task_2 = FakeTask('game-2', self.clock, command_time=0.003)
+        self.scheduler.add(task_1)
+        self.scheduler.add(task_2)
+
+        for _ in range(3):
+            self.scheduler.execute()
+
+        stats = self.scheduler.get_stats()
+        self.assertEqual({'game-1', 'game-2'}, set(stats))
+
+        self.assertEqual(3, stats['game-1'].ticks)
+        self.assertEqual(6, stats['game-1'].commands)
+        self.assertAlmostEqual(0.012, stats['game-1'].busy_time)
+        self.assertAlmostEqual(0.002, stats['game-1'].avg_command_time)
+        # Между началами тактов выполняются команды обеих игр: 2 * 0.002 + 0.003
+        self.assertAlmostEqual(0.007, stats['game-1'].last_tick_latency)
+        self.assertAlmostEqual(0.007, stats['game-1'].max_tick_latency)
+
+    @patch('thread.commands.handle_exception')
+    def test_start_tick_error_does_not_stop_other_tasks(self, mocked_handle):
+        """Ошибка начала такта одной задачи обрабатывается и не останавливает остальные задачи"""
+        broken = FakeTask('broken', self.clock, command_time=0.001)
+        error = ValueError('Error')
+        broken.start_tick = Mock(side_effect=error)
+        healthy = FakeTask('healthy', self.clock, command_time=0.001)
+        self.scheduler.add(broken)
+        self.scheduler.add(healthy)
+
+        for _ in range(3):
+            self.scheduler.execute()
+
+        self.assertEqual(3, healthy.executed)
+        self.assertEqual(3, mocked_handle.call_count)
+        mocked_handle.assert_called_with(broken, error)
+
+    def test_next_due_time(self):
+        """Ближайший срок считается по задачам без работы, у которых он известен"""
+        task_1 = FakeTask('game-1', self.clock, command_time=0.001)
+        task_2 = FakeTask('game-2', self.clock, command_time=0.001)
+        task_1.next_due_time = Mock(return_value=5.0)
+        task_2.next_due_time = Mock(return_value=3.0)
+        self.scheduler.add(task_1)
+        self.scheduler.add(task_2)
+        self.assertEqual(3.0, self.scheduler.next_due_time())
+
+        task_2.next_due_time.return_value = None
+        self.assertEqual(5.0, self.scheduler.next_due_time())
+
+        task_1.next_due_time.return_value = None
+        self.assertIsNone(self.scheduler.next_due_time())
+
+        task_2.next_due_time.return_value = 3.0
+        task_2.start_tick()
+        self.assertIsNone(self.scheduler.next_due_time())  # У задачи со сроком есть работа
+        self.assertTrue(self.scheduler.has_work())
+
+    def test_skipped_task_needs_next_round(self):
+        """Задача, пропустившая раунд из-за перерасхода кванта, не начинала такт - нужен следующий раунд"""
+        task = FakeTask('game-1', self.clock, command_time=0.025)
+        self.scheduler.add(task)
+        self.scheduler.execute()
+        self.assertFalse(self.scheduler.skipped)
+
+        self.scheduler.execute()
+        self.assertTrue(self.scheduler.idle)
+        self.assertTrue(self.scheduler.has_work())
+
+
+class TestSchedulerLoop(TestCase):
+    def setUp(self) -> None:
+        self.scheduler = Mock(SchedulerCommand)
+        self.scheduler.tasks = [Mock()]
+        self.scheduler.has_work.return_value = False
+        self.loop = SchedulerLoopCommand(self.scheduler)
+        self.loop.active = True
+
+    @patch('thread.commands.IoC.resolve')
+    def test_busy_round_is_followed_immediately(self, mocked_resolve):
+        self.scheduler.idle = False
+        self.loop.execute()
+        mocked_resolve.assert_called_once_with('Thread.Put', self.loop)
+
+        mocked_resolve.reset_mock()
+        self.scheduler.idle = True
+        self.scheduler.has_work.return_value = True
+        self.loop.execute()
+        mocked_resolve.assert_called_once_with('Thread.Put', self.loop)
+
+    @patch('thread.commands.IoC.resolve')
+    def test_loop_stops_without_tasks(self, mocked_resolve):
+        self.scheduler.tasks = []
+        self.loop.execute()
+        mocked_resolve.assert_not_called()
+        self.assertFalse(self.loop.active)
+
+    @patch('thread.commands.IoC.resolve')
+    def test_idle_round_waits_for_next_due_time(self, mocked_resolve):
+        """Простаивающий планировщик засыпает до ближайшего срока задач"""
+        self.scheduler.idle = True
+        self.scheduler.next_due_time.return_value = 12.5
+        self.loop.execute()
+        self.assertTrue(self.loop.waiting)
+        name, wake, deadline = mocked_resolve.call_args.args
+        self.assertEqual(('Thread.PutNotBefore', 12.5), (name, deadline))
+
+        mocked_resolve.reset_mock()
+        wake.execute()
+        mocked_resolve.assert_called_once_with('Thread.Put', self.loop)
+        self.assertFalse(self.loop.waiting)
+
+        mocked_resolve.reset_mock()
+        wake.execute()  # Цикл уже разбужен
+        mocked_resolve.assert_not_called()
+
+    @patch('thread.commands.IoC.resolve')
+    def test_idle_round_without_deadline_waits_for_wake(self, mocked_resolve):
+        """Без сроков задач планировщик не опрашивает их, а спит до пробуждения"""
+        self.scheduler.idle = True
+        self.scheduler.next_due_time.return_value = None
+        self.loop.execute()
+        mocked_resolve.assert_not_called()
+
+        self.loop.wake()
+        mocked_resolve.assert_called_once_with('Thread.Put', self.loop)
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import threading
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import Mock, patch
+
+from network.codecs import BinaryCodec
+from network.server import ActionServer
+
+
+class TestActionServer(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.dispatch = Mock()
+        self.dispatch_batch = Mock()
+        self.subscribe = Mock()
+        self.action_server = ActionServer(
+            '127.0.0.1', 0, self.dispatch, self.dispatch_batch, self.subscribe, max_message_size=1024
+        )
+        await self.action_server.start()
+        self.port = self.action_server.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self) -> None:
+        self.action_server.server.close()
+        await self.action_server.server.wait_closed()
+
+    async def send(self, *messages: bytes, responses_number=0):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        for message in messages:
+            writer.write(message)
+        await writer.drain()
+
+        responses = [json.loads(await reader.readline()) for _ in range(responses_number)]
+
+        writer.close()
+        await writer.wait_closed()
+        return responses
+
+    async def wait_dispatched(self, calls_number):
+        for _ in range(100):
+            if self.dispatch.call_count >= calls_number:
+                return
+            await asyncio.sleep(0.01)
+
+    async def test_persistent_connection(self):
+        """Клиент отправляет несколько сообщений через одно соединение"""
+        action_1 = {'name': 'CreateGame'}
+        action_2 = {'name': 'InterpretGameCommand', 'game_id': 'game-1', 'operation': {'name': 'Rotation'}}
+        await self.send(json.dumps(action_1).encode() + b'\n', json.dumps(action_2).encode() + b'\n')
+
+        await self.wait_dispatched(2)
+        self.assertEqual([((action_1,),), ((action_2,),)], self.dispatch.call_args_list)
+
+    async def test_message_without_newline(self):
+        """Сообщение без завершающего перевода строки обрабатывается при закрытии соединения"""
+        await self.send(b'{"name": "CreateGame"}')
+
+        await self.wait_dispatched(1)
+        self.dispatch.assert_called_once_with({'name': 'CreateGame'})
+
+    async def test_many_clients(self):
+        await asyncio.gather(*[self.send(b'{"name": "CreateGame"}\n') for _ in range(50)])
+
+        await self.wait_dispatched(50)
+        self.assertEqual(50, self.dispatch.call_count)
+
+    @patch('builtins.print')
+    async def test_invalid_message_does_not_close_connection(self, _):
+        self.dispatch.side_effect = [KeyError('Unknown dependency'), None]
+        await self.send(b'not json\n', b'{"name": "Unknown"}\n', b'{"name": "CreateGame"}\n')
+
+        await self.wait_dispatched(2)
+        self.assertEqual(2, self.dispatch.call_count)
+        self.dispatch.assert_called_with({'name': 'CreateGame'})
+
+    @patch('builtins.print')
+    async def test_message_too_large(self, _):
+        await self.send(b'{"name": "' + b'a' * 2048 + b'"}\n')
+        await asyncio.sleep(0.05)
+        self.dispatch.assert_not_called()
+
+    async def test_batch(self):
+        """Пакет действий передается целиком, клиент получает подтверждение по каждому действию"""
+        results = [{'status': 'accepted'}, {'status': 'rejected', 'error': 'Unknown action'}]
+        self.dispatch_batch.return_value = results
+        actions = [{'name': 'CreateGame'}, {'name': 'Unknown'}]
+
+        responses = await self.send(json.dumps(actions).encode() + b'\n', responses_number=1)
+
+        self.assertEqual([{'ack': results}], responses)
+        self.dispatch_batch.assert_called_once_with(actions)
+        self.dispatch.assert_not_called()
+
+    async def test_batch_result_is_awaited(self):
+        """Пока результат пакета ожидается вне цикла событий, сервер обрабатывает другие соединения"""
+        release = asyncio.Event()
+
+        async def dispatch_batch(actions_data):
+            await release.wait()
+            return [{'status': 'accepted', 'game_id': 'game-1'}]
+
+        self.action_server.dispatch_batch = dispatch_batch
+        batch = asyncio.ensure_future(self.send(b'[{"name": "CreateGame"}]\n', responses_number=1))
+
+        await self.send(b'{"name": "CreateGame"}\n')
+        await self.wait_dispatched(1)
+        self.dispatch.assert_called_once_with({'name': 'CreateGame'})
+
+        release.set()
+        self.assertEqual([{'ack': [{'status': 'accepted', 'game_id': 'game-1'}]}], await batch)
+
+    async def test_batch_grouped_by_game(self):
+        """game_id пакета добавляется в каждое действие"""
+        self.dispatch_batch.return_value = [{'status': 'accepted'}] * 2
+        message = {
+            'game_id': 'game-1',
+            'actions': [
+                {'name': 'InterpretGameCommand', 'operation': {'name': 'Rotation', 'object_id': 'obj-1'}},
+                {'name': 'InterpretGameCommand', 'game_id': 'game-2', 'operation': {'name': 'Rotation'}}
+            ]
+        }
+
+        await self.send(json.dumps(message).encode() + b'\n', responses_number=1)
+
+        self.dispatch_batch.assert_called_once_with([
+            {'name': 'InterpretGameCommand', 'game_id': 'game-1', 'operation': {'name': 'Rotation', 'object_id': 'obj-1'}},
+            {'name': 'InterpretGameCommand', 'game_id': 'game-2', 'operation': {'name': 'Rotation'}}
+        ])
+
+    async def test_batch_dispatched_one_by_one_by_default(self):
+        self.action_server.dispatch_batch = self.action_server.dispatch_each
+        self.dispatch.side_effect = [None, KeyError('Unknown action')]
+
+        responses = await self.send(b'[{"name": "CreateGame"}, {"name": "Unknown"}]\n', responses_number=1)
+
+        self.assertEqual(
+            [{'ack': [{'status': 'accepted'}, {'status': 'rejected', 'error': "'Unknown action'"}]}],
+            responses
+        )
+
+    async def test_binary_codec(self):
+        """Клиент выбирает двоичный формат, сервер подтверждает выбор и отвечает в двоичном формате"""
+        self.dispatch_batch.return_value = [{'status': 'accepted'}]
+        codec = BinaryCodec()
+        action = {'name': 'InterpretGameCommand', 'game_id': 'game-1', 'operation': {'name': 'Rotation'}}
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        writer.write(BinaryCodec.MAGIC)
+        writer.write(codec.frame(codec.encode_action({'name': 'CreateGame'})))
+        writer.write(codec.frame(codec.encode_action([action])))
+        await writer.drain()
+
+        self.assertEqual(BinaryCodec.MAGIC, await reader.readexactly(len(BinaryCodec.MAGIC)))
+        ack = await codec.read_frame(reader)
+        self.assertEqual([{'status': 'accepted'}], codec.decode_ack(ack))
+
+        writer.close()
+        await writer.wait_closed()
+
+        self.dispatch.assert_called_once_with({'name': 'CreateGame'})
+        self.dispatch_batch.assert_called_once_with([action])
+
+    async def test_subscribe(self):
+        """Снимки, переданные в sink из другого потока, отправляются подписавшемуся клиенту"""
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        writer.write(b'{"name": "Subscribe", "game_id": "game-1", "rate": 10}\n')
+        await writer.drain()
+
+        for _ in range(100):
+            if self.subscribe.called:
+                break
+            await asyncio.sleep(0.01)
+        action_data, sink = self.subscribe.call_args[0]
+        self.assertEqual({'name': 'Subscribe', 'game_id': 'game-1', 'rate': 10}, action_data)
+
+        thread = threading.Thread(target=sink, args=('game-1', {'obj-1': {'fuel_level': 9}}))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(
+            {'game_id': 'game-1', 'objects': {'obj-1': {'fuel_level': 9}}},
+            json.loads(await reader.readline())
+        )
+
+        writer.close()
+        await writer.wait_closed()
+        for _ in range(100):
+            try:
+                sink('game-1', {})
+            except ConnectionError:
+                break
+            await asyncio.sleep(0.01)
+        else:
+            self.fail('sink of disconnected client does not raise ConnectionError')
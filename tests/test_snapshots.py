@@ -0,0 +1,196 @@
+from threading import current_thread
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+import numpy as np
+
+from game.commands import GameObject
+from game.journal import ChangeJournal
+from game.snapshots import SnapshotPublisher, default_delivery, take_snapshot
+
+
+def make_object(obj_id, position, fuel_level, journal=None):
+    obj = GameObject(journal)
+    obj.set_property('id', obj_id)
+    obj.set_property('position', np.array(position))
+    obj.set_property('fuel_level', fuel_level)
+    return obj
+
+
+class TestChangeTracking(TestCase):
+    def test_reader(self):
+        """Потребитель получает изменения, сделанные после его создания, с текущими значениями свойств"""
+        object_ids = {}
+        journal = ChangeJournal(object_ids)
+        obj_1 = make_object('obj-1', [0, 0], 10, journal)
+        reader = journal.reader()
+        obj_2 = make_object('obj-2', [0, 0], 10, journal)
+        object_ids.update({obj_1: 'obj-1', obj_2: 'obj-2'})
+
+        obj_1.set_property('fuel_level', 9)
+        obj_1.set_property('fuel_level', 8)
+        self.assertEqual({'obj-2', 'obj-1'}, set(reader.collect()))
+        self.assertEqual({}, reader.collect())
+
+        obj_2.set_property('fuel_level', 7)
+        self.assertEqual({'obj-2': {'fuel_level': 7}}, reader.collect())
+
+    def test_readers_are_independent(self):
+        """Сбор изменений одним потребителем не сбрасывает изменения другого"""
+        object_ids = {}
+        journal = ChangeJournal(object_ids)
+        obj = make_object('obj-1', [0, 0], 10, journal)
+        object_ids[obj] = 'obj-1'
+        snapshots = journal.reader()
+        replication = journal.reader()
+
+        obj.set_property('fuel_level', 9)
+        self.assertEqual({'obj-1': {'fuel_level': 9}}, snapshots.collect())
+        obj.set_property('direction', 2)
+        self.assertEqual({'obj-1': {'fuel_level': 9, 'direction': 2}}, replication.collect())
+
+        replication.close()
+        obj.set_property('fuel_level', 8)
+        self.assertEqual([snapshots], journal.readers)
+        self.assertEqual({}, replication.collect())
+
+
+class TestSnapshots(TestCase):
+    def test_take_snapshot(self):
+        obj = make_object('obj-1', [1, 2], 10)
+        snapshot = take_snapshot([obj])
+
+        obj.get_property('position')[0] = 100
+        self.assertEqual({'position', 'fuel_level'}, set(snapshot['obj-1']))
+        np.testing.assert_array_equal([1, 2], snapshot['obj-1']['position'])
+
+
+class TestSnapshotPublisher(TestCase):
+    def setUp(self) -> None:
+        object_ids = {}
+        self.journal = ChangeJournal(object_ids)
+        self.obj = make_object('obj-1', [0, 0], 10, self.journal)
+        object_ids[self.obj] = 'obj-1'
+        self.publisher = SnapshotPublisher('game-1', self.objects, self.journal.reader, self.deliver)
+
+    @staticmethod
+    def deliver(cmd):
+        cmd.execute()
+
+    def objects(self):
+        return [self.obj]
+
+    def test_without_subscribers(self):
+        objects = Mock(return_value=[self.obj])
+        changes_reader = Mock()
+        SnapshotPublisher('game-1', objects, changes_reader).publish()
+        objects.assert_not_called()
+        changes_reader.assert_not_called()
+
+    def test_delta(self):
+        """Подписчик получает полный снимок, затем только изменения"""
+        sink = Mock()
+        self.publisher.subscribe(sink)
+
+        self.publisher.publish(now=0)
+        sink.assert_called_once()
+        self.assertEqual('game-1', sink.call_args[0][0])
+        self.assertEqual({'obj-1': {'position', 'fuel_level'}}, {k: set(v) for k, v in sink.call_args[0][1].items()})
+
+        sink.reset_mock()
+        self.publisher.publish(now=1)
+        sink.assert_not_called()
+
+        self.obj.set_property('fuel_level', 9)
+        self.obj.set_property('velocity', 2)
+        self.publisher.publish(now=2)
+        sink.assert_called_once_with('game-1', {'obj-1': {'fuel_level': 9}})
+
+    def test_changes_between_sends_are_merged(self):
+        sink = Mock()
+        self.publisher.subscribe(sink, rate=1)
+        self.publisher.publish(now=0)
+        sink.reset_mock()
+
+        for fuel_level, now in [(9, 0.3), (8, 0.6)]:
+            self.obj.set_property('fuel_level', fuel_level)
+            self.publisher.publish(now=now)
+        sink.assert_not_called()
+
+        self.obj.set_property('direction', 2)
+        self.publisher.publish(now=1)
+        sink.assert_called_once_with('game-1', {'obj-1': {'fuel_level': 8, 'direction': 2}})
+
+    def test_publisher_does_not_take_other_consumers_changes(self):
+        replication = self.journal.reader()
+        sink = Mock()
+        self.publisher.subscribe(sink)
+        self.publisher.publish(now=0)
+
+        self.obj.set_property('fuel_level', 9)
+        self.publisher.publish(now=1)
+        sink.assert_called_with('game-1', {'obj-1': {'fuel_level': 9}})
+        self.assertEqual({'obj-1': {'fuel_level': 9}}, replication.collect())
+
+    def test_untracked_game(self):
+        """Если игра не отслеживает изменения, подписчик получает полные снимки"""
+        publisher = SnapshotPublisher('game-1', self.objects, lambda: None, self.deliver)
+        sink = Mock()
+        publisher.subscribe(sink)
+
+        for now in range(3):
+            publisher.publish(now=now)
+        self.assertEqual(3, sink.call_count)
+        self.assertEqual({'position', 'fuel_level'}, set(sink.call_args[0][1]['obj-1']))
+
+    def test_rate(self):
+        sink = Mock()
+        self.publisher.subscribe(sink, rate=10, delta=False)
+
+        for now in [0, 0.05, 0.1, 0.12, 0.25]:
+            self.publisher.publish(now=now)
+        self.assertEqual(3, sink.call_count)
+
+    def test_disconnected_subscriber(self):
+        sink = Mock(side_effect=ConnectionError)
+        self.publisher.subscribe(sink)
+
+        self.publisher.publish(now=0)
+        self.assertTrue(self.publisher.subscriptions[0].closed)
+
+        # Подписка удаляется потоком игры при следующей рассылке
+        self.publisher.publish(now=1)
+        self.assertEqual([], self.publisher.subscriptions)
+        self.assertEqual([], self.journal.readers)
+
+    @patch('game.snapshots.handle_exception')
+    def test_sink_error_does_not_stop_other_subscribers(self, mocked_handle):
+        error = ValueError('Error')
+        self.publisher.subscribe(Mock(side_effect=error))
+        sink = Mock()
+        self.publisher.subscribe(sink)
+
+        self.publisher.publish(now=0)
+        sink.assert_called_once()
+        self.assertIs(error, mocked_handle.call_args[0][1])
+
+    def test_nothing_is_delivered_until_due(self):
+        deliver = Mock()
+        publisher = SnapshotPublisher('game-1', self.objects, self.journal.reader, deliver)
+        publisher.subscribe(Mock(), rate=1)
+
+        publisher.publish(now=0)
+        self.obj.set_property('fuel_level', 9)
+        publisher.publish(now=0.5)
+        self.assertEqual(1, deliver.call_count)
+
+    def test_sink_is_called_off_game_thread(self):
+        """По умолчанию sink вызывается в потоке рассылки, а не в потоке игры"""
+        publisher = SnapshotPublisher('game-1', self.objects, self.journal.reader)
+        threads = []
+        publisher.subscribe(lambda game_id, objects: threads.append(current_thread()))
+
+        publisher.publish()
+        self.assertTrue(default_delivery.flush(timeout=5))
+        self.assertEqual(1, len(threads))
+        self.assertIsNot(current_thread(), threads[0])
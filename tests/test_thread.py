@@ -1,12 +1,14 @@
-from threading import active_count
+from threading import Event, active_count
+from time import monotonic, sleep
 from unittest import TestCase
 from unittest.mock import Mock, patch
 
 from exception_handler import ExceptionHandler
+from features.base.commands import LambdaCommand
 from features.base.interfaces import ICommand
 from iocs import IoC
 from iocs.scope_based_strategy import InitScopesCommand
-from thread.commands import StartThreadCommand
+from thread.commands import PeriodicCommand, StartThreadCommand
 
 
 class TestEventLoop(TestCase):
@@ -30,9 +32,9 @@ class TestEventLoop(TestCase):
 
     def test_start_thread_and_hard_stop(self):
         """Тест на запуск и Hard Stop потока"""
-        self.assertEqual(1, active_count())
+        threads_number = active_count()  # Служебные потоки, запущенные другими тестами
         StartThreadCommand('thread-id').execute()
-        self.assertEqual(2, active_count())  # Проверяем, что команда StartThreadCommand запускает новый поток
+        self.assertEqual(threads_number + 1, active_count())  # Проверяем, что команда StartThreadCommand запускает новый поток
 
         test_cmd_1 = Mock(ICommand)
         test_cmd_2 = Mock(ICommand)
@@ -49,15 +51,15 @@ class TestEventLoop(TestCase):
         thread = IoC.resolve('Thread')
         thread.join(timeout=5)
 
-        self.assertEqual(1, active_count())  # Проверяем, что поток завершился
+        self.assertEqual(threads_number, active_count())  # Проверяем, что поток завершился
         test_cmd_1.execute.assert_called_once()
         test_cmd_2.execute.assert_not_called()
 
     def test_start_thread_and_soft_stop(self):
         """Тест на запуск и Soft Stop потока"""
-        self.assertEqual(1, active_count())
+        threads_number = active_count()  # Служебные потоки, запущенные другими тестами
         StartThreadCommand('thread-id').execute()
-        self.assertEqual(2, active_count())  # Проверяем, что команда StartThreadCommand запускает новый поток
+        self.assertEqual(threads_number + 1, active_count())  # Проверяем, что команда StartThreadCommand запускает новый поток
 
         test_cmd_1 = Mock(ICommand)
         test_cmd_2 = Mock(ICommand)
@@ -75,13 +77,14 @@ class TestEventLoop(TestCase):
         thread = IoC.resolve('Thread')
         thread.join(timeout=5)
 
-        self.assertEqual(1, active_count())  # Проверяем, что поток завершился
+        self.assertEqual(threads_number, active_count())  # Проверяем, что поток завершился
         test_cmd_1.execute.assert_called_once()
         test_cmd_2.execute.assert_called_once()
 
     @patch('exception_handler.ExceptionHandler.handle')
     def test_handle_command_exception(self, mocked_handle):
         """Проверяем, что выброс исключения из команды не прерывает выполнение потока"""
+        threads_number = active_count()  # Служебные потоки, запущенные другими тестами
         StartThreadCommand('thread-id').execute()
 
         test_cmd_1 = Mock(ICommand)
@@ -100,6 +103,117 @@ class TestEventLoop(TestCase):
         thread = IoC.resolve('Thread')
         thread.join(timeout=5)
 
-        self.assertEqual(1, active_count())  # Проверяем, что поток завершился
+        self.assertEqual(threads_number, active_count())  # Проверяем, что поток завершился
         mocked_handle.assert_called_once_with(test_cmd_1, cmd_error)  # Поток обработал исключение
         test_cmd_2.execute.assert_called_once()  # Поток запустил следуюшую команду из очереди
+
+    def test_put_not_before(self):
+        """Отложенная команда выполняется после своего срока и не задерживает остальные команды"""
+        StartThreadCommand('thread-id').execute()
+        executed = []
+
+        IoC.resolve(
+            'Thread.PutNotBefore',
+            LambdaCommand(lambda: executed.append(('delayed', monotonic()))),
+            monotonic() + 0.1
+        ).execute()
+        IoC.resolve('Thread.Put', LambdaCommand(lambda: executed.append(('immediate', monotonic())))).execute()
+        start = monotonic()
+
+        for _ in range(100):
+            if len(executed) == 2:
+                break
+            sleep(0.01)
+
+        IoC.resolve('Thread.Put', IoC.resolve('Thread.HardStop')).execute()
+        IoC.resolve('Thread').join(timeout=5)
+
+        self.assertEqual(['immediate', 'delayed'], [name for name, _ in executed])
+        self.assertGreaterEqual(executed[1][1] - start, 0.09)
+
+    def test_put_delayed(self):
+        """Команда выполняется не раньше, чем через заданное число секунд"""
+        StartThreadCommand('thread-id').execute()
+        executed = []
+
+        start = monotonic()
+        IoC.resolve('Thread.PutDelayed', LambdaCommand(lambda: executed.append(monotonic())), 0.1).execute()
+
+        for _ in range(100):
+            if executed:
+                break
+            sleep(0.01)
+
+        IoC.resolve('Thread.Put', IoC.resolve('Thread.HardStop')).execute()
+        IoC.resolve('Thread').join(timeout=5)
+
+        self.assertEqual(1, len(executed))
+        self.assertGreaterEqual(executed[0] - start, 0.09)
+
+    def test_put_periodic(self):
+        """Периодическая команда выполняется повторно с заданным интервалом, пока поток работает"""
+        StartThreadCommand('thread-id').execute()
+        executed = []
+
+        IoC.resolve('Thread.PutPeriodic', LambdaCommand(lambda: executed.append(monotonic())), 0.05).execute()
+
+        for _ in range(100):
+            if len(executed) >= 3:
+                break
+            sleep(0.01)
+
+        IoC.resolve('Thread.Put', IoC.resolve('Thread.HardStop')).execute()
+        IoC.resolve('Thread').join(timeout=5)
+
+        self.assertGreaterEqual(len(executed), 3)
+        self.assertTrue(all(b - a >= 0.04 for a, b in zip(executed, executed[1:])))
+
+    def test_periodic_command_cancel(self):
+        """Отмененная периодическая команда не выполняется и не планируется повторно"""
+        cmd = Mock(spec=ICommand)
+        periodic = PeriodicCommand(cmd, 1)
+        periodic.cancel()
+
+        with patch.object(IoC, 'resolve') as mocked_resolve:
+            periodic.execute()
+
+        cmd.execute.assert_not_called()
+        mocked_resolve.assert_not_called()
+
+    def test_scope_restored_after_command_changes_it(self):
+        """Команда выполняется в скоупе потока, даже если предыдущая команда сменила скоуп"""
+        StartThreadCommand('thread-id').execute()
+        IoC.resolve('Scopes.New', 'game-id')
+        scopes = []
+
+        IoC.resolve('Thread.Put', IoC.resolve('Scopes.Current.Set', 'game-id')).execute()
+        IoC.resolve('Thread.Put', LambdaCommand(lambda: scopes.append(IoC.resolve('Scopes.Current').id))).execute()
+        IoC.resolve('Thread.Put', IoC.resolve('Thread.SoftStop')).execute()
+        IoC.resolve('Thread').join(timeout=5)
+
+        self.assertEqual(['thread-id'], scopes)
+
+    def test_batch_stats(self):
+        """Команды, накопившиеся в очереди, выполняются пакетами не больше batch_size"""
+        StartThreadCommand('thread-id', batch_size=2).execute()
+        started = Event()
+        release = Event()
+
+        def block():
+            started.set()
+            release.wait(timeout=5)
+
+        IoC.resolve('Thread.Put', LambdaCommand(block)).execute()
+        started.wait(timeout=5)
+        for _ in range(4):
+            IoC.resolve('Thread.Put', LambdaCommand(lambda: None)).execute()
+        IoC.resolve('Thread.Put', IoC.resolve('Thread.SoftStop')).execute()
+        release.set()
+        IoC.resolve('Thread').join(timeout=5)
+
+        stats = IoC.resolve('Thread.Stats')
+        self.assertEqual(6, stats.commands)
+        self.assertEqual(4, stats.batches)
+        # Пакеты: block, две пары накопившихся команд, SoftStop
+        self.assertEqual(1, stats.last_batch_size)
+        self.assertGreater(stats.max_batch_time, 0)
@@ -0,0 +1,114 @@
+from threading import active_count, current_thread
+from unittest import TestCase
+
+from exception_handler import ExceptionHandler
+from features.base.commands import LambdaCommand
+from iocs import IoC
+from iocs.scope_based_strategy import InitScopesCommand
+from game.commands import UserActionsPlugin
+from thread.commands import StartThreadCommandPlugin, StartThreadPoolCommand
+
+
+class GameAction(LambdaCommand):
+    """Команда игры - запоминает поток, в котором выполнялась"""
+
+    def __init__(self, game_id, executed_in):
+        super().__init__(lambda: executed_in.append((game_id, current_thread())))
+        self.game_id = game_id
+
+
+class TestThreadPool(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        InitScopesCommand().execute()
+
+    def setUp(self) -> None:
+        IoC.resolve('Scopes.New', 'scope-id')
+        IoC.resolve('Scopes.Current.Set', 'scope-id').execute()
+
+        StartThreadCommandPlugin().execute()
+
+        exc_handler = ExceptionHandler()
+        IoC.resolve('IoC.Register', 'ExceptionHandler', lambda: exc_handler).execute()
+
+    def tearDown(self) -> None:
+        IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+        IoC.resolve('Scopes.Clear').execute()
+
+    def stop_pool(self):
+        IoC.resolve('Thread.Pool.SoftStop').execute()
+        for thread in IoC.resolve('Thread.Pool'):
+            thread.join(timeout=5)
+
+    def test_start_and_stop_pool(self):
+        threads_number = active_count()  # Служебные потоки, запущенные другими тестами
+        StartThreadPoolCommand('pool-id', 3).execute()
+        IoC.resolve('Scopes.Current.Set', 'pool-id').execute()
+        self.assertEqual(threads_number + 3, active_count())
+
+        self.stop_pool()
+        self.assertEqual(threads_number, active_count())
+
+    def test_game_affinity(self):
+        """Команды одной игры выполняются в одном потоке, игры распределяются по потокам пула"""
+        pool = StartThreadPoolCommand('pool-id', 3)
+        pool.execute()
+        IoC.resolve('Scopes.Current.Set', 'pool-id').execute()
+
+        executed_in = []
+        for _ in range(5):
+            for game_number in range(6):
+                IoC.resolve('Thread.Put', GameAction(f'game-{game_number}', executed_in)).execute()
+
+        self.stop_pool()
+
+        threads_by_game = {}
+        for game_id, thread in executed_in:
+            threads_by_game.setdefault(game_id, set()).add(thread)
+
+        self.assertEqual(6, len(threads_by_game))
+        for threads in threads_by_game.values():
+            self.assertEqual(1, len(threads))
+
+        # Игры равномерно распределены по потокам
+        self.assertEqual([2, 2, 2], pool.games_number)
+        self.assertEqual(3, len(set.union(*threads_by_game.values())))
+
+    def test_explicit_game_id(self):
+        pool = StartThreadPoolCommand('pool-id', 2)
+        pool.execute()
+        IoC.resolve('Scopes.Current.Set', 'pool-id').execute()
+
+        executed_in = []
+        IoC.resolve('Thread.Put', GameAction('game-1', executed_in)).execute()
+        IoC.resolve(
+            'Thread.Put',
+            LambdaCommand(lambda: executed_in.append(('game-1', current_thread()))),
+            'game-1'
+        ).execute()
+
+        self.stop_pool()
+        self.assertEqual(1, len({thread for _, thread in executed_in}))
+        self.assertEqual({'game-1': 0}, pool.affinity)
+
+    def test_caller_scope_is_restored(self):
+        StartThreadPoolCommand('pool-id', 2).execute()
+        self.assertEqual('scope-id', IoC.resolve('Scopes.Current').id)
+
+        IoC.resolve('Scopes.Current.Set', 'pool-id').execute()
+        self.stop_pool()
+
+    def test_stopped_game_is_released(self):
+        """Остановленная игра перестает занимать поток пула"""
+        UserActionsPlugin().execute()
+        pool = StartThreadPoolCommand('pool-id', 2)
+        pool.execute()
+        IoC.resolve('Scopes.Current.Set', 'pool-id').execute()
+
+        create_game = IoC.resolve('UserActions.CreateGame')
+        IoC.resolve('Thread.Put', create_game).execute()
+        IoC.resolve('Thread.Put', IoC.resolve('UserActions.StopGame', create_game.game_id)).execute()
+
+        self.stop_pool()
+        self.assertEqual({}, pool.affinity)
+        self.assertEqual([0, 0], pool.games_number)
@@ -0,0 +1,71 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from exception_handler import ExceptionHandler
+from features.base.interfaces import ICommand
+from game.commands import ActionsBatchCommand, CreateGameCommand, InterpretGameCommand, UserActionsPlugin, \
+    resolve_actions
+from iocs import IoC
+from iocs.scope_based_strategy import InitScopesCommand
+
+
+class TestResolveActions(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        InitScopesCommand().execute()
+
+    def setUp(self) -> None:
+        IoC.resolve('Scopes.New', 'scope-id')
+        IoC.resolve('Scopes.Current.Set', 'scope-id').execute()
+        UserActionsPlugin().execute()
+
+        self.exc_handler = Mock(ExceptionHandler)
+        IoC.resolve('IoC.Register', 'ExceptionHandler', lambda: self.exc_handler).execute()
+
+    def tearDown(self) -> None:
+        IoC.resolve('Scopes.Current.Set', 'ROOT').execute()
+        IoC.resolve('Scopes.Clear').execute()
+
+    def test_batches_are_grouped_by_game(self):
+        batches, results = resolve_actions([
+            {'name': 'InterpretGameCommand', 'game_id': 'game-a', 'operation': {'name': 'Rotation'}},
+            {'name': 'Unknown'},
+            {'name': 'InterpretGameCommand', 'game_id': 'game-b', 'operation': {'name': 'Rotation'}},
+            {'name': 'InterpretGameCommand', 'game_id': 'game-a', 'operation': {'name': 'Movement'}},
+            {'name': 'CreateGame'},
+        ])
+
+        self.assertEqual(['accepted', 'rejected', 'accepted', 'accepted', 'accepted'], [r['status'] for r in results])
+        self.assertIn("Unknown dependency 'UserActions.Unknown'", results[1]['error'])
+        self.assertEqual(['game-a', 'game-b', batches[2].actions[0].game_id], [batch.game_id for batch in batches])
+        self.assertEqual(2, len(batches[0].actions))
+        self.assertIsInstance(batches[0].actions[1], InterpretGameCommand)
+        self.assertIsInstance(batches[2].actions[0], CreateGameCommand)
+
+    def test_batch_command_error(self):
+        """Ошибка одной команды пакета не прерывает выполнение остальных"""
+        cmd_1 = Mock(ICommand)
+        cmd_error = ValueError('Error')
+        cmd_1.execute.side_effect = cmd_error
+        cmd_2 = Mock(ICommand)
+
+        ActionsBatchCommand([cmd_1, cmd_2]).execute()
+
+        self.exc_handler.handle.assert_called_once_with(cmd_1, cmd_error)
+        cmd_2.execute.assert_called_once()
+
+    def test_create_game_settings_are_validated(self):
+        batches, results = resolve_actions([
+            {'name': 'CreateGame', 'tick_rate': 30, 'columnar': True},
+            {'name': 'CreateGame', 'game_id': 'game-1'},
+            {'name': 'CreateGame', 'debug': True},
+            {'name': 'CreateGame', 'tick_rate': -1},
+            {'name': 'CreateGame', 'max_commands': '10'},
+            {'name': 'CreateGame', 'track_changes': 1},
+        ])
+
+        self.assertEqual(['accepted'] + ['rejected'] * 5, [r['status'] for r in results])
+        self.assertIn("Unknown game setting 'game_id'", results[1]['error'])
+        self.assertIn("Unknown game setting 'debug'", results[2]['error'])
+        self.assertIn("Invalid game setting 'tick_rate'", results[3]['error'])
+        self.assertEqual({'tick_rate': 30, 'columnar': True}, batches[0].actions[0].game_settings)
@@ -1,9 +1,15 @@
-from queue import Queue, Empty
-from threading import Thread
+import heapq
+from itertools import count
+from queue import Empty
+from threading import Thread, Lock, get_ident
+from time import monotonic, perf_counter
 
-from features.base.commands import LambdaCommand
+from exception_handler import handle_exception
+from features.base.commands import LambdaCommand, MacroCommand
 from features.base.interfaces import ICommand
 from iocs import IoC
+from .interfaces import ISchedulable
+from .queues import SingleConsumerQueue
 
 
 class ThreadRepeatedCommand(ICommand):
@@ -15,15 +21,261 @@ class ThreadRepeatedCommand(ICommand):
         IoC.resolve('Thread.Put', self).execute()
 
 
+class PeriodicCommand(ICommand):
+    """
+    Команда, выполняемая потоком с заданным интервалом. Следующий запуск планируется от срока предыдущего,
+    поэтому интервал не накапливает задержки выполнения; если поток не успевает, пропущенные запуски
+    не выполняются пачкой - следующий запуск планируется на текущий момент.
+    """
+
+    def __init__(self, cmd: ICommand, interval: float, not_before: float = None):
+        self.cmd = cmd
+        self.interval = interval
+        self.not_before = monotonic() if not_before is None else not_before
+        self.cancelled = False
+        self.game_id = getattr(cmd, 'game_id', None)
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def execute(self) -> None:
+        if self.cancelled:
+            return
+
+        try:
+            self.cmd.execute()
+        finally:
+            self.not_before = max(self.not_before + self.interval, monotonic())
+            IoC.resolve('Thread.PutNotBefore', self, self.not_before).execute()
+
+
+class SchedulerLoopCommand(ICommand):
+    """
+    Повторение раундов планировщика. Пока у задач есть команды, раунды следуют один за другим.
+    Если в раунде не нашлось работы, цикл засыпает: следующий раунд начнется в ближайший срок задач
+    (SchedulerCommand.next_due_time) или раньше - когда планировщик разбудят (wake), например при добавлении задачи
+    или команды в очередь игры. Если сроков нет, цикл спит до пробуждения, и простаивающий поток не занимает
+    процессор.
+    """
+
+    def __init__(self, scheduler: 'SchedulerCommand'):
+        self.scheduler = scheduler
+        self.active = False  # Команда стоит в очереди потока или ожидает срока
+        self.waiting = False  # Цикл спит до срока или пробуждения
+
+    def wake(self) -> None:
+        """Возобновить спящий цикл. Вызывается только потоком-владельцем"""
+        if self.waiting:
+            self.waiting = False
+            IoC.resolve('Thread.Put', self).execute()
+
+    def execute(self) -> None:
+        try:
+            self.scheduler.execute()
+        finally:
+            if not self.scheduler.tasks:
+                # Все задачи удалены - цикл возобновится при добавлении задачи
+                self.active = False
+            elif not self.scheduler.idle or self.scheduler.has_work():
+                IoC.resolve('Thread.Put', self).execute()
+            else:
+                self.waiting = True
+                deadline = self.scheduler.next_due_time()
+                if deadline is not None:
+                    # Если цикл разбудят раньше срока, проснувшийся по сроку цикл просто выполнит лишний раунд
+                    IoC.resolve('Thread.PutNotBefore', LambdaCommand(self.wake), deadline).execute()
+
+
+class TimerHeap:
+    """
+    Команды, отложенные до заданного момента времени по часам time.monotonic.
+    Используется только потоком-владельцем, поэтому не требует блокировок.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.counter = count()  # Порядок добавления - для команд с одинаковым сроком и чтобы не сравнивать команды
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, not_before: float, cmd: ICommand) -> None:
+        heapq.heappush(self.heap, (not_before, next(self.counter), cmd))
+
+    def next_deadline(self):
+        """Срок ближайшей команды или None, если отложенных команд нет"""
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now: float) -> list:
+        """Извлечь команды, срок которых наступил, в порядке сроков"""
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            due.append(heapq.heappop(self.heap)[2])
+        return due
+
+
+class SchedulerStats:
+    """Статистика выполнения задачи планировщиком"""
+
+    def __init__(self):
+        self.ticks = 0  # Число начатых тактов
+        self.commands = 0  # Число выполненных команд
+        self.busy_time = 0.0  # Суммарное время выполнения команд, с
+        self.last_tick_latency = 0.0  # Интервал между началами двух последних тактов, с
+        self.max_tick_latency = 0.0  # Максимальный интервал между началами тактов, с
+        self.last_tick_start = None
+
+    def tick_started(self, now: float) -> None:
+        if self.last_tick_start is not None:
+            self.last_tick_latency = now - self.last_tick_start
+            self.max_tick_latency = max(self.max_tick_latency, self.last_tick_latency)
+        self.last_tick_start = now
+        self.ticks += 1
+
+    @property
+    def avg_command_time(self) -> float:
+        return self.busy_time / self.commands if self.commands else 0.0
+
+
+class BatchStats:
+    """Статистика выполнения пакетов команд потоком"""
+
+    def __init__(self):
+        self.batches = 0  # Число выполненных пакетов
+        self.commands = 0  # Число выполненных команд
+        self.busy_time = 0.0  # Суммарное время выполнения пакетов, с
+        self.last_batch_size = 0
+        self.last_batch_time = 0.0  # Время выполнения последнего пакета, с
+        self.max_batch_time = 0.0  # Максимальное время выполнения пакета, с
+
+    def batch_executed(self, size: int, elapsed: float) -> None:
+        self.batches += 1
+        self.commands += size
+        self.busy_time += elapsed
+        self.last_batch_size = size
+        self.last_batch_time = elapsed
+        self.max_batch_time = max(self.max_batch_time, elapsed)
+
+    @property
+    def avg_batch_size(self) -> float:
+        return self.commands / self.batches if self.batches else 0.0
+
+
+class ScheduledTask:
+    def __init__(self, task: ISchedulable, weight: float):
+        self.task = task
+        self.weight = weight
+        self.deficit = 0.0
+        self.stats = SchedulerStats()
+
+
+class SchedulerCommand(ICommand):
+    """
+    Планировщик задач потока (например, игр) по алгоритму Deficit Round Robin.
+
+    Один вызов execute - это раунд, в котором каждая задача получает квант времени пропорционально своему весу.
+    Задача выполняет команды своего текущего такта, пока не исчерпает накопленный квант. Если команда выполнялась
+    дольше остатка кванта, перерасход вычитается из квантов следующих раундов - дорогая задача пропускает
+    раунды, а не задерживает остальные. Неиспользованный квант не накапливается.
+    """
+
+    def __init__(self, quantum_ms: float = 5):
+        self.quantum = quantum_ms / 1000
+        self.tasks = []
+        self.idle = True  # В последнем раунде не было выполнено ни одной команды
+        self.skipped = False  # В последнем раунде задача пропущена из-за перерасхода кванта
+
+    def add(self, task: ISchedulable, weight: float = 1) -> None:
+        self.tasks.append(ScheduledTask(task, weight))
+
+    def remove(self, task: ISchedulable) -> None:
+        # Новый список, чтобы задачу можно было удалить во время раунда
+        self.tasks = [scheduled for scheduled in self.tasks if scheduled.task is not task]
+
+    def get_stats(self) -> dict:
+        return {scheduled.task.get_id(): scheduled.stats for scheduled in self.tasks}
+
+    def has_work(self) -> bool:
+        """
+        Может ли у задач быть работа уже в следующем раунде: есть невыполненные команды или задача пропустила
+        раунд из-за перерасхода кванта и не начинала такт
+        """
+        return self.skipped or any(scheduled.task.has_work() for scheduled in self.tasks)
+
+    def next_due_time(self):
+        """
+        Ближайший срок, к которому появится работа у задач без работы; None - сроков нет, работа появится
+        только при пробуждении планировщика (Thread.Scheduler.Wake)
+        """
+        deadlines = [scheduled.task.next_due_time() for scheduled in self.tasks if not scheduled.task.has_work()]
+        return min((deadline for deadline in deadlines if deadline is not None), default=None)
+
+    def execute(self) -> None:
+        self.idle = True
+        self.skipped = False
+        for scheduled in self.tasks:
+            scheduled.deficit += self.quantum * scheduled.weight
+            if scheduled.deficit <= 0:
+                self.skipped = True
+                continue
+
+            task = scheduled.task
+            stats = scheduled.stats
+            start = perf_counter()
+
+            if not task.has_work():
+                try:
+                    task.start_tick()
+                except Exception as e:
+                    # Ошибка при начале такта одной задачи не должна останавливать остальные задачи потока
+                    handle_exception(task, e)
+                if task.has_work():
+                    # Такт без команд (например, срок такта еще не наступил) не учитывается
+                    stats.tick_started(start)
+
+            now = start
+            while task.has_work() and now - start < scheduled.deficit:
+                try:
+                    task.step()
+                except Exception as e:
+                    handle_exception(task, e)
+                stats.commands += 1
+                self.idle = False
+                now = perf_counter()
+
+            elapsed = now - start
+            stats.busy_time += elapsed
+            scheduled.deficit -= elapsed
+            if not task.has_work():
+                scheduled.deficit = min(scheduled.deficit, 0.0)
+
+
 class StartThreadCommand(ICommand):
     """
     Команда запускает поток который выполняет команды из очереди. Команды кладутся в очередь другими потоками.
     Предполагается, что в качестве стратегии разрешения зависимостей IoC используется
     HierarchicalScopeBasedDependencyStrategy.
+
+    Thread.PutNotBefore(cmd, not_before) откладывает команду до момента not_before по часам time.monotonic,
+    Thread.PutDelayed(cmd, delay) - на delay секунд, Thread.PutPeriodic(cmd, interval) выполняет команду
+    каждые interval секунд (см. PeriodicCommand).
+    Отложенные команды хранятся в TimerHeap потока: пока их срок не наступил, поток ожидает очередь не дольше,
+    чем до ближайшего срока, и не занят ожиданием. При Soft Stop отложенные команды не выполняются.
+
+    Поток забирает команды из очереди пакетами до batch_size команд. Скоуп потока восстанавливается перед командой,
+    только если предыдущая команда его сменила (например, GameCommand переключается на скоуп игры).
+    Статистика выполнения пакетов доступна через Thread.Stats.
     """
 
-    def __init__(self, thread_id):
+    def __init__(self, thread_id, queue_factory=SingleConsumerQueue, batch_size: int = 64):
+        """
+        :param queue_factory: фабрика очереди команд потока (IWorkerQueue)
+        :param batch_size: максимальное число команд, забираемых из очереди за раз
+        """
         self.thread_id = thread_id
+        self.queue_factory = queue_factory
+        self.batch_size = batch_size
+        self.stats = BatchStats()
         self._hard_stop = False
         self._soft_stop = False
 
@@ -34,7 +286,8 @@ class StartThreadCommand(ICommand):
         self._soft_stop = True
 
     def execute(self) -> None:
-        q = Queue()
+        q = self.queue_factory()
+        timers = TimerHeap()
 
         IoC.resolve('Scopes.New', self.thread_id, IoC.resolve('Scopes.Current').id)
         IoC.resolve('Scopes.Current.Set', self.thread_id).execute()
@@ -48,7 +301,76 @@ class StartThreadCommand(ICommand):
         IoC.resolve(
             'IoC.Register',
             'Thread.PutWithRepeat',
-            lambda cmd: IoC.resolve('Thread.Put', ThreadRepeatedCommand(cmd))
+            lambda cmd: LambdaCommand(lambda: q.put(ThreadRepeatedCommand(cmd)))
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.PutNotBefore',
+            # Команда попадает в TimerHeap через очередь, чтобы TimerHeap изменялся только потоком-владельцем,
+            # а ожидающий очередь поток проснулся и учел новый срок
+            lambda cmd, not_before: LambdaCommand(lambda: q.put(LambdaCommand(lambda: timers.push(not_before, cmd))))
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.PutDelayed',
+            lambda cmd, delay: IoC.resolve('Thread.PutNotBefore', cmd, monotonic() + delay)
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.PutPeriodic',
+            lambda cmd, interval: IoC.resolve('Thread.Put', PeriodicCommand(cmd, interval))
+        ).execute()
+
+        scheduler = SchedulerCommand()
+        scheduler_loop = SchedulerLoopCommand(scheduler)
+
+        def add_to_scheduler(task, weight):
+            scheduler.add(task, weight)
+            if not scheduler_loop.active:
+                # Планировщик попадает в очередь потока вместе с первой задачей
+                scheduler_loop.active = True
+                q.put(scheduler_loop)
+            else:
+                scheduler_loop.wake()
+
+        def wake_scheduler():
+            if get_ident() == thread.ident:
+                scheduler_loop.wake()
+            else:
+                # Состояние цикла изменяет только поток-владелец
+                q.put(LambdaCommand(scheduler_loop.wake))
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Scheduler.Add',
+            lambda task, weight=1: LambdaCommand(lambda: add_to_scheduler(task, weight))
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Scheduler.Remove',
+            lambda task: LambdaCommand(lambda: scheduler.remove(task))
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Scheduler.Wake',
+            lambda: LambdaCommand(wake_scheduler)
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Scheduler.Stats',
+            lambda: scheduler.get_stats()
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Stats',
+            lambda: self.stats
         ).execute()
 
         IoC.resolve(
@@ -63,36 +385,68 @@ class StartThreadCommand(ICommand):
             lambda: LambdaCommand(self.soft_stop)
         ).execute()
 
+        thread_scope = IoC.resolve('Scopes.Current')
+        get_current_scope = thread_scope.get_strategy('Scopes.Current')
+        set_thread_scope = IoC.resolve('Scopes.Current.Set', self.thread_id)
+
+        def execute_command(cmd):
+            # Восстанавливаем скоуп потока, только если его сменила предыдущая команда
+            if get_current_scope() is not thread_scope:
+                set_thread_scope.execute()
+
+            try:
+                cmd.execute()
+            except Exception as e:
+                # Обрабатываем все ошибки возникающие при выполнении команд с помощью Обрабочика ошибок
+                # Выброс исключения из команды не должен прерывать выполнение потока
+                handle_exception(cmd, e)
+
+        def execute_batch(batch):
+            start = perf_counter()
+            executed = 0
+            for cmd in batch:
+                if self._hard_stop:
+                    break
+                execute_command(cmd)
+                executed += 1
+            self.stats.batch_executed(executed, perf_counter() - start)
+
         def run():
+            # Инициализация скоупа данного потока
+            set_thread_scope.execute()
+
             while True:
                 if self._hard_stop:
                     # В случае Hard Stop сразу выходим из цикла - поток завершается
                     break
 
+                timeout = None
+                if timers:
+                    due = timers.pop_due(monotonic())
+                    if due:
+                        execute_batch(due)
+                    if self._hard_stop:
+                        break
+
+                    next_deadline = timers.next_deadline()
+                    if next_deadline is not None:
+                        timeout = max(next_deadline - monotonic(), 0)
+
                 if self._soft_stop:
                     # В случае Soft Stop выходим из цикла в случае отсутствия команд в очереди
                     try:
-                        cmd = q.get_nowait()
+                        batch = q.get_many(self.batch_size, timeout=0)
                     except Empty:
                         break
                 else:
-                    # Обычный режим работы потока - ожидаем команды из очереди
-                    cmd = q.get()
-
-                # Инициализация скоупа данного потока
-                IoC.resolve('Scopes.Current.Set', self.thread_id).execute()
-
-                try:
-                    cmd.execute()
-                except Exception as e:
-                    # Обрабатываем все ошибки возникающие при выполнении команд с помощью Обрабочика ошибок
-                    # Выброс исключения из команды не должен прерывать выполнение потока
+                    # Обычный режим работы потока - ожидаем команды из очереди, но не дольше срока ближайшей
+                    # отложенной команды
                     try:
-                        exc_handler = IoC.resolve('ExceptionHandler')
-                        exc_handler.handle(cmd, e)
-                    except Exception as unhandled_e:
-                        print(f'Unhandled exception has occured: {unhandled_e} for {cmd}')
-                q.task_done()
+                        batch = q.get_many(self.batch_size, timeout=timeout)
+                    except Empty:
+                        continue
+
+                execute_batch(batch)
 
         thread = Thread(
             target=run,
@@ -103,10 +457,158 @@ class StartThreadCommand(ICommand):
         thread.start()
 
 
+class StartThreadPoolCommand(ICommand):
+    """
+    Команда запускает пул из нескольких потоков StartThreadCommand, у каждого свой скоуп и своя очередь.
+
+    В скоупе пула регистрируется Thread.Put, который распределяет команды по потокам. Команды одной игры
+    (определяется по атрибуту game_id команды или явно переданному game_id) всегда попадают в один и тот же поток,
+    поэтому скоуп и очередь игры используются только одним потоком. Новая игра закрепляется за потоком
+    с наименьшим числом игр, команды без игры распределяются по потокам по очереди.
+    Внутри потоков пула Thread.Put перекрыт скоупом потока и кладет команды в очередь этого же потока.
+    Остановленная игра освобождает поток через Thread.Game.Release. После запуска пула текущим остается скоуп,
+    из которого пул был запущен, зависимости пула разрешаются в скоупе pool_id.
+    """
+
+    def __init__(self, pool_id, workers_number: int, queue_factory=SingleConsumerQueue):
+        self.pool_id = pool_id
+        self.workers_number = workers_number
+        self.queue_factory = queue_factory
+
+        self.workers = []  # Скоупы потоков пула
+        self.games_number = [0] * workers_number  # Число игр, закрепленных за каждым потоком
+        self.affinity = {}  # Идентификатор игры -> номер потока
+        self.next_worker = 0
+        self.lock = Lock()
+
+    def get_worker(self, game_id=None) -> int:
+        with self.lock:
+            if game_id is None:
+                worker = self.next_worker
+                self.next_worker = (self.next_worker + 1) % self.workers_number
+                return worker
+
+            worker = self.affinity.get(game_id)
+            if worker is None:
+                worker = self.games_number.index(min(self.games_number))
+                self.games_number[worker] += 1
+                self.affinity[game_id] = worker
+            return worker
+
+    def release(self, game_id) -> None:
+        """Освободить привязку остановленной игры к потоку"""
+        with self.lock:
+            worker = self.affinity.pop(game_id, None)
+            if worker is not None:
+                self.games_number[worker] -= 1
+
+    def worker_scope(self, cmd, game_id=None):
+        """Скоуп потока, в котором должна выполняться команда"""
+        if game_id is None:
+            game_id = getattr(cmd, 'game_id', None)
+        return self.workers[self.get_worker(game_id)]
+
+    def route(self, key, cmd, game_id=None):
+        return self.worker_scope(cmd, game_id).resolve(key, cmd)
+
+    def broadcast(self, key):
+        return MacroCommand([
+            worker_scope.resolve('Thread.Put', worker_scope.resolve(key)) for worker_scope in self.workers
+        ])
+
+    def execute(self) -> None:
+        previous_scope = IoC.resolve('Scopes.Current')
+        IoC.resolve('Scopes.New', self.pool_id, previous_scope.id)
+
+        threads = []
+        for i in range(self.workers_number):
+            IoC.resolve('Scopes.Current.Set', self.pool_id).execute()
+            StartThreadCommand(f'{self.pool_id}-{i}', self.queue_factory).execute()
+            self.workers.append(IoC.resolve('Scopes.Current'))
+            threads.append(IoC.resolve('Thread'))
+
+        IoC.resolve('Scopes.Current.Set', self.pool_id).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Put',
+            lambda cmd, game_id=None: self.route('Thread.Put', cmd, game_id)
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.PutWithRepeat',
+            lambda cmd, game_id=None: self.route('Thread.PutWithRepeat', cmd, game_id)
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.PutNotBefore',
+            lambda cmd, not_before, game_id=None: self.worker_scope(cmd, game_id).resolve(
+                'Thread.PutNotBefore', cmd, not_before
+            )
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.PutDelayed',
+            lambda cmd, delay, game_id=None: self.worker_scope(cmd, game_id).resolve('Thread.PutDelayed', cmd, delay)
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.PutPeriodic',
+            lambda cmd, interval, game_id=None: self.worker_scope(cmd, game_id).resolve(
+                'Thread.PutPeriodic', cmd, interval
+            )
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Pool',
+            lambda: threads
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Pool.HardStop',
+            lambda: self.broadcast('Thread.HardStop')
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Pool.SoftStop',
+            lambda: self.broadcast('Thread.SoftStop')
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Game.Release',
+            lambda game_id: LambdaCommand(lambda: self.release(game_id))
+        ).execute()
+
+        IoC.resolve('Scopes.Current.Set', previous_scope.id).execute()
+
+
 class StartThreadCommandPlugin(ICommand):
     def execute(self) -> None:
         IoC.resolve(
             'IoC.Register',
             'Thread.Start',
-            lambda thread_id: StartThreadCommand(thread_id)
+            lambda thread_id, queue_factory=SingleConsumerQueue: StartThreadCommand(thread_id, queue_factory)
+        ).execute()
+
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Pool.Start',
+            lambda pool_id, workers_number, queue_factory=SingleConsumerQueue: StartThreadPoolCommand(
+                pool_id, workers_number, queue_factory
+            )
+        ).execute()
+
+        # Поток без пула не закрепляет игры; пул перекрывает зависимость в своем скоупе
+        IoC.resolve(
+            'IoC.Register',
+            'Thread.Game.Release',
+            lambda game_id: LambdaCommand(lambda: None)
         ).execute()
@@ -0,0 +1,57 @@
+from abc import ABC, abstractmethod
+
+
+class ISchedulable(ABC):
+    """Задача, выполняемая планировщиком потока по тактам"""
+
+    @abstractmethod
+    def get_id(self):
+        ...
+
+    @abstractmethod
+    def start_tick(self) -> None:
+        """Начать новый такт"""
+        ...
+
+    @abstractmethod
+    def has_work(self) -> bool:
+        """Остались ли невыполненные команды текущего такта"""
+        ...
+
+    @abstractmethod
+    def step(self) -> None:
+        """Выполнить очередную команду текущего такта"""
+        ...
+
+    def next_due_time(self):
+        """
+        Момент по часам time.monotonic, раньше которого у задачи не появится работы (например, срок следующего такта
+        игры с фиксированным шагом). None - работа появится только с новой командой задачи; добавив ее, задача
+        будит планировщик потока (Thread.Scheduler.Wake).
+        """
+        return None
+
+
+class IWorkerQueue(ABC):
+    """
+    Очередь команд потока. Команды кладут любые потоки, забирает - только поток-владелец очереди.
+    Если команд нет, get и get_many выбрасывают queue.Empty.
+    """
+
+    @abstractmethod
+    def put(self, cmd) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, timeout: float = None):
+        """Забрать команду, ожидая ее не дольше timeout секунд (None - без ограничения)"""
+        ...
+
+    @abstractmethod
+    def get_nowait(self):
+        ...
+
+    @abstractmethod
+    def get_many(self, max_items: int, timeout: float = None) -> list:
+        """Забрать до max_items команд, ожидая первую не дольше timeout секунд"""
+        ...
@@ -0,0 +1,85 @@
+from collections import deque
+from queue import Queue, Empty
+from threading import Event
+
+from .interfaces import IWorkerQueue
+
+
+class LockedQueue(IWorkerQueue):
+    """Очередь на основе queue.Queue: каждая операция захватывает блокировку очереди"""
+
+    def __init__(self):
+        self.q = Queue()
+
+    def put(self, cmd) -> None:
+        self.q.put(cmd)
+
+    def get(self, timeout: float = None):
+        return self.q.get(timeout=timeout)
+
+    def get_nowait(self):
+        return self.q.get_nowait()
+
+    def get_many(self, max_items: int, timeout: float = None) -> list:
+        items = [self.q.get(timeout=timeout)]
+        try:
+            while len(items) < max_items:
+                items.append(self.q.get_nowait())
+        except Empty:
+            pass
+        return items
+
+
+class SingleConsumerQueue(IWorkerQueue):
+    """
+    Очередь с одним потребителем на основе collections.deque.
+
+    append и popleft у deque атомарны, поэтому put и get не захватывают блокировок. Event используется только
+    для пробуждения потребителя: производитель вызывает set, лишь если потребитель ждет команд, а потребитель
+    ждет, только если после объявления ожидания очередь по-прежнему пуста.
+    """
+
+    def __init__(self):
+        self.items = deque()
+        self.event = Event()
+        self.waiting = False
+
+    def put(self, cmd) -> None:
+        self.items.append(cmd)
+        if self.waiting:
+            self.event.set()
+
+    def wait(self, timeout: float = None) -> None:
+        if self.items:
+            return
+
+        self.waiting = True
+        self.event.clear()
+        try:
+            # Команда могла появиться до объявления ожидания - тогда ее производитель не будил потребителя
+            if not self.items:
+                self.event.wait(timeout)
+        finally:
+            self.waiting = False
+
+    def get(self, timeout: float = None):
+        self.wait(timeout)
+        return self.get_nowait()
+
+    def get_nowait(self):
+        try:
+            return self.items.popleft()
+        except IndexError:
+            raise Empty from None
+
+    def get_many(self, max_items: int, timeout: float = None) -> list:
+        self.wait(timeout)
+        items = self.items
+        batch = []
+        try:
+            for _ in range(max_items):
+                batch.append(items.popleft())
+        except IndexError:
+            if not batch:
+                raise Empty from None
+        return batch